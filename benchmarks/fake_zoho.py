@@ -0,0 +1,179 @@
+"""
+Local stand-in for the Zoho CRM endpoints used by the extractor: OAuth token refresh, bulk read jobs
+(create, details, result download) and field metadata. Serves synthetic pages of configurable size, width
+and multiline content, so that throughput can be measured without hitting Zoho.
+"""
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+from urllib.parse import urlparse
+
+MODULE_API_NAME = "Leads"
+FIRST_RECORD_ID = 4876876000000000000
+FIXED_FIELDS = {"Last_Name": "text", "Description": "textarea", "Amount": "currency", "Modified_Time": "datetime"}
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do", "eiusmod",
+         "tempor", "incididunt", "ut", "labore", "et", "dolore", "magna", "aliqua", "\"quoted\"", "comma,"]
+
+
+@dataclass(slots=True)
+class FakeZohoConfig:
+    pages: int = 3
+    rows_per_page: int = 10000
+    # Number of text fields besides the Id, Last_Name, Description, Amount and Modified_Time ones
+    extra_fields: int = 10
+    value_length: int = 40
+    # Share of records whose Description spans multiple lines
+    multiline_ratio: float = 0.2
+    # Seconds a job stays QUEUED after it is created
+    queue_delay: float = 0.0
+    seed: int = 42
+
+    @property
+    def field_data_types(self) -> Dict[str, str]:
+        return {**FIXED_FIELDS, **{f"Field_{index}": "text" for index in range(1, self.extra_fields + 1)}}
+
+    @property
+    def columns(self) -> List[str]:
+        return ["Id", *self.field_data_types]
+
+
+def page_csv(config: FakeZohoConfig, page: int) -> bytes:
+    """Synthetic CSV of a page (with header) in the layout of bulk read results."""
+    rng = random.Random(config.seed * 100003 + page)
+
+    def text(length: int) -> str:
+        # Words are about 6 characters long on average
+        return " ".join(rng.choices(WORDS, k=max(length // 6, 1)))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(config.columns)
+    first_row = (page - 1) * config.rows_per_page
+    for row in range(first_row, first_row + config.rows_per_page):
+        description = text(config.value_length)
+        if rng.random() < config.multiline_ratio:
+            description = "\n".join(text(config.value_length) for _ in range(3))
+        writer.writerow([
+            FIRST_RECORD_ID + row,
+            text(12),
+            description,
+            f"{rng.uniform(0, 100000):.2f}",
+            f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:15:00+01:00",
+            *(text(config.value_length) for _ in range(config.extra_fields)),
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+def zipped(csv_name: str, content: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(csv_name, content)
+    return buffer.getvalue()
+
+
+class FakeZohoServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config: FakeZohoConfig):
+        super().__init__(("127.0.0.1", 0), FakeZohoHandler)
+        self.config = config
+        # Results are prepared up front, so that serving them costs no more than sending the bytes
+        self.results = {page: zipped(f"page_{page}.csv", page_csv(config, page))
+                        for page in range(1, config.pages + 1)}
+        self.jobs: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class FakeZohoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeZohoServer
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = urlparse(self.path).path
+        if path == "/oauth/v2/token":
+            self._send_json(200, {"access_token": "benchmark-token", "expires_in": 3600})
+        elif path == "/crm/bulk/v2/read":
+            query = json.loads(body)["query"]
+            with self.server.lock:
+                job_id = str(FIRST_RECORD_ID + len(self.server.jobs) + 1)
+                self.server.jobs[job_id] = {"page": query.get("page", 1), "created_at": time.monotonic()}
+            self._send_json(201, {"data": [{"status": "success", "code": "ADDED_SUCCESSFULLY",
+                                            "message": "Added successfully.", "details": {"id": job_id}}]})
+        else:
+            self._send_json(404, {"code": "INVALID_URL_PATTERN"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        config = self.server.config
+        job_match = re.fullmatch(r"/crm/bulk/v2/read/(\d+)(/result)?", url.path)
+        if url.path == "/crm/v2/settings/modules":
+            self._send_json(200, {"modules": [{"api_name": MODULE_API_NAME}]})
+        elif url.path == "/crm/v2/settings/fields":
+            self._send_json(200, {"fields": [{"api_name": name, "data_type": data_type}
+                                             for name, data_type in config.field_data_types.items()]})
+        elif job_match is None or job_match.group(1) not in self.server.jobs:
+            self._send_json(404, {"code": "INVALID_URL_PATTERN"})
+        elif job_match.group(2):
+            self._send(200, "application/zip", self.server.results[self.server.jobs[job_match.group(1)]["page"]])
+        else:
+            self._send_json(200, {"data": [self._job_details(job_match.group(1))]})
+
+    def _job_details(self, job_id: str) -> dict:
+        job = self.server.jobs[job_id]
+        config = self.server.config
+        if time.monotonic() - job["created_at"] < config.queue_delay:
+            return {"id": job_id, "operation": "read", "state": "QUEUED"}
+        return {"id": job_id, "operation": "read", "state": "COMPLETED", "result": {
+            "page": job["page"], "count": config.rows_per_page, "per_page": config.rows_per_page,
+            "more_records": job["page"] < config.pages,
+            "download_url": f"/crm/bulk/v2/read/{job_id}/result"}}
+
+    def _send_json(self, status: int, body: dict):
+        self._send(status, "application/json", json.dumps(body).encode("utf-8"))
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(config: FakeZohoConfig, url_queue: multiprocessing.Queue):
+    server = FakeZohoServer(config)
+    url_queue.put(server.url)
+    server.serve_forever(poll_interval=0.05)
+
+
+@contextlib.contextmanager
+def running_fake_zoho(config: FakeZohoConfig) -> Iterator[str]:
+    """
+    Runs the fake server in a separate process, so that it does not share CPU time and memory
+    with the measured extractor, and yields its URL.
+    """
+    url_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(config, url_queue), daemon=True)
+    process.start()
+    try:
+        yield url_queue.get(timeout=60)
+    finally:
+        process.terminate()
+        process.join()
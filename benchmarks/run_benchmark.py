@@ -0,0 +1,271 @@
+"""
+Offline benchmark of the extractor against the local fake Zoho server (see `benchmarks.fake_zoho`).
+
+Measures three phases, each on the same synthetic pages:
+
+- download_result: extraction of zipped results into slices (`BulkReadJobBatch._write_result`), no HTTP
+- page_loop: `BulkReadJobBatch.download_all_pages` through the HTTP client, i.e. job creation, polling
+  and downloads of all pages
+- run: the whole component (`ZohoCRMExtractor.run`) with the HTTP client backend, incl. post-processing
+  of slices and the manifest
+
+and reports wall time, rows/s, MB/s (of uncompressed CSV data), peak RSS and peak disk use of each.
+Rows are the records each phase actually wrote into slices, as counted by the extraction itself.
+
+Run from the repository root, e.g.:
+
+    python -m benchmarks.run_benchmark --pages 5 --rows-per-page 50000 --advanced-options '{"slice_size_mb": 8}'
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+from unittest import mock
+
+from benchmarks.fake_zoho import FakeZohoConfig, MODULE_API_NAME, page_csv, running_fake_zoho, zipped
+
+import zoho.client
+from component import METRICS_FILE_NAME, ZohoCRMExtractor
+from zoho import metrics
+from zoho.bulk_read import COPY_BUFFER_SIZE, BulkReadJobBatch
+
+REGION_CODE = "EU"
+SAMPLING_INTERVAL_SECONDS = 0.05
+PHASES = ["download_result", "page_loop", "run"]
+
+
+@dataclass(slots=True)
+class PhaseResult:
+    phase: str
+    wall_seconds: float
+    rows: int
+    data_bytes: int
+    peak_rss_bytes: int
+    peak_disk_bytes: int
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.data_bytes / 1024 / 1024 / self.wall_seconds if self.wall_seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "rows_per_second": self.rows_per_second, "mb_per_second": self.mb_per_second}
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, its peak so far where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def disk_usage_bytes(folder: str) -> int:
+    size = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            with contextlib.suppress(FileNotFoundError):
+                size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+class ResourceSampler:
+    """Samples RSS of the process and disk use of a folder in a background thread and keeps their peaks."""
+
+    def __init__(self, folder: str, interval: float = SAMPLING_INTERVAL_SECONDS):
+        self.folder = folder
+        self.interval = interval
+        self.peak_rss_bytes = 0
+        self.peak_disk_bytes = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "ResourceSampler":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        self.peak_rss_bytes = max(self.peak_rss_bytes, current_rss_bytes())
+        self.peak_disk_bytes = max(self.peak_disk_bytes, disk_usage_bytes(self.folder))
+
+
+def measure(phase: str, folder: str, data_bytes: int, func: Callable[[], int]) -> PhaseResult:
+    """Runs the phase, `func` returns the number of rows it wrote."""
+    with ResourceSampler(folder) as sampler:
+        start = time.perf_counter()
+        rows = func()
+        wall_seconds = time.perf_counter() - start
+    return PhaseResult(phase=phase, wall_seconds=wall_seconds, rows=rows, data_bytes=data_bytes,
+                       peak_rss_bytes=sampler.peak_rss_bytes, peak_disk_bytes=sampler.peak_disk_bytes)
+
+
+@contextlib.contextmanager
+def zoho_pointed_to(url: str) -> Iterator[None]:
+    """Points the API and accounts domains of the benchmark region to the fake server."""
+    with mock.patch.dict(zoho.client.API_DOMAINS, {REGION_CODE: url}), \
+            mock.patch.dict(zoho.client.ACCOUNTS_TOKEN_URLS, {REGION_CODE: f"{url}/oauth/v2/token"}):
+        yield
+
+
+def bench_download_result(results: List[bytes], workdir: str, data_bytes: int,
+                          compression_level: Optional[int]) -> PhaseResult:
+    folder = os.path.join(workdir, "download_result")
+    os.makedirs(folder)
+    batch = BulkReadJobBatch(module_api_name=MODULE_API_NAME, destination_folder=folder,
+                             file_name=f"{MODULE_API_NAME}.csv", compression_level=compression_level)
+
+    def extract_all() -> int:
+        return sum(batch._write_result(result[start:start + COPY_BUFFER_SIZE]
+                                       for start in range(0, len(result), COPY_BUFFER_SIZE)).rows
+                   for result in results)
+
+    return measure("download_result", folder, data_bytes, extract_all)
+
+
+def bench_page_loop(url: str, workdir: str, data_bytes: int, max_concurrent_jobs: int,
+                    compression_level: Optional[int]) -> PhaseResult:
+    folder = os.path.join(workdir, "page_loop")
+    os.makedirs(folder)
+    with zoho_pointed_to(url):
+        client = zoho.client.ZohoClient(REGION_CODE, "client-id", "client-secret", "refresh-token")
+    batch = BulkReadJobBatch(module_api_name=MODULE_API_NAME, destination_folder=folder,
+                             file_name=f"{MODULE_API_NAME}.csv", client=client,
+                             max_concurrent_jobs=max_concurrent_jobs, compression_level=compression_level)
+    module_metrics = metrics.ModuleMetrics(module_api_name=MODULE_API_NAME, output_table_name=MODULE_API_NAME)
+
+    def download_all_pages() -> int:
+        with metrics.recorded_in(module_metrics):
+            batch.download_all_pages()
+        return module_metrics.as_dict()["rows_written"]
+
+    return measure("page_loop", folder, data_bytes, download_all_pages)
+
+
+def bench_run(url: str, workdir: str, data_bytes: int, advanced_options: dict) -> PhaseResult:
+    datadir = os.path.join(workdir, "run")
+    os.makedirs(os.path.join(datadir, "in"))
+    config = {
+        "parameters": {
+            "module_records_download_config": {"module_name": MODULE_API_NAME},
+            "sync_options": {"sync_mode": "full_sync"},
+            "account": {"user_email": "benchmark@example.com", "zoho_datacenter": REGION_CODE},
+            "advanced_options": {"client_backend": "http", **advanced_options},
+        },
+        "authorization": {"oauth_api": {"credentials": {
+            "appKey": "client-id", "#appSecret": "client-secret",
+            "#data": json.dumps({"refresh_token": "refresh-token"})}}},
+    }
+    with open(os.path.join(datadir, "config.json"), "w", encoding="utf-8") as config_file:
+        json.dump(config, config_file)
+
+    def run() -> int:
+        component.run()
+        with open(os.path.join(datadir, METRICS_FILE_NAME), encoding="utf-8") as metrics_file:
+            return sum(module["rows_written"] for module in json.load(metrics_file)["modules"])
+
+    with zoho_pointed_to(url), mock.patch.dict(os.environ, {"KBC_DATADIR": datadir}):
+        component = ZohoCRMExtractor()
+        return measure("run", datadir, data_bytes, run)
+
+
+def run_benchmark(config: FakeZohoConfig, phases: List[str] = PHASES, max_concurrent_jobs: int = 1,
+                  advanced_options: Optional[dict] = None, workdir: Optional[str] = None) -> List[PhaseResult]:
+    """Runs the given phases against a fake server serving pages of `config` and returns their results."""
+    advanced_options = advanced_options or {}
+    compression_level = None
+    if advanced_options.get("output_compression") == "gzip":
+        compression_level = advanced_options.get("compression_level", 6)
+    # Zipped results for the download_result phase, prepared before any phase is measured
+    results = []
+    data_bytes = 0
+    for page in range(1, config.pages + 1):
+        content = page_csv(config, page)
+        data_bytes += len(content) - len(content.split(b"\n", 1)[0]) - 1
+        if "download_result" in phases:
+            results.append(zipped(f"page_{page}.csv", content))
+
+    workdir = workdir or tempfile.mkdtemp(prefix="zoho_benchmark_")
+    phase_results = []
+    try:
+        if "download_result" in phases:
+            phase_results.append(bench_download_result(results, workdir, data_bytes, compression_level))
+        if "page_loop" in phases or "run" in phases:
+            with running_fake_zoho(config) as url:
+                if "page_loop" in phases:
+                    phase_results.append(bench_page_loop(url, workdir, data_bytes, max_concurrent_jobs,
+                                                         compression_level))
+                if "run" in phases:
+                    phase_results.append(bench_run(url, workdir, data_bytes,
+                                                   {"max_concurrent_jobs": max_concurrent_jobs, **advanced_options}))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return phase_results
+
+
+def format_results(results: List[PhaseResult]) -> str:
+    lines = [f"{'phase':<16}{'wall s':>10}{'rows/s':>12}{'MB/s':>10}{'peak RSS MB':>14}{'peak disk MB':>14}"]
+    for result in results:
+        lines.append(f"{result.phase:<16}{result.wall_seconds:>10.2f}{result.rows_per_second:>12.0f}"
+                     f"{result.mb_per_second:>10.1f}{result.peak_rss_bytes / 1024 / 1024:>14.1f}"
+                     f"{result.peak_disk_bytes / 1024 / 1024:>14.1f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = FakeZohoConfig()
+    parser = argparse.ArgumentParser(description="Benchmark of the extractor against a local fake Zoho server.")
+    parser.add_argument("--pages", type=int, default=defaults.pages)
+    parser.add_argument("--rows-per-page", type=int, default=defaults.rows_per_page)
+    parser.add_argument("--extra-fields", type=int, default=defaults.extra_fields,
+                        help="Number of text fields besides the fixed ones (width of the records).")
+    parser.add_argument("--value-length", type=int, default=defaults.value_length,
+                        help="Approximate length of text values.")
+    parser.add_argument("--multiline-ratio", type=float, default=defaults.multiline_ratio,
+                        help="Share of records with a multiline Description.")
+    parser.add_argument("--queue-delay", type=float, default=defaults.queue_delay,
+                        help="Seconds each job stays QUEUED before it completes.")
+    parser.add_argument("--max-concurrent-jobs", type=int, default=1)
+    parser.add_argument("--advanced-options", type=json.loads, default={},
+                        help="JSON of advanced options of the configuration used in the run phase.")
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=PHASES)
+    parser.add_argument("--json", help="Writes the results as JSON into the given file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    config = FakeZohoConfig(pages=args.pages, rows_per_page=args.rows_per_page, extra_fields=args.extra_fields,
+                            value_length=args.value_length, multiline_ratio=args.multiline_ratio,
+                            queue_delay=args.queue_delay)
+    results = run_benchmark(config, args.phases, args.max_concurrent_jobs, args.advanced_options)
+    print(format_results(results))
+    if args.json:
+        summary: Dict[str, object] = {"config": asdict(config), "results": [r.as_dict() for r in results]}
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(summary, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
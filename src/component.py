@@ -2,24 +2,42 @@
 Zoho CRM Extractor component main module.
 
 """
+import contextlib
 import logging
-import dateparser
-from datetime import datetime, timezone
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
+from time import monotonic
+from typing import ContextManager, Dict, List, Optional, Set
 import os
 import json
+import shutil
 
+import requests
 from keboola.component.base import ComponentBase, sync_action
 from keboola.component.exceptions import UserException
 from keboola.component.sync_actions import SelectElement
 
 import zoho.initialization
+import zoho.api_credits
 import zoho.bulk_read
-
-from zcrmsdk.src.com.zoho.crm.api.modules import ModulesOperations
-from zcrmsdk.src.com.zoho.crm.api.fields import FieldsOperations
-from zcrmsdk.src.com.zoho.crm.api import ParameterMap
+import zoho.checkpoint
+import zoho.client
+import zoho.column_types
+import zoho.coql
+import zoho.http_session
+import zoho.deleted_records
+import zoho.metadata
+import zoho.metrics
+import zoho.parquet
+import zoho.partitioning
+import zoho.polling
+import zoho.profiling
+import zoho.result_cache
+import zoho.row_index
+import zoho.slicing
+import zoho.watermark
 
 
 # Configuration variables
@@ -28,7 +46,10 @@ KEY_USER_EMAIL = "user_email"
 KEY_DATACENTER = "zoho_datacenter"
 KEY_GROUP_DESTINATION = "destination"
 KEY_LOAD_MODE = "load_mode"
+KEY_SKIP_UNCHANGED_ROWS = "skip_unchanged_rows"
+KEY_ROW_HASH_IGNORED_FIELDS = "row_hash_ignored_fields"
 KEY_MODULE_RECORDS_DOWNLOAD_CONFIG = "module_records_download_config"
+KEY_MODULE_RECORDS_DOWNLOAD_CONFIGS = "module_records_download_configs"
 
 KEY_OUTPUT_TABLE_NAME = "output_table_name"
 KEY_MODULE_NAME = "module_name"
@@ -36,14 +57,71 @@ KEY_FIELD_NAMES = "field_names"
 KEY_GROUP_SYNC_OPTIONS = "sync_options"
 KEY_SYNC_MODE = "sync_mode"
 KEY_FILTERING_CRITERIA = "filtering_criteria"
-
-
-REQUIRED_PARAMETERS = [KEY_MODULE_RECORDS_DOWNLOAD_CONFIG, KEY_GROUP_SYNC_OPTIONS]
+KEY_INCREMENTAL_FIELD = "incremental_field"
+KEY_WATERMARK_OVERLAP_MINUTES = "watermark_overlap_minutes"
+KEY_PARTITIONING = "partitioning"
+KEY_SYNC_DELETED_RECORDS = "sync_deleted_records"
+KEY_PARTITION_FIELD_NAME = "field_name"
+KEY_PARTITION_BOUNDARIES = "boundaries"
+KEY_PARTITION_START = "start"
+KEY_PARTITION_INITIAL_PARTITIONS = "initial_partitions"
+KEY_PARTITION_MIN_HOURS = "min_partition_hours"
+KEY_GROUP_ADVANCED_OPTIONS = "advanced_options"
+KEY_MAX_CONCURRENT_JOBS = "max_concurrent_jobs"
+KEY_JOB_TIMEOUT_MINUTES = "job_timeout_minutes"
+KEY_MAX_PARALLEL_MODULES = "max_parallel_modules"
+KEY_RESULT_CACHE_TTL_MINUTES = "result_cache_ttl_minutes"
+KEY_COQL_MAX_RECORDS = "coql_max_records"
+KEY_METADATA_CACHE_TTL_MINUTES = "metadata_cache_ttl_minutes"
+KEY_INVALIDATE_METADATA_CACHE = "invalidate_metadata_cache"
+KEY_CLIENT_BACKEND = "client_backend"
+KEY_API_CREDIT_BUDGET = "api_credit_budget"
+KEY_SLICE_SIZE_MB = "slice_size_mb"
+KEY_OUTPUT_COMPRESSION = "output_compression"
+KEY_COMPRESSION_LEVEL = "compression_level"
+KEY_OUTPUT_FORMAT = "output_format"
+KEY_COLUMN_DATA_TYPES = "column_data_types"
+KEY_PROFILING = "profiling"
+
+
+REQUIRED_PARAMETERS = [KEY_GROUP_SYNC_OPTIONS]
+
+# State file keys
+KEY_STATE_LAST_RUN = "last_run"
+KEY_STATE_MODULES = "modules"
+KEY_STATE_CHECKPOINT = "checkpoint"
+KEY_STATE_RESULT_CACHE = "result_cache"
+KEY_STATE_METADATA_CACHE = "metadata_cache"
+KEY_STATE_WATERMARK = "watermark"
+KEY_STATE_WATERMARK_FIELD_NAME = "field_name"
+KEY_STATE_WATERMARK_VALUE = "value"
+KEY_STATE_DELETED_RECORDS_WATERMARK = "deleted_records_watermark"
+# Encrypted by Keboola, contains JSON with the access token, its expiry and fingerprint of the authorization
+KEY_STATE_ACCESS_TOKEN = "#access_token"
+KEY_TOKEN_ACCESS_TOKEN = "access_token"
+KEY_TOKEN_EXPIRY_TIME = "expiry_time"
+KEY_TOKEN_FINGERPRINT = "fingerprint"
+
+# Resolved module config keys
+KEY_WATERMARK_FIELD = "watermark_field"
 
 # Other constants
 TMP_DATA_DIR_NAME = "tmp_data"
 TOKEN_STORE_FILE_NAME = "token_store.csv"
+METRICS_FILE_NAME = "metrics.json"
+PROFILING_DIR_NAME = "profiling"
+RESULT_CACHE_DIR_NAME = "bulk_read_cache"
 ID_COLUMN_NAME = "Id"
+DEFAULT_MAX_PARALLEL_MODULES = 1
+# Checkpoints of a run in progress are written into the state at most this often
+CHECKPOINT_STATE_WRITE_INTERVAL_SECONDS = 10.0
+CLIENT_BACKEND_SDK = "sdk"
+CLIENT_BACKEND_HTTP = "http"
+OUTPUT_COMPRESSION_NONE = "none"
+OUTPUT_COMPRESSION_GZIP = "gzip"
+OUTPUT_FORMAT_CSV = "csv"
+OUTPUT_FORMAT_PARQUET = "parquet"
+PARQUET_FILE_TAG = "zoho-parquet"
 
 
 class ZohoCRMExtractor(ComponentBase):
@@ -55,62 +133,496 @@ class ZohoCRMExtractor(ComponentBase):
         self.token_store_path = None
         self.statefile = self.get_state_file()
         self.ts_start = self.generate_timestamp()
+        self._checkpoint_stores: Dict[str, zoho.checkpoint.CheckpointStore] = {}
+        self._watermarks: Dict[str, zoho.watermark.WatermarkTracker] = {}
+        self._deleted_records_watermarks: Dict[str, zoho.watermark.WatermarkTracker] = {}
+        # Output tables not written as the API credit budget was reached before all their pages were read
+        self._deferred_tables: Set[str] = set()
+        self.result_cache: Optional[zoho.result_cache.BulkReadResultCache] = None
+        self.metadata_cache: Optional[zoho.metadata.MetadataCache] = None
+        self.client: Optional[zoho.client.ZohoClient] = None
+        self.session: Optional[requests.Session] = None
+        self.connection_stats = zoho.http_session.ConnectionStats()
+        self.api_credits = zoho.api_credits.ApiCreditScheduler()
+        self.metrics = zoho.metrics.RunMetrics()
+        self._client_initialized = False
+        self._state_lock = threading.Lock()
+        # Held while the state file is written, so that a delayed checkpoint write never overwrites the final state
+        self._state_file_lock = threading.Lock()
+        self._checkpoint_state_timer: Optional[threading.Timer] = None
+        self._checkpoint_state_written_at: Optional[float] = None
 
     def run(self):
         self.validate_configuration_parameters(REQUIRED_PARAMETERS)
 
         self._init_params()
+        # Sync actions (e.g. listModules) run before any module is configured, only a run needs one
+        if not self.module_configs:
+            raise UserException(f"Either {KEY_MODULE_RECORDS_DOWNLOAD_CONFIG} or {KEY_MODULE_RECORDS_DOWNLOAD_CONFIGS} "
+                                f"parameter must be set.")
         self._init_client()
+        zoho.profiling.checkpoint("init")
+        try:
+            self.process_module_records_download_configs(self.module_configs)
+        except BaseException:
+            # Checkpoints changed since the last delayed write are kept for the rerun
+            self._cancel_checkpoint_state_write()
+            self._write_checkpoint_state()
+            raise
+        finally:
+            logging.info(f"Connection reuse: {self.connection_stats}.")
+            logging.info(f"{self.api_credits.report()}.")
+            self._write_metrics_report()
+
+        self._cancel_checkpoint_state_write()
+        with self._state_file_lock:
+            self.write_state_file(self._build_state())
+
+    def process_module_records_download_configs(self, configs: List[dict]):
+        """
+        Processes all module records download configs using a pool of `max_parallel_modules` workers.
+        All modules share the initialized client and one pool of `max_concurrent_jobs` bulk read job slots,
+        so the number of concurrent bulk read jobs stays within the limit regardless of the number of modules.
+        """
+        job_slots = threading.BoundedSemaphore(self.max_concurrent_jobs)
+        if len(configs) == 1:
+            self._process_module(configs[0], job_slots)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_modules, thread_name_prefix="module") as executor:
+            futures = [executor.submit(self._process_module, config, job_slots) for config in configs]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _process_module(self, config: dict, job_slots: threading.BoundedSemaphore):
+        """
+        Processes the module records download config, API credits of its calls are attributed to its output table
+        and metrics of its extraction are recorded.
+        """
+        output_table_name = config[KEY_OUTPUT_TABLE_NAME]
+        module_metrics = self.metrics.module(config[KEY_MODULE_NAME], output_table_name)
+        with zoho.api_credits.attributed_to(output_table_name), zoho.metrics.recorded_in(module_metrics):
+            self.process_module_records_download_config(config, job_slots)
 
-        self.process_module_records_download_config(self.module_records_download_config)
+    def profiled(self) -> ContextManager:
+        """
+        Profiles the action if enabled by the `profiling` advanced option or the `ZOHO_PROFILING` environment
+        variable: samples stacks of all threads and takes memory snapshots at phase boundaries (initialization,
+        each page download and each output written) into the `profiling` folder of the temporary data folder.
+        """
+        advanced_options: dict = self.configuration.parameters.get(KEY_GROUP_ADVANCED_OPTIONS, {})
+        if not advanced_options.get(KEY_PROFILING) and not zoho.profiling.enabled_by_environment():
+            return contextlib.nullcontext()
+        return zoho.profiling.profiled(Path(self.data_folder_path) / TMP_DATA_DIR_NAME / PROFILING_DIR_NAME)
 
-        self.write_state_file({"last_run": self.ts_start})
+    def _write_metrics_report(self):
+        """
+        Writes the metrics report of the run (durations, volumes and API calls per module and page)
+        as JSON into the data folder and logs it without the metrics of individual pages.
+        """
+        report = self.metrics.report(self.api_credits, self.connection_stats)
+        with open(os.path.join(self.data_folder_path, METRICS_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Run metrics: {json.dumps(zoho.metrics.summary(report))}")
 
-    def process_module_records_download_config(self, config: dict):
+    def process_module_records_download_config(self, config: dict,
+                                               job_slots: Optional[threading.BoundedSemaphore] = None):
         """
         Processes module records download config:
         asks Zoho API to prepare the data for download and then downloads the data as sliced CSV.
+        Filtered queries of selected fields matching at most `coql_max_records` records are read through
+        the COQL API instead, which skips the bulk read job lifecycle.
+        Incremental syncs from the last run track the watermark (maximum value of the incremental field)
+        of the extracted records, if the field is extracted.
+        Incremental loads may skip rows that did not change since they were loaded last time.
+        Slices are rebalanced to about `slice_size_mb` each if set, so that Storage imports them in parallel,
+        and gzip compressed while they are written if `output_compression` is gzip.
+        Column data types are taken from the field metadata for the manifest if `column_data_types` is set,
+        with `output_format` parquet the slices are converted to typed Parquet files instead of a table.
+        Records deleted since the previous run are downloaded into a separate table if enabled.
         Also creates appropriate manifest files.
+        If the API credit budget is reached before all pages are read, the output table is deferred to the next run
+        (see `_defer_output_table`).
         """
         module_name: str = config.get(KEY_MODULE_NAME)
         field_names: Optional[List[str]] = config.get(KEY_FIELD_NAMES)
+        output_table_name: str = config[KEY_OUTPUT_TABLE_NAME]
+        filtering_criteria_dict: Optional[dict] = config.get(KEY_FILTERING_CRITERIA)
+        watermark_field: Optional[str] = config.get(KEY_WATERMARK_FIELD)
+
+        watermark = zoho.watermark.WatermarkTracker(watermark_field) if watermark_field else None
 
         filtering_criteria = None
-        if self.filtering_criteria_dict:
-            key_comparator = self.filtering_criteria_dict.get(zoho.bulk_read.KEY_COMPARATOR)
-            key_group = self.filtering_criteria_dict.get(zoho.bulk_read.KEY_GROUP)
+        if filtering_criteria_dict:
+            key_comparator = filtering_criteria_dict.get(zoho.bulk_read.KEY_COMPARATOR)
+            key_group = filtering_criteria_dict.get(zoho.bulk_read.KEY_GROUP)
 
             if key_comparator:
                 filtering_criteria = zoho.bulk_read.BulkReadJobFilteringCriterion.from_dict(
-                    self.filtering_criteria_dict)
+                    filtering_criteria_dict)
             elif key_group:
                 filtering_criteria = zoho.bulk_read.BulkReadJobFilteringCriteriaGroup.from_dict(
-                    self.filtering_criteria_dict)
+                    filtering_criteria_dict)
 
         table_def = self.create_out_table_definition(
-            name=f"{self.output_table_name}.csv",
+            name=f"{output_table_name}.csv",
             incremental=self.incremental,
             primary_key=[ID_COLUMN_NAME],
             is_sliced=True)
 
         os.makedirs(table_def.full_path, exist_ok=True)
-        logging.info(f"Attempting to download data for output table {self.output_table_name}.")
-
+        logging.info(f"Attempting to download data for output table {output_table_name}.")
+
+        polling_scheduler = zoho.polling.PollingScheduler(job_timeout=self.job_timeout_seconds,
+                                                          api_credits=self.api_credits)
+        checkpoint_store = zoho.checkpoint.CheckpointStore.from_dict(
+            self.statefile.get(KEY_STATE_MODULES, {}).get(output_table_name, {}).get(KEY_STATE_CHECKPOINT),
+            on_change=self._checkpoint_changed,
+        )
+        with self._state_lock:
+            self._checkpoint_stores[output_table_name] = checkpoint_store
+        budget_reached = False
         try:
-            bulk_read_job = zoho.bulk_read.BulkReadJobBatch(
-                module_api_name=module_name,
-                destination_folder=table_def.full_path,
-                file_name=table_def.name,
-                field_names=field_names,
-                filtering_criteria=filtering_criteria,
-            )
+            with zoho.metrics.phase("download"):
+                bulk_read_job = self._read_small_query(module_name, table_def.full_path, field_names,
+                                                       filtering_criteria, watermark)
+                if bulk_read_job is None and config.get(KEY_PARTITIONING):
+                    bulk_read_job = zoho.partitioning.PartitionedBulkRead(
+                        module_api_name=module_name,
+                        destination_folder=table_def.full_path,
+                        file_name=table_def.name,
+                        field_names=field_names,
+                        filtering_criteria=filtering_criteria,
+                        max_concurrent_jobs=self.max_concurrent_jobs,
+                        job_slots=job_slots,
+                        polling_scheduler=polling_scheduler,
+                        checkpoint_store=checkpoint_store,
+                        result_cache=self.result_cache,
+                        watermark=watermark,
+                        client=self.client,
+                        compression_level=self.compression_level,
+                        **self._get_partitioning_options(config[KEY_PARTITIONING]),
+                    )
+                    bulk_read_job.download_all_partitions()
+                    budget_reached = bulk_read_job.budget_reached
+                elif bulk_read_job is None:
+                    bulk_read_job = zoho.bulk_read.BulkReadJobBatch(
+                        module_api_name=module_name,
+                        destination_folder=table_def.full_path,
+                        file_name=table_def.name,
+                        field_names=field_names,
+                        filtering_criteria=filtering_criteria,
+                        max_concurrent_jobs=self.max_concurrent_jobs,
+                        job_slots=job_slots,
+                        polling_scheduler=polling_scheduler,
+                        checkpoint_store=checkpoint_store,
+                        result_cache=self.result_cache,
+                        watermark=watermark,
+                        client=self.client,
+                        compression_level=self.compression_level,
+                    )
+                    bulk_read_job.download_all_pages()
+                    budget_reached = bulk_read_job.budget_reached
+        except Exception as e:
+            raise UserException(f"Failed to download data of module {module_name} from Zoho API.\nReason:\n"
+                                + str(e)) from e
+        if budget_reached:
+            self._defer_output_table(module_name, output_table_name, table_def.full_path)
+            return
+
+        if self.skip_unchanged_rows:
+            with zoho.metrics.phase("skip_unchanged_rows"):
+                self._skip_unchanged_rows(output_table_name, table_def.full_path, bulk_read_job.field_names)
+
+        if self.slice_size_bytes:
+            with zoho.metrics.phase("rebalance_slices"):
+                zoho.slicing.rebalance_slices(table_def.full_path, self.slice_size_bytes, self.compression_level)
+
+        data_types = None
+        if self.column_data_types or self.output_format == OUTPUT_FORMAT_PARQUET:
+            with zoho.metrics.phase("column_data_types"):
+                data_types = zoho.column_types.column_data_types(
+                    bulk_read_job.field_names, self.get_field_data_types(module_name), ID_COLUMN_NAME)
+
+        with zoho.metrics.phase("write_output"):
+            if self.output_format == OUTPUT_FORMAT_PARQUET:
+                self._write_parquet_files(output_table_name, table_def.full_path, data_types)
+            else:
+                table_def.columns = bulk_read_job.field_names
+                if data_types is not None:
+                    zoho.column_types.add_column_data_types(table_def.table_metadata, data_types)
+                self.write_manifest(table_def)
+        zoho.profiling.checkpoint(f"{output_table_name} output written")
+        if watermark is not None:
+            with self._state_lock:
+                self._watermarks[output_table_name] = watermark
+
+        if config.get(KEY_SYNC_DELETED_RECORDS):
+            with zoho.metrics.phase("deleted_records"):
+                self.process_deleted_records(config)
+
+    def _defer_output_table(self, module_name: str, output_table_name: str, table_folder: str):
+        """
+        Drops the incomplete output table of a module whose pages were not all read within the API credit budget.
+        Its previous state is kept together with the checkpoints of this run, so that the next run extracts it
+        again, reusing the bulk read jobs created by this one instead of spending credits on new ones.
+        """
+        shutil.rmtree(table_folder)
+        with self._state_lock:
+            self._deferred_tables.add(output_table_name)
+        logging.warning(f"API credit budget reached before all pages of module {module_name} were read, "
+                        f"output table {output_table_name} is not written. The next run extracts it again, "
+                        f"reusing the bulk read jobs created by this one.")
+
+    def process_deleted_records(self, config: dict):
+        """
+        Downloads Ids of the module's records deleted since the previous run into the `<output table>_deleted`
+        table, which is always loaded incrementally. Incremental pipelines can remove the deleted records
+        from the output table using it instead of periodically reloading the whole module.
+        """
+        module_name: str = config.get(KEY_MODULE_NAME)
+        output_table_name: str = config[KEY_OUTPUT_TABLE_NAME]
+        module_state: dict = self.statefile.get(KEY_STATE_MODULES, {}).get(output_table_name, {})
+        deleted_since = module_state.get(KEY_STATE_DELETED_RECORDS_WATERMARK) or module_state.get(KEY_STATE_LAST_RUN)
+
+        table_def = self.create_out_table_definition(
+            name=f"{output_table_name}{zoho.deleted_records.DELETED_RECORDS_TABLE_SUFFIX}.csv",
+            incremental=True,
+            primary_key=[ID_COLUMN_NAME],
+            is_sliced=True)
+        os.makedirs(table_def.full_path, exist_ok=True)
 
-            bulk_read_job.download_all_pages()
+        reader = zoho.deleted_records.DeletedRecordsReader(
+            module_api_name=module_name,
+            destination_folder=table_def.full_path,
+            deleted_since=deleted_since,
+            **self._session_option(),
+        )
+        try:
+            reader.download_all_records()
         except Exception as e:
-            raise UserException("Failed to download data from Zoho API.\nReason:\n" + str(e)) from e
+            raise UserException(f"Failed to download deleted records of module {module_name} from Zoho API."
+                                f"\nReason:\n{e}") from e
 
-        table_def.columns = bulk_read_job.field_names
+        table_def.columns = reader.columns
         self.write_manifest(table_def)
+        with self._state_lock:
+            self._deleted_records_watermarks[output_table_name] = reader.watermark
+
+    def _read_small_query(self, module_name: str, destination_folder: str, field_names: Optional[List[str]],
+                          filtering_criteria, watermark: Optional[zoho.watermark.WatermarkTracker] = None
+                          ) -> Optional[zoho.coql.CoqlRecordsReader]:
+        """
+        Reads the records through COQL if the query is eligible and matches at most `coql_max_records` records.
+        Returns the reader if it did, None if the records have to be read by bulk read jobs.
+        """
+        if not self.coql_max_records or not field_names or filtering_criteria is None:
+            return None
+        reader = zoho.coql.CoqlRecordsReader(
+            module_api_name=module_name,
+            destination_folder=destination_folder,
+            field_names=field_names,
+            filtering_criteria=filtering_criteria,
+            max_records=self.coql_max_records,
+            watermark=watermark,
+            compression_level=self.compression_level,
+            **self._session_option(),
+        )
+        return reader if reader.download_all_records() else None
+
+    def _session_option(self) -> dict:
+        """Readers of REST endpoints share the pooled session of the run."""
+        return {"session": self.session} if self.session is not None else {}
+
+    def _write_parquet_files(self, output_table_name: str, table_folder: str, data_types: Dict[str, str]):
+        """
+        Converts each slice of the output table into a Parquet file with typed columns, stored as a Storage file
+        tagged `zoho-parquet` and with the output table name. The table itself is not created.
+        """
+        os.makedirs(self.files_out_path, exist_ok=True)
+        row_count = 0
+        slice_file_names = sorted(os.listdir(table_folder))
+        for slice_file_name in slice_file_names:
+            file_def = self.create_out_file_definition(
+                f"{output_table_name}_{slice_file_name.split('.')[0]}{zoho.parquet.PARQUET_SUFFIX}",
+                tags=[PARQUET_FILE_TAG, output_table_name])
+            try:
+                row_count += zoho.parquet.write_parquet(os.path.join(table_folder, slice_file_name), data_types,
+                                                        file_def.full_path)
+            except Exception as e:
+                raise UserException(f"Failed to convert {slice_file_name} of output table {output_table_name} "
+                                    f"to Parquet.\nReason:\n{e}") from e
+            self.write_manifest(file_def)
+        shutil.rmtree(table_folder)
+        logging.info(f"Output table {output_table_name} written as {len(slice_file_names)} Parquet files "
+                     f"with {row_count} rows.")
+
+    def _skip_unchanged_rows(self, output_table_name: str, table_folder: str, field_names: List[str]):
+        """
+        Drops rows that did not change since they were last loaded from the output table's slices.
+        Uses the row hash index from the latest Storage file of the table tagged `zoho-row-hash-index`
+        (available through the file input mapping) and stores the updated index as a new such file.
+        """
+        if ID_COLUMN_NAME not in field_names:
+            logging.warning(f"Output table {output_table_name} has no {ID_COLUMN_NAME} column, "
+                            f"unchanged rows cannot be skipped.")
+            return
+
+        index_file = self.create_out_file_definition(
+            f"{output_table_name}{zoho.row_index.ROW_HASH_INDEX_FILE_SUFFIX}",
+            tags=[zoho.row_index.ROW_HASH_INDEX_TAG])
+        os.makedirs(self.files_out_path, exist_ok=True)
+        previous_index_files = [file_def for file_def in
+                                self.get_input_files_definitions(tags=[zoho.row_index.ROW_HASH_INDEX_TAG])
+                                if file_def.name == index_file.name]
+        if previous_index_files:
+            shutil.copyfile(previous_index_files[0].full_path, index_file.full_path)
+            logging.info(f"Skipping unchanged rows of output table {output_table_name} "
+                         f"using row hash index {index_file.name}.")
+        else:
+            logging.info(f"Row hash index {index_file.name} not found in input files, "
+                         f"all rows of output table {output_table_name} are kept and the index is created.")
+
+        row_hash_index = zoho.row_index.RowHashIndex(index_file.full_path, self.row_hash_ignored_fields)
+        try:
+            for slice_file_name in sorted(os.listdir(table_folder)):
+                row_hash_index.filter_slice(os.path.join(table_folder, slice_file_name), field_names, ID_COLUMN_NAME,
+                                            self.compression_level)
+        finally:
+            row_hash_index.close()
+        self.write_manifest(index_file)
+
+    def _get_partitioning_options(self, partitioning: dict) -> dict:
+        """
+        Translates the partitioning config into `PartitionedBulkRead` arguments: the datetime field and the initial
+        ranges, either between explicit boundaries or evenly spread from `start` until now.
+        """
+        import dateparser
+
+        partition_field = partitioning.get(KEY_PARTITION_FIELD_NAME)
+        if not partition_field:
+            raise UserException("Parameter field_name is mandatory in partitioning settings.")
+
+        try:
+            if partitioning.get(KEY_PARTITION_BOUNDARIES):
+                boundaries = [dateparser.parse(boundary, settings={"RETURN_AS_TIMEZONE_AWARE": True})
+                              for boundary in partitioning[KEY_PARTITION_BOUNDARIES]]
+            elif partitioning.get(KEY_PARTITION_START):
+                start = dateparser.parse(partitioning[KEY_PARTITION_START], settings={"RETURN_AS_TIMEZONE_AWARE": True})
+                boundaries = zoho.partitioning.even_boundaries(
+                    start=start,
+                    end=datetime.now(timezone.utc).astimezone(start.tzinfo),
+                    partitions=partitioning.get(KEY_PARTITION_INITIAL_PARTITIONS,
+                                                zoho.partitioning.DEFAULT_INITIAL_PARTITIONS))
+            else:
+                raise UserException("Either boundaries or start must be set in partitioning settings.")
+        except (TypeError, AttributeError) as e:
+            raise UserException(f"Invalid partitioning boundaries: {e}") from e
+
+        if any(boundary is None for boundary in boundaries):
+            raise UserException("Partitioning boundaries must be valid datetimes.")
+
+        min_partition_hours = partitioning.get(KEY_PARTITION_MIN_HOURS)
+        min_partition_seconds = (min_partition_hours * 60 * 60 if min_partition_hours
+                                 else zoho.partitioning.DEFAULT_MIN_PARTITION_SECONDS)
+
+        return {
+            "partition_field": partition_field,
+            "ranges": zoho.partitioning.ranges_from_boundaries(boundaries),
+            "min_partition_width": timedelta(seconds=min_partition_seconds),
+        }
+
+    def _checkpoint_changed(self):
+        """
+        Schedules writing the changed checkpoints into the state, at most once per
+        `CHECKPOINT_STATE_WRITE_INTERVAL_SECONDS`. The state is written by a timer thread, so that workers creating
+        and downloading jobs never wait for it. An interrupted run loses at most the progress of the last interval.
+        """
+        with self._state_lock:
+            if self._checkpoint_state_timer is not None:
+                return
+            delay = 0.0
+            if self._checkpoint_state_written_at is not None:
+                delay = max(self._checkpoint_state_written_at + CHECKPOINT_STATE_WRITE_INTERVAL_SECONDS - monotonic(),
+                            0.0)
+            self._checkpoint_state_timer = threading.Timer(delay, self._write_checkpoint_state)
+            self._checkpoint_state_timer.daemon = True
+            self._checkpoint_state_timer.start()
+
+    def _cancel_checkpoint_state_write(self):
+        with self._state_lock:
+            timer, self._checkpoint_state_timer = self._checkpoint_state_timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def _write_checkpoint_state(self):
+        """
+        Writes the state of a run in progress: the previous state with checkpoints of the output tables
+        being extracted, so that a rerun after an interruption can resume from them.
+        """
+        with self._state_file_lock:
+            with self._state_lock:
+                self._checkpoint_state_timer = None
+                self._checkpoint_state_written_at = monotonic()
+                modules_state: dict = dict(self.statefile.get(KEY_STATE_MODULES, {}))
+                for output_table_name, checkpoint_store in self._checkpoint_stores.items():
+                    modules_state[output_table_name] = {**modules_state.get(output_table_name, {}),
+                                                        KEY_STATE_CHECKPOINT: checkpoint_store.to_dict()}
+            self.write_state_file(self._with_shared_state({**self.statefile, KEY_STATE_MODULES: modules_state}))
+
+    def _build_state(self) -> dict:
+        """
+        Builds the new state: the global last run timestamp and one entry per output table,
+        entries of tables not extracted in this run are kept. Checkpoints of the extracted tables are dropped.
+        Watermarks of the extracted tables are updated, or kept if no records were extracted.
+        Watermarks of tables whose watermark is no longer tracked are dropped.
+        Entries of deferred tables (see `_defer_output_table`) are kept with the checkpoints of this run.
+        """
+        modules_state: dict = dict(self.statefile.get(KEY_STATE_MODULES, {}))
+        for config in self.module_configs:
+            output_table_name = config[KEY_OUTPUT_TABLE_NAME]
+            if output_table_name in self._deferred_tables:
+                modules_state[output_table_name] = {
+                    **modules_state.get(output_table_name, {}),
+                    KEY_STATE_CHECKPOINT: self._checkpoint_stores[output_table_name].to_dict()}
+                continue
+            module_state = {KEY_STATE_LAST_RUN: self.ts_start}
+            watermark = self._watermarks.get(output_table_name)
+            previous_watermark = modules_state.get(output_table_name, {}).get(KEY_STATE_WATERMARK)
+            if watermark is not None and watermark.value is not None:
+                module_state[KEY_STATE_WATERMARK] = {KEY_STATE_WATERMARK_FIELD_NAME: watermark.field_name,
+                                                     KEY_STATE_WATERMARK_VALUE: watermark.value}
+            elif previous_watermark and config.get(KEY_WATERMARK_FIELD):
+                module_state[KEY_STATE_WATERMARK] = previous_watermark
+            deleted_records_watermark = self._deleted_records_watermarks.get(output_table_name)
+            previous_deleted_records_watermark = modules_state.get(output_table_name, {}).get(
+                KEY_STATE_DELETED_RECORDS_WATERMARK)
+            if deleted_records_watermark is not None and deleted_records_watermark.value is not None:
+                module_state[KEY_STATE_DELETED_RECORDS_WATERMARK] = deleted_records_watermark.value
+            elif previous_deleted_records_watermark:
+                module_state[KEY_STATE_DELETED_RECORDS_WATERMARK] = previous_deleted_records_watermark
+            modules_state[output_table_name] = module_state
+        return self._with_shared_state({KEY_STATE_LAST_RUN: self.ts_start, KEY_STATE_MODULES: modules_state})
+
+    def _with_shared_state(self, state: dict) -> dict:
+        """Adds the caches and the current access token (reused by the next run) to the state."""
+        if self.result_cache is not None:
+            state = {**state, KEY_STATE_RESULT_CACHE: self.result_cache.to_dict()}
+        if self.metadata_cache is not None:
+            state = {**state, KEY_STATE_METADATA_CACHE: self.metadata_cache.to_dict()}
+        access_token, expiry_time = zoho.initialization.get_access_token()
+        if access_token:
+            state = {**state, KEY_STATE_ACCESS_TOKEN: json.dumps({
+                KEY_TOKEN_ACCESS_TOKEN: access_token,
+                KEY_TOKEN_EXPIRY_TIME: expiry_time,
+                KEY_TOKEN_FINGERPRINT: zoho.initialization.token_fingerprint(self.client_id, self.refresh_token),
+            })}
+        return state
 
     @staticmethod
     def validate_filtering_criteria(criteria: dict) -> None:
@@ -120,32 +632,80 @@ class ZohoCRMExtractor(ComponentBase):
             if key not in allowed_keys:
                 raise UserException(f"{key} is not a valid filter key.")
 
+    def get_fields(self, module_api_name: str, datetype: str = None) -> List[str]:
+        """Returns API names of the module's fields (of the data type, if set) from the metadata cache."""
+        fields = self.metadata_cache.get_fields(module_api_name, lambda: self._load_fields(module_api_name))
+        return [field[zoho.metadata.KEY_API_NAME] for field in fields
+                if not datetype or datetype == field[zoho.metadata.KEY_DATA_TYPE]]
+
+    def get_field_data_types(self, module_api_name: str) -> Dict[str, str]:
+        """Returns the data type of each of the module's fields by its API name from the metadata cache."""
+        fields = self.metadata_cache.get_fields(module_api_name, lambda: self._load_fields(module_api_name))
+        return {field[zoho.metadata.KEY_API_NAME]: field[zoho.metadata.KEY_DATA_TYPE] for field in fields}
+
+    def get_modules(self) -> List[str]:
+        return self.metadata_cache.get_modules(self._load_modules)
+
+    def _load_fields(self, module_api_name: str) -> List[dict]:
+        """Initializes the client on first use, metadata served from the cache do not need it."""
+        if not self._client_initialized:
+            self._init_client()
+        if self.client is not None:
+            return self._fetch_with_client(self.client.get_fields, module_api_name)
+        return self.fetch_fields(module_api_name)
+
+    def _load_modules(self) -> List[str]:
+        if not self._client_initialized:
+            self._init_client()
+        if self.client is not None:
+            return self._fetch_with_client(self.client.get_modules)
+        return self.fetch_modules()
+
     @staticmethod
-    def get_fields(module_api_name: str, datetype: str = None) -> list:
+    def _fetch_with_client(fetch, *args):
+        try:
+            return fetch(*args)
+        except RuntimeError as e:
+            raise UserException(str(e)) from e
+
+    @staticmethod
+    @zoho.initialization.retry_on_invalid_token
+    def fetch_fields(module_api_name: str) -> List[dict]:
+        from zcrmsdk.src.com.zoho.crm.api.fields import FieldsOperations
+        from zcrmsdk.src.com.zoho.crm.api import ParameterMap
+
         fields_operations = FieldsOperations(module_api_name)
         param_instance = ParameterMap()
 
         response = fields_operations.get_fields(param_instance)
 
+        if response.get_status_code() == 401:
+            raise zoho.initialization.InvalidTokenError("Access token was rejected.")
+
         if response.get_status_code() != 200:
             raise UserException(f"Cannot fetch the list of available Fields for module {module_api_name}. "
                                 f"Received status code: {response._APIResponse__status_code}")
 
         data = response.get_object()
 
-        field_names = [
-            field._Field__api_name
+        fields = [
+            {zoho.metadata.KEY_API_NAME: field._Field__api_name, zoho.metadata.KEY_DATA_TYPE: field._Field__data_type}
             for field in getattr(data, '_ResponseWrapper__fields', [])
-            if not datetype or (datetype and datetype == field._Field__data_type)
         ]
 
-        return field_names
+        return fields
 
     @staticmethod
-    def get_modules() -> list:
+    @zoho.initialization.retry_on_invalid_token
+    def fetch_modules() -> List[str]:
+        from zcrmsdk.src.com.zoho.crm.api.modules import ModulesOperations
+
         modules_operations = ModulesOperations()
         response = modules_operations.get_modules()
 
+        if response.get_status_code() == 401:
+            raise zoho.initialization.InvalidTokenError("Access token was rejected.")
+
         if response.get_status_code() != 200:
             raise UserException(f"Cannot fetch the list of available Modules. "
                                 f"Received status code: {response.__APIResponse__status_code}")
@@ -160,8 +720,17 @@ class ZohoCRMExtractor(ComponentBase):
         return module_names
 
     def _init_client(self):
+        self.session = zoho.http_session.create_session(
+            zoho.http_session.pool_size(self.max_concurrent_jobs, self.max_parallel_modules),
+            self.connection_stats,
+            scheduler=self.api_credits,
+        )
+        if self.client_backend == CLIENT_BACKEND_HTTP:
+            self._init_http_client()
+            return
         self.token_store_path = self.tmp_dir_path / TOKEN_STORE_FILE_NAME
-        zoho.initialization.set_filestore_file(self.token_store_path, "")
+        if not self._restore_access_token():
+            zoho.initialization.set_filestore_file(self.token_store_path, "")
         try:
             zoho.initialization.initialize(
                 client_id=self.client_id,
@@ -171,18 +740,77 @@ class ZohoCRMExtractor(ComponentBase):
                 user_email=self.user_email,
                 tmp_dir_path=self.tmp_dir_path,
                 file_store_path=self.token_store_path,
+                session=self.session,
             )
         except Exception as e:
             raise UserException(f"Zoho Python SDK initialization failed.\nReason:\n + {str(e)}") from e
+        self._client_initialized = True
+
+    def _init_http_client(self):
+        """Initializes the thin HTTP client instead of the SDK, reusing the access token of the previous run."""
+        token = self._previous_access_token() or {}
+        try:
+            self.client = zoho.client.ZohoClient(
+                region_code=self.zoho_datacenter,
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                refresh_token=self.refresh_token,
+                access_token=token.get(KEY_TOKEN_ACCESS_TOKEN),
+                expiry_time=token.get(KEY_TOKEN_EXPIRY_TIME),
+                session=self.session,
+            )
+        except ValueError as e:
+            raise UserException(f"Zoho client initialization failed.\nReason:\n{e}") from e
+        if token:
+            logging.info("Reusing the access token from the previous run.")
+        zoho.initialization.use_http_client(self.client)
+        self._client_initialized = True
+
+    def _previous_access_token(self) -> Optional[dict]:
+        """
+        Returns the access token of the previous run if it was issued for the same authorization
+        and is valid long enough, so that the run does not start by refreshing it.
+        """
+        try:
+            token: dict = json.loads(self.statefile.get(KEY_STATE_ACCESS_TOKEN) or "{}")
+        except (TypeError, ValueError):
+            return None
+        fingerprint = zoho.initialization.token_fingerprint(self.client_id, self.refresh_token)
+        if (not token.get(KEY_TOKEN_ACCESS_TOKEN) or token.get(KEY_TOKEN_FINGERPRINT) != fingerprint
+                or not zoho.initialization.is_token_reusable(token.get(KEY_TOKEN_EXPIRY_TIME))):
+            return None
+        return token
+
+    def _restore_access_token(self) -> bool:
+        """
+        Puts the access token of the previous run into the token store if it can be reused, see
+        `_previous_access_token`. Returns whether it did.
+        """
+        token = self._previous_access_token()
+        if token is None:
+            return False
+
+        zoho.initialization.set_filestore_token(
+            self.token_store_path,
+            user_email=self.user_email,
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            refresh_token=self.refresh_token,
+            access_token=token[KEY_TOKEN_ACCESS_TOKEN],
+            expiry_time=token[KEY_TOKEN_EXPIRY_TIME],
+        )
+        logging.info("Reusing the access token from the previous run.")
+        return True
 
     def _init_params(self):
         params: dict = self.configuration.parameters
-        self.module_records_download_config: dict = params[KEY_MODULE_RECORDS_DOWNLOAD_CONFIG]
+        self.module_records_download_config: dict = params.get(KEY_MODULE_RECORDS_DOWNLOAD_CONFIG, {})
 
         output_table_name = params.get(KEY_GROUP_DESTINATION, {}).get(KEY_OUTPUT_TABLE_NAME)
         if not output_table_name:
             output_table_name = self.module_records_download_config.get(KEY_MODULE_NAME)
-            logging.info(f"Custom output table name not set, defaulting to module name: {output_table_name}")
+            if output_table_name:
+                logging.info(f"Custom output table name not set, defaulting to module name: {output_table_name}")
         self.output_table_name = output_table_name
 
         oauth_credentials = self.configuration.oauth_credentials.data
@@ -204,18 +832,145 @@ class ZohoCRMExtractor(ComponentBase):
         if not self.zoho_datacenter:
             raise UserException("Parameter zoho_datacenter is mandatory.")
 
-        sync_options = params.get(KEY_GROUP_SYNC_OPTIONS)
-        self.filtering_criteria_dict = self._set_filters(sync_options)
+        self.module_configs: List[dict] = self._init_module_configs(params)
 
         load_mode: str = params.get(KEY_GROUP_DESTINATION, {}).get(KEY_LOAD_MODE, "full_load")
         self.incremental: bool = load_mode == "incremental"
 
+        self.skip_unchanged_rows: bool = params.get(KEY_GROUP_DESTINATION, {}).get(KEY_SKIP_UNCHANGED_ROWS, False)
+        if self.skip_unchanged_rows and not self.incremental:
+            logging.warning("Unchanged rows are only skipped in incremental load mode, all rows are loaded.")
+            self.skip_unchanged_rows = False
+        self.row_hash_ignored_fields: List[str] = params.get(KEY_GROUP_DESTINATION, {}).get(
+            KEY_ROW_HASH_IGNORED_FIELDS, zoho.row_index.DEFAULT_IGNORED_FIELDS)
+
+        advanced_options: dict = params.get(KEY_GROUP_ADVANCED_OPTIONS, {})
+        self.max_concurrent_jobs: int = advanced_options.get(KEY_MAX_CONCURRENT_JOBS,
+                                                             zoho.bulk_read.DEFAULT_MAX_CONCURRENT_JOBS)
+        if not isinstance(self.max_concurrent_jobs, int) or self.max_concurrent_jobs < 1:
+            raise UserException("Parameter max_concurrent_jobs must be a positive integer.")
+
+        job_timeout_minutes = advanced_options.get(KEY_JOB_TIMEOUT_MINUTES)
+        if job_timeout_minutes is None:
+            self.job_timeout_seconds: float = zoho.polling.DEFAULT_JOB_TIMEOUT_SECONDS
+        elif isinstance(job_timeout_minutes, (int, float)) and job_timeout_minutes > 0:
+            self.job_timeout_seconds: float = job_timeout_minutes * 60
+        else:
+            raise UserException("Parameter job_timeout_minutes must be a positive number.")
+
+        self.max_parallel_modules: int = advanced_options.get(KEY_MAX_PARALLEL_MODULES, DEFAULT_MAX_PARALLEL_MODULES)
+        if not isinstance(self.max_parallel_modules, int) or self.max_parallel_modules < 1:
+            raise UserException("Parameter max_parallel_modules must be a positive integer.")
+
+        self.client_backend: str = advanced_options.get(KEY_CLIENT_BACKEND, CLIENT_BACKEND_SDK)
+        if self.client_backend not in (CLIENT_BACKEND_SDK, CLIENT_BACKEND_HTTP):
+            raise UserException(f"Parameter client_backend must be either {CLIENT_BACKEND_SDK} "
+                                f"or {CLIENT_BACKEND_HTTP}.")
+
+        api_credit_budget = advanced_options.get(KEY_API_CREDIT_BUDGET)
+        if api_credit_budget is not None and (not isinstance(api_credit_budget, int) or api_credit_budget < 0):
+            raise UserException("Parameter api_credit_budget must be a non-negative integer.")
+        self.api_credits.budget = api_credit_budget or None
+
+        slice_size_mb = advanced_options.get(KEY_SLICE_SIZE_MB, 0)
+        if not isinstance(slice_size_mb, (int, float)) or slice_size_mb < 0:
+            raise UserException("Parameter slice_size_mb must be a non-negative number.")
+        self.slice_size_bytes: int = int(slice_size_mb * 1024 * 1024)
+
+        output_compression: str = advanced_options.get(KEY_OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_NONE)
+        if output_compression not in (OUTPUT_COMPRESSION_NONE, OUTPUT_COMPRESSION_GZIP):
+            raise UserException(f"Parameter output_compression must be either {OUTPUT_COMPRESSION_NONE} "
+                                f"or {OUTPUT_COMPRESSION_GZIP}.")
+        compression_level = advanced_options.get(KEY_COMPRESSION_LEVEL, zoho.slicing.DEFAULT_COMPRESSION_LEVEL)
+        if not isinstance(compression_level, int) or not 1 <= compression_level <= 9:
+            raise UserException("Parameter compression_level must be an integer between 1 and 9.")
+        self.output_format: str = advanced_options.get(KEY_OUTPUT_FORMAT, OUTPUT_FORMAT_CSV)
+        if self.output_format not in (OUTPUT_FORMAT_CSV, OUTPUT_FORMAT_PARQUET):
+            raise UserException(f"Parameter output_format must be either {OUTPUT_FORMAT_CSV} "
+                                f"or {OUTPUT_FORMAT_PARQUET}.")
+        if self.output_format == OUTPUT_FORMAT_PARQUET and not zoho.parquet.is_available():
+            raise UserException("Parquet output requires the pyarrow package, which is not installed.")
+        self.column_data_types: bool = advanced_options.get(KEY_COLUMN_DATA_TYPES, False)
+
+        # Slices are gzip compressed with this level, None writes them uncompressed
+        self.compression_level: Optional[int] = (compression_level if output_compression == OUTPUT_COMPRESSION_GZIP
+                                                 else None)
+
+        self.coql_max_records: int = advanced_options.get(KEY_COQL_MAX_RECORDS, 0)
+        if (not isinstance(self.coql_max_records, int) or self.coql_max_records < 0
+                or self.coql_max_records > zoho.coql.COQL_MAX_OFFSET):
+            raise UserException(f"Parameter coql_max_records must be an integer between 0 "
+                                f"and {zoho.coql.COQL_MAX_OFFSET}.")
+
         # Create directory for temporary data (Zoho SDK logging and token store)
         data_dir_path = Path(self.data_folder_path)
         self.tmp_dir_path = data_dir_path / TMP_DATA_DIR_NAME
         self.tmp_dir_path.mkdir(parents=True, exist_ok=True)
 
-    def _set_filters(self, sync_options: dict) -> dict:
+        metadata_cache_ttl_minutes = advanced_options.get(KEY_METADATA_CACHE_TTL_MINUTES)
+        if metadata_cache_ttl_minutes is None:
+            metadata_cache_ttl_seconds = zoho.metadata.DEFAULT_METADATA_CACHE_TTL_SECONDS
+        elif isinstance(metadata_cache_ttl_minutes, (int, float)) and metadata_cache_ttl_minutes >= 0:
+            metadata_cache_ttl_seconds = metadata_cache_ttl_minutes * 60
+        else:
+            raise UserException("Parameter metadata_cache_ttl_minutes must be a non-negative number.")
+        self.metadata_cache = zoho.metadata.MetadataCache.from_dict(
+            self.statefile.get(KEY_STATE_METADATA_CACHE),
+            scope=zoho.metadata.metadata_scope(self.zoho_datacenter, self.user_email),
+            ttl_seconds=metadata_cache_ttl_seconds,
+        )
+        if advanced_options.get(KEY_INVALIDATE_METADATA_CACHE, False):
+            self.metadata_cache.invalidate()
+
+        result_cache_ttl_minutes = advanced_options.get(KEY_RESULT_CACHE_TTL_MINUTES, 0)
+        if not isinstance(result_cache_ttl_minutes, (int, float)) or result_cache_ttl_minutes < 0:
+            raise UserException("Parameter result_cache_ttl_minutes must be a non-negative number.")
+        if result_cache_ttl_minutes:
+            self.result_cache = zoho.result_cache.BulkReadResultCache.from_dict(
+                self.statefile.get(KEY_STATE_RESULT_CACHE),
+                ttl_seconds=result_cache_ttl_minutes * 60,
+                slice_dir=self.tmp_dir_path / RESULT_CACHE_DIR_NAME,
+            )
+
+    def _init_module_configs(self, params: dict) -> List[dict]:
+        """
+        Resolves module records download configs to be processed in this run. Either the single
+        `module_records_download_config` or each item of `module_records_download_configs`, items may override
+        the global `sync_options` and set their own `output_table_name` (defaults to the module name).
+        """
+        default_sync_options: dict = params.get(KEY_GROUP_SYNC_OPTIONS, {})
+
+        module_configs = []
+        if self.module_records_download_config:
+            module_configs.append({
+                **self.module_records_download_config,
+                KEY_OUTPUT_TABLE_NAME: self.output_table_name,
+                KEY_FILTERING_CRITERIA: self._set_filters(default_sync_options, self.output_table_name),
+                KEY_WATERMARK_FIELD: self._get_watermark_field(
+                    default_sync_options, self.module_records_download_config),
+            })
+
+        for config in params.get(KEY_MODULE_RECORDS_DOWNLOAD_CONFIGS, []):
+            module_name = config.get(KEY_MODULE_NAME)
+            if not module_name:
+                raise UserException("Parameter module_name is mandatory in each module records download config.")
+            output_table_name = config.get(KEY_OUTPUT_TABLE_NAME) or module_name
+            sync_options = config.get(KEY_GROUP_SYNC_OPTIONS, default_sync_options)
+            module_configs.append({
+                **config,
+                KEY_OUTPUT_TABLE_NAME: output_table_name,
+                KEY_FILTERING_CRITERIA: self._set_filters(sync_options, output_table_name),
+                KEY_WATERMARK_FIELD: self._get_watermark_field(sync_options, config),
+            })
+
+        output_table_names = [config[KEY_OUTPUT_TABLE_NAME] for config in module_configs]
+        if len(set(output_table_names)) != len(output_table_names):
+            raise UserException(f"Output table names of module records download configs must be unique, "
+                                f"got: {', '.join(output_table_names)}.")
+
+        return module_configs
+
+    def _set_filters(self, sync_options: dict, output_table_name: str) -> dict:
         sync_mode = sync_options.get(KEY_SYNC_MODE)
 
         if sync_mode == "full_sync":
@@ -224,28 +979,63 @@ class ZohoCRMExtractor(ComponentBase):
             filtering_criteria_dict = sync_options.get(KEY_FILTERING_CRITERIA)
             self.validate_filtering_criteria(filtering_criteria_dict)
         elif sync_mode == "incremental_sync":
-            filtering_criteria_dict = self._get_incremental_sync_filter(sync_options)
+            filtering_criteria_dict = self._get_incremental_sync_filter(sync_options, output_table_name)
         else:
             raise UserException(f"Unsupported sync_mode: {sync_mode}")
 
         return filtering_criteria_dict
 
-    def _get_incremental_sync_filter(self, sync_options: dict) -> dict:
+    @staticmethod
+    def _get_watermark_field(sync_options: dict, config: dict) -> Optional[str]:
+        """
+        Returns the incremental field if the sync continues from the last run and the field is extracted,
+        its watermark is tracked then. Selected fields are not extended by it, as that would change the output table.
+        """
+        if sync_options.get(KEY_SYNC_MODE) != "incremental_sync" or sync_options.get("value") != "last_run":
+            return None
+        incremental_field = sync_options.get(KEY_INCREMENTAL_FIELD)
+        field_names: Optional[List[str]] = config.get(KEY_FIELD_NAMES)
+        if incremental_field and field_names and incremental_field not in field_names:
+            logging.warning(f"Incremental field {incremental_field} is not among the selected fields of module "
+                            f"{config.get(KEY_MODULE_NAME)}, its watermark is not tracked and the next run continues "
+                            f"from the start of this one. Select the field to continue from the watermark.")
+            return None
+        return incremental_field
+
+    def _get_incremental_sync_filter(self, sync_options: dict, output_table_name: str) -> dict:
         value = sync_options.get("value")
-
-        if value == "last_run":
-            timestamp = self.statefile.get("last_run")
+        incremental_field = sync_options.get(KEY_INCREMENTAL_FIELD)
+        watermark = (self.statefile.get(KEY_STATE_MODULES, {}).get(output_table_name, {})
+                     .get(KEY_STATE_WATERMARK, {}))
+
+        if value == "last_run" and watermark.get(KEY_STATE_WATERMARK_FIELD_NAME) == incremental_field \
+                and watermark.get(KEY_STATE_WATERMARK_VALUE):
+            overlap_minutes = sync_options.get(KEY_WATERMARK_OVERLAP_MINUTES, 0)
+            if not isinstance(overlap_minutes, (int, float)) or overlap_minutes < 0:
+                raise UserException("Parameter watermark_overlap_minutes must be a non-negative number.")
+            watermark_value = watermark[KEY_STATE_WATERMARK_VALUE]
+            timestamp = zoho.watermark.lower_bound(watermark_value, timedelta(minutes=overlap_minutes))
+            logging.info(f"Using watermark of {incremental_field} from statefile: {watermark_value}, "
+                         f"lower bound with overlap of {overlap_minutes} minutes: {timestamp}")
+        elif value == "last_run":
+            if KEY_STATE_MODULES in self.statefile:
+                timestamp = self.statefile[KEY_STATE_MODULES].get(output_table_name, {}).get(KEY_STATE_LAST_RUN)
+            else:
+                # State written before per-module entries were introduced
+                timestamp = self.statefile.get(KEY_STATE_LAST_RUN)
             if not timestamp:
                 logging.warning("Last run timestamp not found in statefile, performing full sync.")
                 return {}
             else:
                 logging.info(f"Using timestamp from statefile: {timestamp}")
         else:
+            import dateparser
+
             value = dateparser.parse(value)
             timestamp = self._format_datetime_with_offset(value)
 
         return {
-            "field_name": sync_options.get("incremental_field"),
+            "field_name": incremental_field,
             "comparator": sync_options.get("operator"),
             "value": timestamp
         }
@@ -271,9 +1061,8 @@ class ZohoCRMExtractor(ComponentBase):
 
     def _list_fields(self, datetype: str = None) -> List[SelectElement]:
         self._init_params()
-        self._init_client()
 
-        module_name = self.module_records_download_config[KEY_MODULE_NAME]
+        module_name = self.module_records_download_config.get(KEY_MODULE_NAME)
         if not module_name:
             raise UserException("To list available fields, module_name parameter must be set.")
 
@@ -286,7 +1075,6 @@ class ZohoCRMExtractor(ComponentBase):
     @sync_action("listModules")
     def list_modules(self) -> List[SelectElement]:
         self._init_params()
-        self._init_client()
 
         modules = self.get_modules()
         if not modules:
@@ -309,8 +1097,9 @@ class ZohoCRMExtractor(ComponentBase):
 if __name__ == "__main__":
     try:
         comp = ZohoCRMExtractor()
-        # this triggers the run method by default and is controlled by the configuration.action parameter
-        comp.execute_action()
+        with comp.profiled():
+            # this triggers the run method by default and is controlled by the configuration.action parameter
+            comp.execute_action()
     except UserException as exc:
         logging.exception(exc)
         exit(1)
@@ -0,0 +1,198 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+# API credits Zoho charges per call, see https://www.zoho.com/crm/developer/docs/api/v2/api-limits.html
+BULK_READ_CREATE_CREDITS = 50
+DEFAULT_REQUEST_CREDITS = 1
+BULK_READ_PATH = "/crm/bulk/v2/read"
+# Requests for OAuth tokens are not charged
+ACCOUNTS_HOST_PREFIX = "accounts."
+
+# Once this share of the budget is spent, jobs are polled less often
+BUDGET_SLOWDOWN_RATIO = 0.8
+SLOW_POLLING_FACTOR = 4.0
+
+RATE_LIMIT_STATUS_CODE = 429
+RATE_LIMIT_REMAINING_HEADER = "X-RATELIMIT-REMAINING"
+RATE_LIMIT_RESET_HEADER = "X-RATELIMIT-RESET"
+RETRY_AFTER_HEADER = "Retry-After"
+DEFAULT_RATE_LIMIT_WAIT_SECONDS = 60.0
+MAX_RATE_LIMIT_WAIT_SECONDS = 5 * 60.0
+MAX_RATE_LIMITED_ATTEMPTS = 5
+
+UNATTRIBUTED_TABLE = "(other)"
+
+# Output table whose extraction the calls of the current context are made for, see `attributed_to`
+current_output_table: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_output_table", default=UNATTRIBUTED_TABLE)
+# Reservation of the bulk read job created in the current context, see `ApiCreditScheduler.job_reserved`
+current_job_reservation: contextvars.ContextVar[Optional["JobReservation"]] = contextvars.ContextVar(
+    "current_job_reservation", default=None)
+
+
+@dataclass(slots=True)
+class JobReservation:
+    """Credits reserved for creating a bulk read job, spent by the first job creation request charged."""
+    spent: bool = False
+
+
+def request_credits(method: str, url: str) -> int:
+    parsed = urlparse(url)
+    if parsed.hostname and parsed.hostname.startswith(ACCOUNTS_HOST_PREFIX):
+        return 0
+    if method.upper() == "POST" and parsed.path.rstrip("/") == BULK_READ_PATH:
+        return BULK_READ_CREATE_CREDITS
+    return DEFAULT_REQUEST_CREDITS
+
+
+def rate_limit_wait(response: requests.Response) -> Optional[float]:
+    """
+    Returns the number of seconds to wait before the next request if the response says the rate limit
+    was hit (status 429) or is exhausted (no remaining requests), None otherwise.
+    """
+    remaining = response.headers.get(RATE_LIMIT_REMAINING_HEADER)
+    if response.status_code != RATE_LIMIT_STATUS_CODE and remaining != "0":
+        return None
+    wait = _header_seconds(response.headers.get(RETRY_AFTER_HEADER))
+    if wait is None:
+        wait = _header_seconds(response.headers.get(RATE_LIMIT_RESET_HEADER))
+    if wait is None:
+        wait = DEFAULT_RATE_LIMIT_WAIT_SECONDS
+    return min(max(wait, 0.0), MAX_RATE_LIMIT_WAIT_SECONDS)
+
+
+def _header_seconds(value: Optional[str]) -> Optional[float]:
+    """Reads a reset time given either as seconds from now or as an epoch timestamp in seconds or milliseconds."""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    if seconds > 1e12:
+        return seconds / 1000 - time.time()
+    if seconds > 1e9:
+        return seconds - time.time()
+    return seconds
+
+
+@contextlib.contextmanager
+def attributed_to(output_table_name: str) -> Iterator[None]:
+    """
+    Attributes API calls made within the context to the extraction of a module into the output table
+    (one module may be extracted into several tables). Threads do not inherit the context,
+    tasks submitted to executors have to run in a copy of it (`contextvars.copy_context().run`).
+    """
+    token = current_output_table.set(output_table_name)
+    try:
+        yield
+    finally:
+        current_output_table.reset(token)
+
+
+@dataclass(slots=True)
+class ApiCreditScheduler:
+    """
+    Central scheduler of all API calls of a run (see `zoho.http_session.CountingHTTPAdapter`). Counts API credits
+    spent per output table and honours rate limits reported by the API: requests wait until the limit resets and
+    rate limited requests are repeated.
+
+    With a `budget`, bulk read jobs are only created if their credits are reserved first (see `job_reserved`),
+    which fails once they would exceed the budget. Calls for jobs already created are not limited, so that
+    their results are not lost. Jobs are polled less often once most of the budget is spent.
+    """
+    budget: Optional[int] = None
+    credits_by_table: Dict[str, int] = field(default_factory=dict)
+    calls_by_table: Dict[str, int] = field(default_factory=dict)
+    _rate_limited_until: float = 0.0
+    _reserved_credits: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def credits_spent(self) -> int:
+        with self._lock:
+            return sum(self.credits_by_table.values())
+
+    def is_near_budget(self) -> bool:
+        return bool(self.budget) and self.credits_spent >= self.budget * BUDGET_SLOWDOWN_RATIO
+
+    def polling_factor(self) -> float:
+        """Multiplier of polling intervals, polling slows down near the budget."""
+        return SLOW_POLLING_FACTOR if self.is_near_budget() else 1.0
+
+    @contextlib.contextmanager
+    def job_reserved(self) -> Iterator[bool]:
+        """
+        Reserves the credits of creating a bulk read job within the context. Yields False and reserves nothing
+        if they would exceed the budget together with the credits spent and reserved for jobs being created.
+        """
+        with self._lock:
+            reserved = not self.budget or (sum(self.credits_by_table.values()) + self._reserved_credits
+                                           + BULK_READ_CREATE_CREDITS <= self.budget)
+            if reserved:
+                self._reserved_credits += BULK_READ_CREATE_CREDITS
+        if not reserved:
+            yield False
+            return
+        reservation = JobReservation()
+        token = current_job_reservation.set(reservation)
+        try:
+            yield True
+        finally:
+            current_job_reservation.reset(token)
+            if not reservation.spent:
+                with self._lock:
+                    self._reserved_credits -= BULK_READ_CREATE_CREDITS
+
+    def charge(self, method: str, url: str):
+        """Charges the credits of a request to the current output table, called once before each request is sent."""
+        credits = request_credits(method, url)
+        reservation = current_job_reservation.get() if credits == BULK_READ_CREATE_CREDITS else None
+        with self._lock:
+            if reservation is not None and not reservation.spent:
+                reservation.spent = True
+                self._reserved_credits -= credits
+            output_table = current_output_table.get()
+            self.credits_by_table[output_table] = self.credits_by_table.get(output_table, 0) + credits
+            if credits:
+                self.calls_by_table[output_table] = self.calls_by_table.get(output_table, 0) + 1
+
+    def observe(self, response: requests.Response) -> bool:
+        """
+        Registers the rate limit reported by the response, so that following requests wait for its reset.
+        Returns whether the request was rate limited and should be repeated.
+        """
+        wait = rate_limit_wait(response)
+        if wait is None:
+            return False
+        with self._lock:
+            self._rate_limited_until = max(self._rate_limited_until, time.monotonic() + wait)
+        logging.warning(f"Zoho API rate limit reached, waiting {wait:.0f} seconds before the next request.")
+        return response.status_code == RATE_LIMIT_STATUS_CODE
+
+    def wait_for_rate_limit(self):
+        with self._lock:
+            wait = self._rate_limited_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def usage_by_table(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Returns the number of API calls (token requests are not counted) and the credits spent per output table.
+        """
+        with self._lock:
+            return dict(self.calls_by_table), dict(self.credits_by_table)
+
+    def report(self) -> str:
+        with self._lock:
+            per_table = ", ".join(f"{output_table}: {credits}"
+                                  for output_table, credits in sorted(self.credits_by_table.items()))
+            total = sum(self.credits_by_table.values())
+        budget = f" of the budget of {self.budget}" if self.budget else ""
+        return f"API credits used: {total}{budget} ({per_table or 'no calls'})"
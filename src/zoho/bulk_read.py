@@ -1,29 +1,34 @@
+import contextlib
+import contextvars
 import csv
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
 import os
-from time import sleep
+import shutil
+import tempfile
+import threading
+from time import monotonic, sleep
 import zipfile
 import logging
-from typing import List, Literal, Optional, Union
-
-import dateparser
-
-from zcrmsdk.src.com.zoho.crm.api.bulk_read import (
-    BulkReadOperations,
-    RequestWrapper,
-    ResponseWrapper,
-    # CallBack,
-    Query,
-    Criteria,
-    ActionWrapper,
-    SuccessResponse,
-    APIException,
-    JobDetail,
-    FileBodyWrapper
-)
-
-from zcrmsdk.src.com.zoho.crm.api.util import Choice
-from zcrmsdk.src.com.zoho.crm.api.util import APIResponse
+from typing import TYPE_CHECKING, BinaryIO, Iterable, List, Literal, Optional, Set, Union
+
+from zoho import metrics, profiling
+from zoho.checkpoint import KEY_MORE_RECORDS, KEY_SLICE, CheckpointStore, QueryCheckpoint
+from zoho.client import ZohoClient
+from zoho.column_layout import ColumnDrift, ColumnLayout, copy_remapped_records
+from zoho.initialization import InvalidTokenError, retry_on_invalid_token
+from zoho.polling import PollingScheduler
+from zoho import result_cache
+from zoho.result_cache import BulkReadResultCache, page_fingerprint
+from zoho.retry import RetryPolicy, TruncatedResultError, is_retryable, raise_for_transient_status
+from zoho.metrics import ModuleMetrics, PageMetrics
+from zoho.slicing import RecordCounter, compressing_writer, is_compressed, slice_file_name
+from zoho.watermark import WatermarkTracker
+
+if TYPE_CHECKING:
+    from zcrmsdk.src.com.zoho.crm.api.bulk_read import APIException, Criteria, JobDetail, SuccessResponse
 
 # Module records download configs simple filtering criteria keys
 KEY_FIELD_NAME = "field_name"
@@ -36,10 +41,21 @@ KEY_GROUP = "group"
 KEY_GROUP_OPERATOR = "group_operator"
 
 # Other constants
-POLLING_PERIOD_SECONDS = 8
+DEFAULT_MAX_CONCURRENT_JOBS = 1
+RESUMABLE_JOB_STATES = ("ADDED", "QUEUED", "IN PROGRESS", "COMPLETED")
+ZIP_SPOOL_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+# Suffix of a slice being written, it gets its name only once the whole result is extracted
+PARTIAL_SLICE_SUFFIX = ".part"
+# Code of API errors caused by an expired or revoked access token
+INVALID_TOKEN_CODE = "INVALID_TOKEN"
 
 
-def print_criteria(criteria: Criteria):  # TODO: change to str generating function
+class UnavailableJobResultError(RuntimeError):
+    """The result of a bulk read job created earlier cannot be downloaded, e.g. as Zoho no longer keeps it."""
+
+
+def print_criteria(criteria: "Criteria"):  # TODO: change to str generating function
     if criteria.get_api_name() is not None:
         # Get the API Name of the Criteria
         logging.debug("BulkRead Criteria API Name: " + criteria.get_api_name())
@@ -69,7 +85,79 @@ def print_criteria(criteria: Criteria):  # TODO: change to str generating functi
         )
 
 
-def handle_api_exception(api_exception: APIException):
+def log_action_response(action_response: Union["SuccessResponse", "APIException"]):
+    """Logs the response of the SDK to a bulk read job creation, meant to be called only if debug logging is enabled."""
+    details = ", ".join(f"{key}: {value}" for key, value in action_response.get_details().items())
+    logging.debug(f"Status: {action_response.get_status().get_value()}, "
+                  f"Code: {action_response.get_code().get_value()}, Details: {details}, "
+                  f"Message: {action_response.get_message().get_value()}")
+
+
+def log_job_detail(job_detail: "JobDetail"):
+    """Logs all details of a bulk read job returned by the SDK, meant to be called only if debug logging is enabled."""
+    logging.debug(f"Bulk read Job ID: {job_detail.get_id()}, Operation: {job_detail.get_operation()}, "
+                  f"State: {job_detail.get_state().get_value()}")
+
+    result = job_detail.get_result()
+    if result is not None:
+        logging.debug(f"Bulkread Result Page: {result.get_page()}, Count: {result.get_count()}, "
+                      f"Download URL: {result.get_download_url()}, Per_Page: {result.get_per_page()}, "
+                      f"MoreRecords: {result.get_more_records()}")
+
+    query = job_detail.get_query()
+    if query is not None:
+        logging.debug(f"Bulk read Query Module: {query.get_module()}, Page: {query.get_page()}, "
+                      f"cvid: {query.get_cvid()}, fields: {query.get_fields()}")
+
+        criteria = query.get_criteria()
+        if criteria is not None:
+            print_criteria(criteria)
+
+        created_by = job_detail.get_created_by()
+        if created_by is not None:
+            logging.debug(f"Bulkread Created By - Name: {created_by.get_name()}, ID: {created_by.get_id()}")
+
+        logging.debug(f"Bulkread CreatedTime: {job_detail.get_created_time()}, "
+                      f"File Type: {job_detail.get_file_type()}")
+
+
+def copy_csv_body(csv_stream: BinaryIO, destination: BinaryIO, watermark: Optional[WatermarkTracker] = None,
+                  column_layout: Optional[ColumnLayout] = None) -> List[str]:
+    """
+    Copies a CSV from `csv_stream` to `destination` without its header line and returns the parsed header.
+    The body is copied byte for byte, rows are neither parsed nor re-quoted.
+    Header (field API names) never contains line breaks, so it always ends with the first line.
+    With a `watermark`, its field is observed in the records while they are copied.
+    With a `column_layout`, the header fixes its columns unless they are fixed already. Records of a CSV whose
+    header differs from them are remapped onto them while copied (see `copy_remapped_records`).
+    """
+    header_line = csv_stream.readline().decode("utf-8-sig")
+    field_names = next(csv.reader([header_line]), [])
+    mapping = column_layout.mapping(field_names) if column_layout is not None else None
+    columns = column_layout.columns if column_layout is not None else field_names
+    tap = watermark.tap(columns, destination) if watermark is not None else None
+    if mapping is None:
+        shutil.copyfileobj(csv_stream, tap or destination, COPY_BUFFER_SIZE)
+    else:
+        copy_remapped_records(csv_stream, tap or destination, mapping)
+    if tap is not None:
+        tap.close()
+    return field_names
+
+
+class ChecksumWriter:
+    """Binary file wrapper computing the SHA-256 checksum of everything written through it."""
+
+    def __init__(self, destination: BinaryIO):
+        self.destination = destination
+        self.checksum = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.checksum.update(data)
+        return self.destination.write(data)
+
+
+def handle_api_exception(api_exception: "APIException"):
     # Get the Status
     logging.debug("Status: " + api_exception.get_status().get_value())
 
@@ -91,7 +179,8 @@ def handle_api_exception(api_exception: APIException):
     logging.debug("Message: " + api_exception.get_message().get_value())
 
     # Raise an exception
-    raise RuntimeError(
+    error = InvalidTokenError if api_exception.get_code().get_value() == INVALID_TOKEN_CODE else RuntimeError
+    raise error(
         f"API did not accept the request to get details of a bulk read job.\n"
         f"Status: {api_exception.get_status().get_value()}\n"
         f"Code: {api_exception.get_code().get_value()}\n"
@@ -119,6 +208,9 @@ class BulkReadJobFilteringCriterion:
 
     @classmethod
     def from_dict(cls, dict: dict):
+        # Imported on demand, dateparser takes long to import and most filters do not need it
+        import dateparser
+
         def parse(value):
             return dateparser.parse(value).isoformat(timespec="seconds")
 
@@ -140,7 +232,7 @@ class BulkReadJobFilteringCriterion:
 
 @dataclass(slots=True, frozen=True)
 class BulkReadJobFilteringCriteriaGroup:
-    group: List[BulkReadJobFilteringCriterion]
+    group: List[Union[BulkReadJobFilteringCriterion, "BulkReadJobFilteringCriteriaGroup"]]
     group_operator: Literal["and", "or"]
 
     @classmethod
@@ -158,7 +250,10 @@ def create_query_criteria_object(
     filtering_criteria: Union[
         BulkReadJobFilteringCriterion, BulkReadJobFilteringCriteriaGroup
     ]
-) -> Criteria:
+) -> "Criteria":
+    from zcrmsdk.src.com.zoho.crm.api.bulk_read import Criteria
+    from zcrmsdk.src.com.zoho.crm.api.util import Choice
+
     if isinstance(filtering_criteria, BulkReadJobFilteringCriterion):
         # Get instance of Criteria Class
         criteria = Criteria()
@@ -198,6 +293,112 @@ def create_query_criteria_object(
         )
 
 
+def criteria_dict(
+    filtering_criteria: Union[
+        BulkReadJobFilteringCriterion, BulkReadJobFilteringCriteriaGroup
+    ]
+) -> dict:
+    """Returns the filtering criteria in the JSON layout of the bulk read API."""
+    if isinstance(filtering_criteria, BulkReadJobFilteringCriterion):
+        return {
+            "api_name": filtering_criteria.field_name,
+            "comparator": filtering_criteria.comparator,
+            "value": filtering_criteria.value,
+        }
+    elif isinstance(filtering_criteria, BulkReadJobFilteringCriteriaGroup):
+        return {
+            "group_operator": filtering_criteria.group_operator,
+            "group": [criteria_dict(filtering_criterion) for filtering_criterion in filtering_criteria.group],
+        }
+    else:
+        raise ValueError(
+            "Argument filtering_criteria must be an instance of"
+            " BulkReadJobFilteringCriterion or BulkReadJobFilteringCriteriaGroup."
+        )
+
+
+def bulk_read_query(
+    module_api_name: str,
+    field_names: Optional[List[str]],
+    page: int,
+    filtering_criteria: Optional[
+        Union[BulkReadJobFilteringCriterion, BulkReadJobFilteringCriteriaGroup]
+    ],
+) -> dict:
+    """Returns the query of a bulk read job in the JSON layout of the bulk read API."""
+    query = {"module": module_api_name, "page": page}
+    if field_names:
+        query["fields"] = field_names
+    if filtering_criteria:
+        query["criteria"] = criteria_dict(filtering_criteria)
+    return query
+
+
+@dataclass(slots=True, frozen=True)
+class JobStatus:
+    """
+    Status of a bulk read job parsed from its details: its state and, once it is completed, the result info.
+    `more_records` is None until the result is known.
+    """
+    state: str
+    page: Optional[int] = None
+    count: Optional[int] = None
+    per_page: Optional[int] = None
+    more_records: Optional[bool] = None
+    download_url: Optional[str] = None
+
+    @property
+    def is_completed(self) -> bool:
+        return self.state == "COMPLETED"
+
+    @classmethod
+    def from_dict(cls, job_detail: dict) -> "JobStatus":
+        """Parses job details in the layout of the API (see `ZohoClient.get_bulk_read_job`)."""
+        result = job_detail.get("result")
+        if result is None:
+            return cls(state=job_detail["state"])
+        return cls(state=job_detail["state"], page=result.get("page"), count=result.get("count"),
+                   per_page=result.get("per_page"), more_records=result.get("more_records", False),
+                   download_url=result.get("download_url"))
+
+    @classmethod
+    def from_job_detail(cls, job_detail: "JobDetail") -> "JobStatus":
+        """Parses job details returned by the SDK."""
+        state = job_detail.get_state().get_value()
+        result = job_detail.get_result()
+        if result is None:
+            return cls(state=state)
+        return cls(state=state, page=result.get_page(), count=result.get_count(), per_page=result.get_per_page(),
+                   more_records=result.get_more_records(), download_url=result.get_download_url())
+
+
+@dataclass(slots=True, frozen=True)
+class DownloadedSlice:
+    file_name: str
+    checksum: str
+    bytes_downloaded: int = 0
+    rows: int = 0
+    extract_seconds: float = 0.0
+    # How the header of the result differed from the columns of the slices, if it did
+    column_drift: Optional[ColumnDrift] = None
+
+
+def query_fingerprint(
+    module_api_name: str,
+    field_names: Optional[List[str]],
+    filtering_criteria: Optional[
+        Union[BulkReadJobFilteringCriterion, BulkReadJobFilteringCriteriaGroup]
+    ],
+) -> str:
+    """Returns a canonical hash of everything that determines the records returned by a bulk read job."""
+    query = {
+        "module": module_api_name,
+        "fields": field_names,
+        "criteria": asdict(filtering_criteria) if filtering_criteria is not None else None,
+    }
+    return hashlib.sha256(json.dumps(query, sort_keys=True).encode("utf-8")).hexdigest()
+
+
 @dataclass(slots=True)
 class BulkReadJobBatch:
     module_api_name: str
@@ -209,28 +410,336 @@ class BulkReadJobBatch:
     ] = None
     _current_page: int = 1
     _current_job_id: Optional[int] = None
-    _current_job_state: Optional[
-        Literal["ADDED", "QUEUED", "IN PROGRESS", "COMPLETED"]
-    ] = None
     _more_pages: bool = True
-
-    def download_all_pages(self):  # TODO: Add support for parallel downloads of pages
-        while self._more_pages:
+    max_concurrent_jobs: int = DEFAULT_MAX_CONCURRENT_JOBS
+    job_slots: Optional[threading.BoundedSemaphore] = None
+    polling_scheduler: PollingScheduler = field(default_factory=PollingScheduler)
+    checkpoint_store: Optional[CheckpointStore] = None
+    result_cache: Optional[BulkReadResultCache] = None
+    watermark: Optional[WatermarkTracker] = None
+    client: Optional[ZohoClient] = None
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    compression_level: Optional[int] = None
+    column_layout: Optional[ColumnLayout] = None
+    # Set if pages were left unread as creating their jobs would exceed the API credit budget
+    budget_reached: bool = False
+    _checkpoint: Optional[QueryCheckpoint] = None
+    _fingerprint: Optional[str] = None
+    _metrics: Optional[ModuleMetrics] = None
+    _page_metrics: Optional[PageMetrics] = None
+    _reused_job_ids: Set[int] = field(default_factory=set)
+
+    def download_all_pages(self, stop_if_more_pages: bool = False) -> bool:
+        """
+        Creates, polls and downloads bulk read jobs for all pages of the module.
+
+        Pages are pipelined: as soon as a page's job is completed and reports more records,
+        the job for the next page is created while the completed page is downloaded in the background.
+        The number of jobs created but not yet downloaded is capped by `max_concurrent_jobs`
+        (or by the shared `job_slots` semaphore, if given), so with the default of 1 the pages
+        are processed strictly one after another.
+
+        If `stop_if_more_pages` is set and the first page reports more records, nothing is downloaded
+        and False is returned, so that the caller can split the query into smaller ones instead.
+
+        With a `checkpoint_store`, progress is checkpointed per page: pages whose slices are already
+        in the destination folder are skipped and jobs created by an interrupted run are reused.
+        With a `result_cache`, pages queried recently are restored from the locally cached slice
+        or downloaded from the cached job instead of creating a new job.
+        With a `watermark`, the maximum value of its field is tracked in all downloaded or restored slices.
+        With a `client`, the jobs are created, polled and downloaded by it instead of the SDK.
+        With a `compression_level`, slices are written gzip compressed.
+
+        All slices have the same columns, fixed by the first downloaded result or by slices of earlier runs
+        (see `ColumnLayout`), shared with other batches if `column_layout` is given. Results whose header differs,
+        e.g. as a field was added to the module meanwhile, are remapped onto them while extracted and
+        the difference is logged and added to the metrics. Jobs of all pages query the given `field_names`,
+        which are replaced by the columns of the slices only once all downloads are finished.
+
+        Status calls and downloads failing for transient reasons (connection errors, timeouts, 5xx responses,
+        truncated results) are retried according to the `retry_policy`, a failed download fetches the result
+        of the same job again instead of creating a new one. If the result of a job reused from an earlier run
+        fails to download for another reason (e.g. Zoho no longer keeps it), the job is dropped from the checkpoint
+        and the result cache and the pages are read again: downloaded pages are skipped, the page gets a new job.
+
+        If metrics are recorded in the current context (see `zoho.metrics.recorded_in`), timing and volume
+        of each page's job are added to them.
+
+        If the credits of creating a job cannot be reserved within the API credit budget of the `polling_scheduler`
+        (see `ApiCreditScheduler.job_reserved`), no more jobs are created: pages whose jobs were already created
+        are downloaded, `budget_reached` is set and True is returned.
+        """
+        self._fingerprint = self.fingerprint()
+        self._metrics = metrics.current()
+        if self.column_layout is None:
+            self.column_layout = ColumnLayout()
+        if self.checkpoint_store is not None:
+            self._checkpoint = self.checkpoint_store.for_query(self._fingerprint)
+        while True:
+            try:
+                completed = self._download_pages(stop_if_more_pages)
+                break
+            except UnavailableJobResultError as e:
+                logging.warning(f"{e} Reading the pages of module {self.module_api_name} again, "
+                                f"pages downloaded already are skipped.")
+                self._current_page = 1
+                self._more_pages = True
+        if completed and self.column_layout.columns is not None:
+            self.field_names = self.column_layout.columns
+        return completed
+
+    def _download_pages(self, stop_if_more_pages: bool) -> bool:
+        job_slots = self.job_slots or threading.BoundedSemaphore(self.max_concurrent_jobs)
+        downloads: List[Future] = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_jobs,
+                                thread_name_prefix=f"{self.module_api_name}-download") as executor:
+            try:
+                while self._more_pages:
+                    if self._skip_downloaded_page() or self._restore_cached_page():
+                        continue
+                    job_slots.acquire()
+                    try:
+                        self._raise_failed_download(downloads)
+                        job_created = self._wait_for_current_page()
+                    except BaseException:
+                        job_slots.release()
+                        raise
+                    if not job_created:
+                        job_slots.release()
+                        break
+                    if stop_if_more_pages and self._current_page == 1 and self._more_pages:
+                        job_slots.release()
+                        return False
+                    logging.info(f"Page {self._current_page} of module {self.module_api_name} ready. Downloading.")
+                    # Run in a copy of the context, so that the download's API calls are attributed to the output table
+                    downloads.append(executor.submit(contextvars.copy_context().run, self._download_page,
+                                                     self._current_job_id, self._current_page, job_slots,
+                                                     self._page_metrics))
+                    self._current_page += 1
+                    self._raise_failed_download(downloads)
+            except BaseException:
+                for download in downloads:
+                    if download.cancel():
+                        job_slots.release()
+                raise
+        self._raise_failed_download(downloads)
+        return True
+
+    def fingerprint(self) -> str:
+        return query_fingerprint(self.module_api_name, self.field_names, self.filtering_criteria)
+
+    def _skip_downloaded_page(self) -> bool:
+        downloaded = self._checkpoint.downloaded_page(self._current_page) if self._checkpoint else None
+        if not downloaded or not os.path.exists(os.path.join(self.destination_folder, downloaded[KEY_SLICE])):
+            return False
+        # A slice with other columns than those fixed already (e.g. by another partition) is downloaded and remapped
+        if self.column_layout.columns not in (None, self._checkpoint.field_names):
+            return False
+        logging.info(f"Page {self._current_page} of module {self.module_api_name} was already downloaded "
+                     f"into {downloaded[KEY_SLICE]}, skipping it.")
+        self._more_pages = downloaded.get(KEY_MORE_RECORDS, True)
+        self.column_layout.fix(self._checkpoint.field_names)
+        self._observe_slice(downloaded[KEY_SLICE])
+        self._current_page += 1
+        return True
+
+    def _page_key(self, page: int) -> str:
+        return page_fingerprint(self._fingerprint, page)
+
+    def _restore_cached_page(self) -> bool:
+        if self.result_cache is None:
+            return False
+        key = self._page_key(self._current_page)
+        entry = self.result_cache.get(key)
+        if entry is None or is_compressed(entry[result_cache.KEY_SLICE]) != (self.compression_level is not None):
+            return False
+        # A cached slice with other columns cannot be restored as it is, the page is downloaded and remapped
+        if self.column_layout.columns not in (None, entry[result_cache.KEY_FIELD_NAMES]):
+            return False
+        if not self.result_cache.restore_slice(key, entry, self.destination_folder):
+            return False
+        self._more_pages = entry[result_cache.KEY_MORE_RECORDS]
+        self.column_layout.fix(entry[result_cache.KEY_FIELD_NAMES])
+        self._observe_slice(entry[result_cache.KEY_SLICE])
+        self._current_page += 1
+        return True
+
+    def _observe_slice(self, slice_file_name: str):
+        if self.watermark is not None:
+            self.watermark.observe_slice(os.path.join(self.destination_folder, slice_file_name),
+                                         self.column_layout.columns)
+
+    def _reusable_job_id(self) -> Optional[int]:
+        if self._checkpoint is not None and self._checkpoint.job_id(self._current_page) is not None:
+            return self._checkpoint.job_id(self._current_page)
+        if self.result_cache is not None:
+            entry = self.result_cache.peek(self._page_key(self._current_page))
+            if entry is not None:
+                return entry[result_cache.KEY_JOB_ID]
+        return None
+
+    def _resume_job(self) -> Optional[JobStatus]:
+        """Returns the status of the job created for the current page earlier, if it can be reused."""
+        job_id = self._reusable_job_id()
+        if job_id is None:
+            return None
+        self._current_job_id = job_id
+        try:
+            status = self._get_details_with_retries()
+        except Exception as e:
+            logging.warning(f"Cannot reuse bulk read job {job_id} for page {self._current_page} "
+                            f"of module {self.module_api_name}, creating a new one. Reason: {e}")
+            return None
+        if status.state not in RESUMABLE_JOB_STATES:
+            return None
+        logging.info(f"Reusing bulk read job {job_id} for page {self._current_page} of module {self.module_api_name}"
+                     f" created earlier, its state: {status.state}.")
+        self._reused_job_ids.add(job_id)
+        return status
+
+    def _resumed_job_created_at(self) -> Optional[float]:
+        """Returns the time the resumed job of the current page was created at, if it was checkpointed."""
+        if self._checkpoint is None or self._checkpoint.job_id(self._current_page) != self._current_job_id:
+            return None
+        return self._checkpoint.job_created_at(self._current_page)
+
+    def _wait_for_current_page(self) -> bool:
+        """
+        Creates (or resumes) the job of the current page and waits until it is completed.
+        Returns False if the job could not be created within the API credit budget.
+        """
+        self._page_metrics = self._metrics.page(self._current_page) if self._metrics is not None else None
+        status = self._resume_job()
+        job_poll = self.polling_scheduler.start_job(self._current_page, self.module_api_name,
+                                                    self._resumed_job_created_at() if status is not None else None)
+        completion_observed = status is None or not status.is_completed
+        if status is None:
+            if not self._create_within_budget():
+                logging.warning(f"Creating a bulk read job for page {self._current_page} of module "
+                                f"{self.module_api_name} would exceed the API credit budget, no more jobs are created.")
+                self.budget_reached = True
+                return False
+            if self._page_metrics is not None:
+                self._page_metrics.job_created = True
+            logging.info(f"Created a bulk read job for page {self._current_page} of module {self.module_api_name}.")
+            if self._checkpoint is not None:
+                self._checkpoint.job_created(self._current_page, self._current_job_id)
+            status = self._get_details_with_retries()
+        while not status.is_completed:
+            delay = job_poll.next_delay(status.state)
+            logging.info(
+                f"Page {self._current_page} of module {self.module_api_name} not ready yet."
+                f" Its current job state: {status.state}."
+                f" Waiting {delay:.1f} seconds for API server to prepare it."
+            )
+            sleep(delay)
+            status = self._get_details_with_retries()
+        job_poll.complete(observed=completion_observed)
+        self._more_pages = bool(status.more_records)
+        if self._page_metrics is not None:
+            self._page_metrics.job_id = self._current_job_id
+            self._page_metrics.queue_wait_seconds = job_poll.elapsed
+        if self._checkpoint is not None:
+            self._checkpoint.job_completed(self._current_page, self._more_pages)
+        if self.result_cache is not None:
+            self.result_cache.job_completed(self._page_key(self._current_page), self._current_job_id, self._more_pages)
+        return True
+
+    def _create_within_budget(self) -> bool:
+        """Creates the job of the current page unless its credits would exceed the API credit budget."""
+        api_credits = self.polling_scheduler.api_credits
+        with api_credits.job_reserved() if api_credits is not None else contextlib.nullcontext(True) as reserved:
+            if not reserved:
+                return False
+            started_at = monotonic()
             self.create()
-            logging.info(f"Created a bulk read job for page {self._current_page}.")
-            self.get_details()
-            while self._current_job_state != "COMPLETED":  # TODO: Add a timeout
-                logging.info(
-                    f"Page {self._current_page} not ready yet. Its current job state: {self._current_job_state}."
-                    f" Waiting {POLLING_PERIOD_SECONDS} seconds for API server to prepare it."
-                )
-                sleep(POLLING_PERIOD_SECONDS)
-                self.get_details()
-            logging.info(f"Page {self._current_page} ready. Downloading.")
-            self.download_result()
-            self._current_page += 1
-
+        if self._page_metrics is not None:
+            self._page_metrics.create_seconds = monotonic() - started_at
+        return True
+
+    def _get_details_with_retries(self) -> JobStatus:
+        return self.retry_policy.call(self._get_details_counted,
+                                      f"get details of bulk read job {self._current_job_id} "
+                                      f"for page {self._current_page} of module {self.module_api_name}")
+
+    def _get_details_counted(self) -> JobStatus:
+        if self._page_metrics is not None:
+            self._page_metrics.status_calls += 1
+        return self.get_details()
+
+    def _download_page(self, job_id: int, page: int, job_slots: threading.BoundedSemaphore,
+                       page_metrics: Optional[PageMetrics] = None):
+        try:
+            started_at = monotonic()
+            try:
+                downloaded = self.retry_policy.call(self._download_counted, f"download the result of bulk read job "
+                                                    f"{job_id} for page {page} of module {self.module_api_name}",
+                                                    job_id, page_metrics)
+            except Exception as e:
+                if job_id not in self._reused_job_ids or is_retryable(e):
+                    raise
+                self._discard_job(page, job_id)
+                raise UnavailableJobResultError(f"Cannot download the result of bulk read job {job_id} for page "
+                                                f"{page} of module {self.module_api_name} created earlier, "
+                                                f"a new job is created instead. Reason: {e}") from e
+            if page_metrics is not None:
+                page_metrics.download_seconds = monotonic() - started_at
+                page_metrics.extract_seconds = downloaded.extract_seconds
+                page_metrics.bytes_downloaded = downloaded.bytes_downloaded
+                page_metrics.rows_written = downloaded.rows
+            if downloaded.column_drift is not None:
+                logging.warning(f"Columns of page {page} of module {self.module_api_name} differ from "
+                                f"the columns of its other pages, its records were remapped onto them: "
+                                f"{downloaded.column_drift}.")
+                if page_metrics is not None:
+                    page_metrics.column_drift = downloaded.column_drift.as_dict()
+            if self._checkpoint is not None:
+                self._checkpoint.page_downloaded(page, downloaded.file_name, self.column_layout.columns)
+            if self.result_cache is not None:
+                self.result_cache.page_downloaded(self._page_key(page),
+                                                  os.path.join(self.destination_folder, downloaded.file_name),
+                                                  downloaded.checksum, self.column_layout.columns)
+            logging.info(f"Page {page} of module {self.module_api_name} downloaded.")
+            profiling.checkpoint(f"{self.module_api_name} page {page} downloaded")
+        finally:
+            job_slots.release()
+
+    def _discard_job(self, page: int, job_id: int):
+        """Forgets the job of the page, so that a new one is created for it."""
+        self._reused_job_ids.discard(job_id)
+        if self._checkpoint is not None:
+            self._checkpoint.job_discarded(page)
+        if self.result_cache is not None:
+            self.result_cache.discard(self._page_key(page))
+
+    def _download_counted(self, job_id: int, page_metrics: Optional[PageMetrics]) -> DownloadedSlice:
+        if page_metrics is not None:
+            page_metrics.download_attempts += 1
+        return self.download_result(job_id)
+
+    @staticmethod
+    def _raise_failed_download(downloads: List[Future]):
+        for download in downloads:
+            if download.done() and not download.cancelled() and download.exception() is not None:
+                raise download.exception()
+
+    @retry_on_invalid_token
     def create(self):
+        if self.client is not None:
+            self._current_job_id = self.client.create_bulk_read_job(
+                bulk_read_query(self.module_api_name, self.field_names, self._current_page, self.filtering_criteria))
+            return
+
+        from zcrmsdk.src.com.zoho.crm.api.bulk_read import (
+            APIException,
+            ActionWrapper,
+            BulkReadOperations,
+            Query,
+            RequestWrapper,
+            SuccessResponse,
+        )
+        from zcrmsdk.src.com.zoho.crm.api.util import APIResponse, Choice
+
         # Get instance of BulkReadOperations Class
         bulk_read_operations = BulkReadOperations()
 
@@ -270,7 +779,8 @@ class BulkReadJobBatch:
             )
 
         # Get the status code from response
-        logging.debug("Status Code: " + str(response.get_status_code()))
+        logging.debug("Status Code: %s", response.get_status_code())
+        raise_for_transient_status(response.get_status_code(), "create a bulk read job")
 
         # Get object from response
         response_object = response.get_object()
@@ -282,57 +792,34 @@ class BulkReadJobBatch:
 
         # Check if expected ActionWrapper instance is received.
         if isinstance(response_object, ActionWrapper):
-            action_response_list = response_object.get_data()
-            for action_response in action_response_list:
+            debug_enabled = logging.getLogger().isEnabledFor(logging.DEBUG)
+            for action_response in response_object.get_data():
+                if debug_enabled and isinstance(action_response, (SuccessResponse, APIException)):
+                    log_action_response(action_response)
                 # Check if the request is successful
                 if isinstance(action_response, SuccessResponse):
-                    # Get the Status
-                    logging.debug("Status: " + action_response.get_status().get_value())
-
-                    # Get the Code
-                    logging.debug("Code: " + action_response.get_code().get_value())
-
-                    logging.debug("Details")
-
-                    # Get the details dict
-                    details = action_response.get_details()
-
-                    for key, value in details.items():
-                        logging.debug(key + " : " + str(value))
-
-                    self._current_job_id = details["id"]
-
-                    # Get the Message
-                    logging.debug(
-                        "Message: " + action_response.get_message().get_value()
-                    )
-
-                # Check if the request returned an exception
-                elif isinstance(action_response, APIException):
-                    # Get the Status
-                    logging.debug("Status: " + action_response.get_status().get_value())
-
-                    # Get the Code
-                    logging.debug("Code: " + action_response.get_code().get_value())
-
-                    logging.debug("Details")
-
-                    # Get the details dict
-                    details = action_response.get_details()
-
-                    for key, value in details.items():
-                        logging.debug(key + " : " + str(value))
-
-                    # Get the Message
-                    logging.debug(
-                        "Message: " + action_response.get_message().get_value()
-                    )
+                    self._current_job_id = action_response.get_details()["id"]
 
         # Check if the request returned an exception
         elif isinstance(response_object, APIException):
             handle_api_exception(response_object)
 
-    def get_details(self):
+    @retry_on_invalid_token
+    def get_details(self) -> JobStatus:
+        """Returns the status of the current job, its details are only logged if debug logging is enabled."""
+        if self.client is not None:
+            status = JobStatus.from_dict(self.client.get_bulk_read_job(self._current_job_id))
+            logging.debug("Bulk read job %s: %s", self._current_job_id, status)
+            return status
+
+        from zcrmsdk.src.com.zoho.crm.api.bulk_read import (
+            APIException,
+            BulkReadOperations,
+            JobDetail,
+            ResponseWrapper,
+        )
+        from zcrmsdk.src.com.zoho.crm.api.util import APIResponse
+
         # Get instance of BulkReadOperations Class
         bulk_read_operations = BulkReadOperations()
 
@@ -346,7 +833,8 @@ class BulkReadJobBatch:
             )
 
         # Get the status code from response
-        logging.debug("Status Code: " + str(response.get_status_code()))
+        logging.debug("Status Code: %s", response.get_status_code())
+        raise_for_transient_status(response.get_status_code(), "get details of a bulk read job")
 
         # Get object from response
         response_object = response.get_object()
@@ -361,105 +849,38 @@ class BulkReadJobBatch:
 
             # Get the list of JobDetail instances
             job_details_list: List[JobDetail] = response_object.get_data()
+            if not job_details_list:
+                raise RuntimeError(f"Got no details of bulk read job {self._current_job_id} from API.")
 
-            for job_detail in job_details_list:
-                # Get the Job ID of each jobDetail
-                logging.debug("Bulk read Job ID: " + str(job_detail.get_id()))
-
-                # Get the Operation of each jobDetail
-                logging.debug("Bulk read Operation: " + job_detail.get_operation())
-
-                # Get the State of each jobDetail
-                logging.debug("Bulk read State: " + job_detail.get_state().get_value())
-                self._current_job_state = job_detail.get_state().get_value()
-
-                # Get the Result instance of each jobDetail
-                result = job_detail.get_result()
-
-                if result is not None:
-                    # Get the Page of the Result
-                    logging.debug("Bulkread Result Page: " + str(result.get_page()))
-
-                    # Get the Count of the Result
-                    logging.debug("Bulkread Result Count: " + str(result.get_count()))
-
-                    # Get the Download URL of the Result
-                    logging.debug(
-                        "Bulkread Result Download URL: " + result.get_download_url()
-                    )
-
-                    # Get the Per_Page of the Result
-                    logging.debug(
-                        "Bulkread Result Per_Page: " + str(result.get_per_page())
-                    )
-
-                    # Get the MoreRecords of the Result
-                    logging.debug(
-                        "Bulkread Result MoreRecords: " + str(result.get_more_records())
-                    )
-                    self._more_pages = result.get_more_records()
-
-                # Get the Query instance of each jobDetail
-                query = job_detail.get_query()
-
-                if query is not None:
-                    # Get the Module Name of the Query
-                    logging.debug("Bulk read Query Module: " + query.get_module())
-
-                    # Get the Page of the Query
-                    logging.debug("Bulk read Query Page: " + str(query.get_page()))
-
-                    # Get the cvid of the Query
-                    logging.debug("Bulk read Query cvid: " + str(query.get_cvid()))
-
-                    # Get the fields List of the Query
-                    fields = query.get_fields()
-
-                    if fields is not None:
-                        logging.debug("Bulk read fields")
-                        for field in fields:
-                            logging.debug(field)
-
-                    # Get the Criteria instance of the Query
-                    criteria = query.get_criteria()
-
-                    if criteria is not None:
-                        print_criteria(criteria)
-
-                    # Get the CreatedBy User instance of each jobDetail
-                    created_by = job_detail.get_created_by()
-
-                    # Check if created_by is not None
-                    if created_by is not None:
-                        # Get the Name of the created_by User
-                        logging.debug(
-                            "Bulkread Created By - Name: " + created_by.get_name()
-                        )
-
-                        # Get the ID of the created_by User
-                        logging.debug(
-                            "Bulkread Created By - ID: " + str(created_by.get_id())
-                        )
-
-                    # Get the CreatedTime of each jobDetail
-                    logging.debug(
-                        "Bulkread CreatedTime: " + str(job_detail.get_created_time())
-                    )
-
-                    # Get the FileType of each jobDetail
-                    logging.debug("Bulkread File Type: " + job_detail.get_file_type())
+            job_detail = job_details_list[-1]
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                log_job_detail(job_detail)
+            return JobStatus.from_job_detail(job_detail)
 
         # Check if the request returned an exception
         elif isinstance(response_object, APIException):
             handle_api_exception(response_object)
 
-    def download_result(self):
+        raise RuntimeError(f"Got an unexpected response from API when attempting to get details "
+                           f"of a bulk read job: {type(response_object).__name__}.")
+
+    @retry_on_invalid_token
+    def download_result(self, job_id: Optional[int] = None) -> DownloadedSlice:
+        """Downloads the result of the job into a slice in the destination folder."""
+        if self.client is not None:
+            with self.client.download_bulk_read_result(job_id if job_id is not None else self._current_job_id) \
+                    as response:
+                return self._write_result(response.iter_content(COPY_BUFFER_SIZE))
+
+        from zcrmsdk.src.com.zoho.crm.api.bulk_read import APIException, BulkReadOperations, FileBodyWrapper
+        from zcrmsdk.src.com.zoho.crm.api.util import APIResponse
+
         # Get instance of BulkReadOperations Class
         bulk_read_operations = BulkReadOperations()
 
         # Call download_result method that takes job_id as parameter
         response: APIResponse = bulk_read_operations.download_result(
-            self._current_job_id
+            job_id if job_id is not None else self._current_job_id
         )
 
         if response is None:
@@ -468,7 +889,8 @@ class BulkReadJobBatch:
             )
 
         # Get the status code from response
-        logging.debug("Status Code: " + str(response.get_status_code()))
+        logging.debug("Status Code: %s", response.get_status_code())
+        raise_for_transient_status(response.get_status_code(), "download a bulk read job result")
 
         # Get object from response
         response_object = response.get_object()
@@ -484,38 +906,68 @@ class BulkReadJobBatch:
             # Get StreamWrapper instance from the returned FileBodyWrapper instance
             stream_wrapper = response_object.get_file()
 
-            # Construct the file name by joining the destinationFolder and the name from StreamWrapper instance
-            zip_file_name = os.path.join(
-                self.destination_folder, stream_wrapper.get_name()
-            )
-
-            # Open the destination file where the file needs to be written in 'wb' mode
-            with open(zip_file_name, "wb") as f:
-                # Get the stream from StreamWrapper instance
-                for chunk in stream_wrapper.get_stream():
-                    f.write(chunk)
-
-            with zipfile.ZipFile(zip_file_name, "r") as zip_ref:
-                zip_ref.extractall(self.destination_folder)
-                csv_file_name = os.path.join(
-                    self.destination_folder, zip_ref.filelist[0].filename
-                )
-            os.remove(zip_file_name)
-
-            # Update field names according to the CSV file and remove header
-            temp_csv_file_name = csv_file_name + "_temp"
-            with open(csv_file_name, "r") as csv_file, open(
-                temp_csv_file_name, "w"
-            ) as csv_file_temp:
-                csv_reader = csv.reader(csv_file)
-                field_names = next(csv_reader)
-                csv_writer = csv.writer(csv_file_temp)
-                for row in csv_reader:
-                    csv_writer.writerow(row)
-            self.field_names = field_names
-            os.remove(csv_file_name)
-            os.rename(temp_csv_file_name, csv_file_name)
+            # Get the stream from StreamWrapper instance (requests.Response would be iterated in 128 B chunks)
+            stream = stream_wrapper.get_stream()
+            return self._write_result(stream.iter_content(COPY_BUFFER_SIZE) if hasattr(stream, "iter_content")
+                                      else stream)
 
         # Check if the request returned an exception
         elif isinstance(response_object, APIException):
             handle_api_exception(response_object)
+
+        raise RuntimeError(f"Got an unexpected response from API when attempting to download a bulk read job "
+                           f"result: {type(response_object).__name__}.")
+
+    def _write_result(self, chunks: Iterable[bytes]) -> DownloadedSlice:
+        """
+        Spools the zipped result in memory (or in a temporary file if it is large)
+        and streams the CSV inside it directly into the output slice, compressing it if `compression_level` is set.
+        A truncated or corrupted result (its CRC does not match) raises `TruncatedResultError`,
+        the slice is only created once the whole CSV is extracted.
+        Records are written in columns of the `column_layout`, which are fixed by the first result's header.
+        Returns the slice with the size of the result, the number of records, the time their extraction took
+        and how the result's columns differed from the layout.
+        """
+        if self.column_layout is None:
+            self.column_layout = ColumnLayout()
+        column_layout = self.column_layout
+        with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_MEMORY_BYTES) as zip_spool:
+            for chunk in chunks:
+                zip_spool.write(chunk)
+            bytes_downloaded = zip_spool.tell()
+            zip_spool.seek(0)
+            started_at = monotonic()
+
+            try:
+                with zipfile.ZipFile(zip_spool, "r") as zip_ref:
+                    if not zip_ref.infolist():
+                        raise zipfile.BadZipFile("the archive contains no file")
+                    csv_member = zip_ref.infolist()[0]
+                    csv_file_name = os.path.join(
+                        self.destination_folder,
+                        slice_file_name(os.path.basename(csv_member.filename), self.compression_level)
+                    )
+                    partial_file_name = csv_file_name + PARTIAL_SLICE_SUFFIX
+                    try:
+                        with zip_ref.open(csv_member) as csv_stream, open(partial_file_name, "wb") as csv_file:
+                            # Checksum of the slice as stored, i.e. of the compressed data if it is compressed
+                            slice_writer = ChecksumWriter(csv_file)
+                            with compressing_writer(slice_writer, self.compression_level) as destination:
+                                record_counter = RecordCounter(destination)
+                                # The slice is written without the CSV header, in columns of the layout
+                                header = copy_csv_body(csv_stream, record_counter, self.watermark, column_layout)
+                    except BaseException:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(partial_file_name)
+                        raise
+            except zipfile.BadZipFile as e:
+                raise TruncatedResultError(f"Downloaded bulk read job result is incomplete or corrupted: {e}") from e
+
+        # Replaced, not overwritten, as the slice of an earlier download may be hard linked elsewhere
+        os.replace(partial_file_name, csv_file_name)
+        return DownloadedSlice(file_name=os.path.basename(csv_file_name),
+                               checksum=slice_writer.checksum.hexdigest(),
+                               bytes_downloaded=bytes_downloaded,
+                               rows=record_counter.records,
+                               extract_seconds=monotonic() - started_at,
+                               column_drift=column_layout.drift(header))
@@ -0,0 +1,104 @@
+import threading
+from dataclasses import dataclass, field
+from time import time
+from typing import Callable, Dict, List, Optional
+
+from zoho.result_cache import RESULT_RETENTION_SECONDS
+
+# Checkpoint keys
+KEY_FIELD_NAMES = "field_names"
+KEY_PAGES = "pages"
+KEY_JOB_ID = "job_id"
+KEY_CREATED_AT = "created_at"
+KEY_MORE_RECORDS = "more_records"
+KEY_SLICE = "slice"
+
+
+@dataclass(slots=True)
+class QueryCheckpoint:
+    """
+    Progress of the bulk read of one query (module, fields and criteria): the job created for each page
+    and when, whether it reported more records and the slice file it was downloaded into.
+    """
+    store: "CheckpointStore"
+    pages: Dict[int, dict] = field(default_factory=dict)
+    field_names: Optional[List[str]] = None
+
+    def job_id(self, page: int) -> Optional[int]:
+        """Returns the job created for the page, unless it is older than Zoho keeps the results of jobs."""
+        created_at = self.job_created_at(page)
+        if created_at is None or time() - created_at > RESULT_RETENTION_SECONDS:
+            return None
+        return self.pages[page].get(KEY_JOB_ID)
+
+    def job_created_at(self, page: int) -> Optional[float]:
+        """Returns the time (seconds since the epoch) the job of the page was created at, if known."""
+        return self.pages.get(page, {}).get(KEY_CREATED_AT)
+
+    def downloaded_page(self, page: int) -> Optional[dict]:
+        page_checkpoint = self.pages.get(page, {})
+        return page_checkpoint if page_checkpoint.get(KEY_SLICE) else None
+
+    def job_created(self, page: int, job_id: int):
+        self._update(page, {KEY_JOB_ID: job_id, KEY_CREATED_AT: time()})
+
+    def job_discarded(self, page: int):
+        """Drops the progress of the page, e.g. as the result of its job is no longer available."""
+        with self.store.lock:
+            self.pages.pop(page, None)
+        self.store.changed()
+
+    def job_completed(self, page: int, more_records: bool):
+        self._update(page, {KEY_MORE_RECORDS: more_records})
+
+    def page_downloaded(self, page: int, slice_file_name: str, field_names: List[str]):
+        with self.store.lock:
+            self.field_names = field_names
+        self._update(page, {KEY_SLICE: slice_file_name})
+
+    def _update(self, page: int, values: dict):
+        with self.store.lock:
+            self.pages.setdefault(page, {}).update(values)
+        self.store.changed()
+
+    def to_dict(self) -> dict:
+        return {
+            KEY_FIELD_NAMES: self.field_names,
+            KEY_PAGES: {str(page): dict(values) for page, values in sorted(self.pages.items())},
+        }
+
+
+@dataclass(slots=True)
+class CheckpointStore:
+    """
+    Checkpoints of all queries of one output table, keyed by query fingerprint and persisted in the state file
+    through `on_change`, so that an interrupted extraction can be resumed by a rerun with the same queries.
+    """
+    queries: Dict[str, QueryCheckpoint] = field(default_factory=dict)
+    on_change: Optional[Callable[[], None]] = None
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict], on_change: Optional[Callable[[], None]] = None) -> "CheckpointStore":
+        store = cls(on_change=on_change)
+        for fingerprint, query_data in (data or {}).items():
+            store.queries[fingerprint] = QueryCheckpoint(
+                store=store,
+                pages={int(page): dict(values) for page, values in query_data.get(KEY_PAGES, {}).items()},
+                field_names=query_data.get(KEY_FIELD_NAMES),
+            )
+        return store
+
+    def for_query(self, fingerprint: str) -> QueryCheckpoint:
+        with self.lock:
+            if fingerprint not in self.queries:
+                self.queries[fingerprint] = QueryCheckpoint(store=self)
+            return self.queries[fingerprint]
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {fingerprint: query.to_dict() for fingerprint, query in self.queries.items()}
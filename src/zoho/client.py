@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import requests
+from keboola.http_client import HttpClient
+
+from zoho.metadata import KEY_API_NAME, KEY_DATA_TYPE
+from zoho.retry import RETRYABLE_STATUS_CODES, TransientApiError
+
+API_DOMAINS = {
+    "EU": "https://www.zohoapis.eu",
+    "US": "https://www.zohoapis.com",
+    "CN": "https://www.zohoapis.com.cn",
+    "IN": "https://www.zohoapis.in",
+    "AU": "https://www.zohoapis.com.au",
+    "JP": "https://www.zohoapis.jp",
+}
+ACCOUNTS_TOKEN_URLS = {
+    "EU": "https://accounts.zoho.eu/oauth/v2/token",
+    "US": "https://accounts.zoho.com/oauth/v2/token",
+    "CN": "https://accounts.zoho.com.cn/oauth/v2/token",
+    "IN": "https://accounts.zoho.in/oauth/v2/token",
+    "AU": "https://accounts.zoho.com.au/oauth/v2/token",
+    "JP": "https://accounts.zoho.jp/oauth/v2/token",
+}
+
+BULK_READ_PATH = "crm/bulk/v2/read"
+MODULES_PATH = "crm/v2/settings/modules"
+FIELDS_PATH = "crm/v2/settings/fields"
+
+REQUEST_TIMEOUT_SECONDS = 60
+DEFAULT_MAX_RETRIES = 3
+# The access token is refreshed when less than this remains until its expiry, the same margin the SDK uses
+TOKEN_REFRESH_MARGIN_MILLISECONDS = 5000
+DEFAULT_TOKEN_VALIDITY_SECONDS = 3600
+
+
+class ZohoClient(HttpClient):
+    """
+    Thin client of the bulk read and metadata endpoints of Zoho CRM API, a lightweight alternative
+    to initializing the Zoho SDK (logger, token store, resource files and field handlers).
+    Refreshes the OAuth access token itself and sends all requests through one pooled keep-alive session,
+    the given `session` (see `zoho.http_session.create_session`) or its own.
+    """
+
+    def __init__(self, region_code: str, client_id: str, client_secret: str, refresh_token: str,
+                 access_token: Optional[str] = None, expiry_time: Optional[str] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, session: Optional[requests.Session] = None):
+        if region_code not in API_DOMAINS:
+            raise ValueError("Invalid data center code, must be one of EU, US, CN, IN, AU, JP.")
+        super().__init__(API_DOMAINS[region_code], max_retries=max_retries)
+        self.api_domain = API_DOMAINS[region_code]
+        self.token_url = ACCOUNTS_TOKEN_URLS[region_code]
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.access_token = access_token
+        self.expiry_time = expiry_time
+        self.session: requests.Session = session or self._requests_retry_session()
+        self._token_lock = threading.Lock()
+
+    def _request_raw(self, method: str, endpoint_path: Optional[str] = None, **kwargs) -> requests.Response:
+        """Sends the request through the shared session, authorized by the current access token."""
+        url = self._build_url(endpoint_path, kwargs.pop("is_absolute_path", False))
+        headers = {**self._default_header, **(kwargs.pop("headers", None) or {})}
+        if not kwargs.pop("ignore_auth", False):
+            headers.update(self.authorization_headers())
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT_SECONDS)
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def authorization_headers(self) -> dict:
+        with self._token_lock:
+            if not self.access_token or self._expires_in_milliseconds() < TOKEN_REFRESH_MARGIN_MILLISECONDS:
+                self._refresh_access_token()
+            return {"Authorization": f"Zoho-oauthtoken {self.access_token}"}
+
+    def get_access_token(self) -> Tuple[Optional[str], Optional[str]]:
+        """Returns the current access token and its expiry time (epoch milliseconds), if there is any."""
+        with self._token_lock:
+            return self.access_token, self.expiry_time
+
+    def invalidate_access_token(self):
+        """Marks the access token as expired, the next request refreshes it."""
+        with self._token_lock:
+            self.expiry_time = "0"
+        logging.info("Access token was rejected by Zoho API, it will be refreshed.")
+
+    def _expires_in_milliseconds(self) -> float:
+        try:
+            return int(self.expiry_time) - time.time() * 1000
+        except (TypeError, ValueError):
+            return 0
+
+    def _refresh_access_token(self):
+        response = self.session.post(self.token_url, timeout=REQUEST_TIMEOUT_SECONDS, data={
+            "grant_type": "refresh_token",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": self.refresh_token,
+        })
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        # Zoho accounts report invalid credentials with status 200 and an error in the body
+        if response.status_code != 200 or "access_token" not in body:
+            raise RuntimeError(f"Failed to refresh the access token, status code {response.status_code}: "
+                               f"{body.get('error', response.text)}")
+        self.access_token = body["access_token"]
+        expires_in = int(body.get("expires_in", DEFAULT_TOKEN_VALIDITY_SECONDS))
+        self.expiry_time = str(int((time.time() + expires_in) * 1000))
+        logging.debug("Access token refreshed.")
+
+    def send(self, method: str, path: str, description: str, **kwargs) -> requests.Response:
+        """
+        Sends a request to the API path and returns the successful response.
+        A request rejected as unauthorized is retried once with a refreshed access token.
+        Failures worth retrying later (e.g. 5xx status codes) raise `TransientApiError`.
+        """
+        response = self._request_raw(method, path, **kwargs)
+        if response.status_code == 401:
+            self.invalidate_access_token()
+            response = self._request_raw(method, path, **kwargs)
+        if response.status_code not in (200, 201, 202, 204, 304):
+            error = TransientApiError if response.status_code in RETRYABLE_STATUS_CODES else RuntimeError
+            raise error(f"Failed to {description}, status code {response.status_code}: {response.text}")
+        return response
+
+    def call(self, method: str, path: str, description: str, **kwargs) -> Optional[dict]:
+        """Returns the JSON body of the response, None if it has no content."""
+        response = self.send(method, path, description, **kwargs)
+        if response.status_code in (204, 304):
+            return None
+        return response.json()
+
+    def create_bulk_read_job(self, query: dict) -> str:
+        """Creates a bulk read job of the query (see `zoho.bulk_read.bulk_read_query`) and returns its id."""
+        body = self.call("POST", BULK_READ_PATH, "create a bulk read job", json={"query": query, "file_type": "csv"})
+        action_response = (body or {}).get("data", [{}])[0]
+        if action_response.get("status") != "success":
+            raise RuntimeError(f"API did not accept the request to create a bulk read job.\n"
+                               f"Code: {action_response.get('code')}\n"
+                               f"Message: {action_response.get('message')}\n"
+                               f"Details: {action_response.get('details')}")
+        return action_response["details"]["id"]
+
+    def get_bulk_read_job(self, job_id) -> dict:
+        """Returns details of the bulk read job: its state and, once completed, the result info."""
+        body = self.call("GET", f"{BULK_READ_PATH}/{job_id}", "get details of a bulk read job")
+        if not body or not body.get("data"):
+            raise RuntimeError(f"Got no details of bulk read job {job_id} from API.")
+        return body["data"][0]
+
+    def download_bulk_read_result(self, job_id) -> requests.Response:
+        """Returns the streamed response with the zipped result of the bulk read job."""
+        return self.send("GET", f"{BULK_READ_PATH}/{job_id}/result", "download a bulk read job result", stream=True)
+
+    def get_modules(self) -> List[str]:
+        body = self.call("GET", MODULES_PATH, "fetch the list of available Modules")
+        return [module["api_name"] for module in (body or {}).get("modules", [])]
+
+    def get_fields(self, module_api_name: str) -> List[dict]:
+        body = self.call("GET", FIELDS_PATH, f"fetch the list of available Fields for module {module_api_name}",
+                         params={"module": module_api_name})
+        return [{KEY_API_NAME: field["api_name"], KEY_DATA_TYPE: field["data_type"]}
+                for field in (body or {}).get("fields", [])]
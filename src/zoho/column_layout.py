@@ -0,0 +1,87 @@
+import csv
+import io
+import threading
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Optional
+
+REMAP_BUFFER_SIZE = 1024 * 1024
+
+
+@dataclass(slots=True, frozen=True)
+class ColumnDrift:
+    """Difference of a CSV header from the fixed columns of the table it is written into."""
+    header: List[str]
+    # Columns of the table missing in the header, left empty
+    missing_columns: List[str]
+    # Columns of the header not in the table, dropped
+    extra_columns: List[str]
+
+    def as_dict(self) -> dict:
+        return {"header": self.header, "missing_columns": self.missing_columns, "extra_columns": self.extra_columns}
+
+    def __str__(self) -> str:
+        if not self.missing_columns and not self.extra_columns:
+            return "columns are in a different order"
+        return (f"missing columns (left empty): {', '.join(self.missing_columns) or 'none'}, "
+                f"extra columns (dropped): {', '.join(self.extra_columns) or 'none'}")
+
+
+@dataclass(slots=True)
+class ColumnLayout:
+    """
+    Columns of a sliced table, shared by everything writing its slices. Fixed by the first CSV header
+    (or by columns of slices written earlier), so that all slices have the same columns in the same order
+    even if the headers of later pages differ, e.g. when a field is added to the module during the run.
+    """
+    columns: Optional[List[str]] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def fix(self, columns: List[str]) -> List[str]:
+        """Fixes the columns unless they are fixed already and returns the fixed ones."""
+        with self._lock:
+            if self.columns is None:
+                self.columns = list(columns)
+            return self.columns
+
+    def mapping(self, header: List[str]) -> Optional[List[Optional[int]]]:
+        """
+        Fixes the columns by the header if not fixed yet. Returns None if records with the header can be copied
+        as they are, otherwise the position in the header of each column (None for a missing one).
+        """
+        columns = self.fix(header)
+        if header == columns:
+            return None
+        positions = {name: position for position, name in enumerate(header)}
+        return [positions.get(column) for column in columns]
+
+    def drift(self, header: List[str]) -> Optional[ColumnDrift]:
+        """Returns how the header differs from the fixed columns, None if it does not."""
+        columns = self.fix(header)
+        if header == columns:
+            return None
+        return ColumnDrift(header=list(header),
+                           missing_columns=[column for column in columns if column not in header],
+                           extra_columns=[column for column in header if column not in columns])
+
+
+def copy_remapped_records(source: BinaryIO, destination: BinaryIO, mapping: List[Optional[int]]):
+    """
+    Copies CSV records (UTF-8, without header) from `source` to `destination`, taking the value at the given
+    position of each record for each column, columns without a position are left empty. Records are parsed
+    and written in one pass, multiline quoted values stay whole.
+    """
+    text_source = io.TextIOWrapper(source, encoding="utf-8", newline="")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    try:
+        for record in csv.reader(text_source):
+            writer.writerow([record[position] if position is not None and position < len(record) else ""
+                             for position in mapping])
+            if buffer.tell() >= REMAP_BUFFER_SIZE:
+                destination.write(buffer.getvalue().encode("utf-8"))
+                buffer.seek(0)
+                buffer.truncate()
+        destination.write(buffer.getvalue().encode("utf-8"))
+    finally:
+        # The source is closed by its owner
+        text_source.detach()
@@ -0,0 +1,34 @@
+from typing import Dict, List
+
+from keboola.component.dao import SupportedDataTypes, TableMetadata
+
+# Storage base types of Zoho field data types (`data_type` of the field metadata), other fields are strings.
+# Lookups are read as the Ids of the referenced records, which are kept as strings like the Id column.
+BASE_TYPES = {
+    "integer": SupportedDataTypes.INTEGER,
+    "bigint": SupportedDataTypes.INTEGER,
+    "double": SupportedDataTypes.NUMERIC,
+    "decimal": SupportedDataTypes.NUMERIC,
+    "currency": SupportedDataTypes.NUMERIC,
+    "percent": SupportedDataTypes.NUMERIC,
+    "boolean": SupportedDataTypes.BOOLEAN,
+    "date": SupportedDataTypes.DATE,
+    "datetime": SupportedDataTypes.TIMESTAMP,
+}
+ID_DATA_TYPE = "id"
+
+
+def column_data_types(columns: List[str], field_data_types: Dict[str, str], id_column_name: str) -> Dict[str, str]:
+    """Returns the Zoho data type of each column, columns missing in the field metadata are text."""
+    return {column: ID_DATA_TYPE if column == id_column_name else field_data_types.get(column, "text")
+            for column in columns}
+
+
+def base_type(data_type: str) -> SupportedDataTypes:
+    return BASE_TYPES.get(data_type, SupportedDataTypes.STRING)
+
+
+def add_column_data_types(table_metadata: TableMetadata, data_types: Dict[str, str]):
+    """Adds the Storage base type and the Zoho data type of each column to the table's manifest metadata."""
+    for column, data_type in data_types.items():
+        table_metadata.add_column_data_type(column, base_type(data_type), source_data_type=data_type, nullable=True)
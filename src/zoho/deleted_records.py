@@ -0,0 +1,73 @@
+import csv
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+import requests
+
+from zoho.coql import csv_value
+from zoho.rest import api_request
+from zoho.watermark import WATERMARK_FORMAT, WatermarkTracker
+
+DELETED_RECORDS_PAGE_SIZE = 200
+DELETED_RECORDS_SLICE_FILE_NAME = "deleted.csv"
+DELETED_RECORDS_TABLE_SUFFIX = "_deleted"
+# Output columns and the keys of the deleted records API they are read from
+DELETED_RECORDS_COLUMNS = {
+    "Id": "id",
+    "Deleted_Time": "deleted_time",
+    "Type": "type",
+    "Display_Name": "display_name",
+    "Deleted_By": "deleted_by",
+}
+KEY_DELETED_TIME = "deleted_time"
+
+
+@dataclass(slots=True)
+class DeletedRecordsReader:
+    """
+    Reads Ids of records of a module deleted since `deleted_since` (all the API still knows about if not set)
+    into one headerless slice with `DELETED_RECORDS_COLUMNS`. Tracks the latest deletion time in `watermark`,
+    the lower bound of the next run.
+    """
+    module_api_name: str
+    destination_folder: str
+    deleted_since: Optional[str] = None
+    watermark: WatermarkTracker = field(default_factory=lambda: WatermarkTracker(KEY_DELETED_TIME))
+    session: requests.Session = field(default_factory=requests.Session)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(DELETED_RECORDS_COLUMNS)
+
+    def download_all_records(self) -> int:
+        """Downloads all deleted records and returns their number."""
+        record_count = 0
+        with open(os.path.join(self.destination_folder, DELETED_RECORDS_SLICE_FILE_NAME), "w",
+                  encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            for record in self._records():
+                writer.writerow(csv_value(record.get(key)) for key in DELETED_RECORDS_COLUMNS.values())
+                self.watermark.observe(csv_value(record.get(KEY_DELETED_TIME)))
+                record_count += 1
+        logging.info(f"Read {record_count} records of module {self.module_api_name} deleted since "
+                     f"{self.deleted_since or 'ever'}.")
+        return record_count
+
+    def _records(self) -> Iterator[dict]:
+        headers = {}
+        if self.deleted_since:
+            headers["If-Modified-Since"] = datetime.strptime(self.deleted_since, WATERMARK_FORMAT).isoformat()
+        page = 1
+        while True:
+            body = api_request(self.session, "GET", f"/crm/v2/{self.module_api_name}/deleted",
+                               f"get deleted records of module {self.module_api_name}", headers=headers,
+                               params={"type": "all", "page": page, "per_page": DELETED_RECORDS_PAGE_SIZE})
+            if body is None:
+                return
+            yield from body.get("data", [])
+            if not body.get("info", {}).get("more_records", False):
+                return
+            page += 1
@@ -0,0 +1,102 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from zoho.api_credits import MAX_RATE_LIMITED_ATTEMPTS, ApiCreditScheduler
+
+# Connections kept alive besides those of the concurrent bulk read jobs, for polling, metadata and token requests
+POOL_SIZE_RESERVE = 2
+
+
+@dataclass(slots=True)
+class ConnectionStats:
+    """Counts connections opened and requests sent through a session, tells whether connections are reused."""
+    connections_opened: int = 0
+    requests_sent: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def connection_opened(self):
+        with self.lock:
+            self.connections_opened += 1
+
+    def request_sent(self):
+        with self.lock:
+            self.requests_sent += 1
+
+    def __str__(self) -> str:
+        with self.lock:
+            per_connection = self.requests_sent / self.connections_opened if self.connections_opened else 0
+            return (f"{self.requests_sent} HTTP requests sent over {self.connections_opened} connections "
+                    f"({per_connection:.1f} requests per connection)")
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+    Transport adapter counting requests sent and connections its pools open into `stats`.
+    With a `scheduler`, each request is charged its API credits and waits for rate limits to reset,
+    rate limited requests are repeated.
+    """
+
+    def __init__(self, stats: ConnectionStats, scheduler: Optional[ApiCreditScheduler] = None, **kwargs):
+        self.stats = stats
+        self.scheduler = scheduler
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+    def send(self, request, **kwargs):
+        if self.scheduler is None:
+            self.stats.request_sent()
+            return super().send(request, **kwargs)
+
+        self.scheduler.charge(request.method, request.url)
+        for attempt in range(1, MAX_RATE_LIMITED_ATTEMPTS + 1):
+            self.scheduler.wait_for_rate_limit()
+            self.stats.request_sent()
+            response = super().send(request, **kwargs)
+            if not self.scheduler.observe(response) or attempt == MAX_RATE_LIMITED_ATTEMPTS:
+                return response
+            response.close()
+
+
+def _counting_pool_class(pool_class: type, stats: ConnectionStats) -> type:
+    class CountingConnectionPool(pool_class):
+        def _new_conn(self):
+            stats.connection_opened()
+            return super()._new_conn()
+
+    return CountingConnectionPool
+
+
+def pool_size(max_concurrent_jobs: int, max_parallel_modules: int) -> int:
+    """
+    Connections kept alive per host: one per bulk read job downloaded at a time,
+    one per module creating and polling jobs, and a small reserve.
+    """
+    return max_concurrent_jobs + max_parallel_modules + POOL_SIZE_RESERVE
+
+
+def create_session(size: int, stats: ConnectionStats,
+                   scheduler: Optional[ApiCreditScheduler] = None) -> requests.Session:
+    """
+    Creates the session all API traffic of a run goes through, keeping up to `size` connections
+    per host alive. All requests go through the API credit `scheduler`, if given.
+    Failed requests are not retried by the session, they fail right away as they do outside a session.
+    Bulk read calls are retried by `zoho.retry.RetryPolicy` and rate limited requests by the scheduler,
+    a failing call repeated by several layers would spend API credits on each of their attempts.
+    """
+    adapter = CountingHTTPAdapter(stats, scheduler, pool_maxsize=size, max_retries=Retry(0, read=False))
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
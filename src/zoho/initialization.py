@@ -1,23 +1,34 @@
+import csv
+import functools
+import hashlib
+import logging
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import requests
+
+from zoho.client import ZohoClient
+
+if TYPE_CHECKING:
+    from zcrmsdk.src.com.zoho.crm.api.dc import DataCenter
+
+# Client used instead of the SDK if the component runs with the HTTP backend. The SDK modules are heavy to import
+# and initialize, so they are only imported by functions that need them.
+_http_client: Optional[ZohoClient] = None
+_sdk_initialized = False
+
+
+def code_to_dc(code: str) -> "DataCenter":
+    from zcrmsdk.src.com.zoho.crm.api.dc import (
+        EUDataCenter,
+        USDataCenter,
+        CNDataCenter,
+        INDataCenter,
+        AUDataCenter,
+        JPDataCenter,
+    )
 
-from zcrmsdk.src.com.zoho.crm.api.user_signature import UserSignature
-from zcrmsdk.src.com.zoho.crm.api.dc import (
-    EUDataCenter,
-    USDataCenter,
-    CNDataCenter,
-    INDataCenter,
-    AUDataCenter,
-    JPDataCenter,
-    DataCenter,
-)
-from zcrmsdk.src.com.zoho.api.authenticator.store import FileStore
-from zcrmsdk.src.com.zoho.api.logger import Logger
-from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
-from zcrmsdk.src.com.zoho.api.authenticator.oauth_token import OAuthToken
-from zcrmsdk.src.com.zoho.crm.api.sdk_config import SDKConfig
-
-
-def code_to_dc(code: str) -> DataCenter:
     if code == "EU":
         return EUDataCenter.PRODUCTION()
     elif code == "US":
@@ -51,7 +62,18 @@ def initialize(
         client_secret: str,
         user_email: str,
         tmp_dir_path: Path,
-        file_store_path: Path):
+        file_store_path: Path,
+        session: Optional[requests.Session] = None):
+    from zcrmsdk.src.com.zoho.crm.api.user_signature import UserSignature
+    from zcrmsdk.src.com.zoho.api.authenticator.store import FileStore
+    from zcrmsdk.src.com.zoho.api.logger import Logger
+    from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
+    from zcrmsdk.src.com.zoho.api.authenticator.oauth_token import OAuthToken
+    from zcrmsdk.src.com.zoho.crm.api.sdk_config import SDKConfig
+
+    global _http_client, _sdk_initialized
+    _http_client = None
+
     """
     Create an instance of Logger Class that takes two parameters
     1 -> Level of the log messages to be logged.
@@ -117,8 +139,9 @@ def initialize(
         read_timeout (Default value is None)
             A  Float field to set read timeout
         """
+    # Fields are loaded on demand and cached in the state by the component, see zoho.metadata
     config = SDKConfig(
-        auto_refresh_fields=True,
+        auto_refresh_fields=False,
         pick_list_validation=False,
         connect_timeout=60,
         read_timeout=60,
@@ -150,3 +173,124 @@ def initialize(
         resource_path=resource_path,
         logger=logger,
     )
+    _sdk_initialized = True
+    if session is not None:
+        share_session_with_sdk(session)
+
+
+def share_session_with_sdk(session: requests.Session):
+    """
+    Makes the SDK send API requests through the session. The SDK calls module level functions of requests,
+    each of them opens a new connection, so every create, poll and download call would pay for a TLS handshake.
+    The session has methods of the same names and arguments.
+    """
+    from zcrmsdk.src.com.zoho.crm.api.util import api_http_connector
+
+    api_http_connector.requests = session
+
+
+def use_http_client(client: ZohoClient):
+    """Authorizes requests made outside the SDK by the client instead of the SDK, which is not initialized."""
+    global _http_client
+    _http_client = client
+
+
+class _HeaderCollector:
+    """Collects headers the SDK token adds to its connections, see `OAuthToken.authenticate`."""
+
+    def __init__(self):
+        self.headers = {}
+
+    def add_header(self, name: str, value: str):
+        self.headers[name] = value
+
+
+def get_api_domain() -> str:
+    """Returns the Zoho CRM API URL of the data center the SDK (or the HTTP client) was initialized with."""
+    if _http_client is not None:
+        return _http_client.api_domain
+    from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
+    return Initializer.get_initializer().environment.url
+
+
+def get_authorization_headers() -> dict:
+    """
+    Returns the authorization header for requests made outside the SDK,
+    the SDK refreshes the access token in its token store if it is about to expire.
+    """
+    if _http_client is not None:
+        return _http_client.authorization_headers()
+    from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
+    collector = _HeaderCollector()
+    Initializer.get_initializer().token.authenticate(collector)
+    return collector.headers
+
+
+# Persisted access tokens are only reused if they stay valid at least this long, the SDK refreshes them
+# when less than 5 seconds remain
+TOKEN_REUSE_MIN_VALIDITY_SECONDS = 5 * 60
+TOKEN_STORE_HEADERS = ["id", "user_mail", "client_id", "client_secret", "refresh_token", "access_token",
+                       "grant_token", "expiry_time", "redirect_url"]
+
+
+class InvalidTokenError(RuntimeError):
+    """Zoho API rejected the access token (e.g. revoked before its expiry)."""
+
+
+def token_fingerprint(client_id: str, refresh_token: str) -> str:
+    """Identifies the OAuth client and authorization an access token was issued for."""
+    return hashlib.sha256(f"{client_id}:{refresh_token}".encode("utf-8")).hexdigest()
+
+
+def is_token_reusable(expiry_time: Optional[str]) -> bool:
+    """Tells whether an access token expiring at `expiry_time` (epoch milliseconds) is worth reusing."""
+    try:
+        return int(expiry_time) / 1000 - time.time() > TOKEN_REUSE_MIN_VALIDITY_SECONDS
+    except (TypeError, ValueError):
+        return False
+
+
+def set_filestore_token(file_store_path: Path, user_email: str, client_id: str, client_secret: str,
+                        refresh_token: str, access_token: str, expiry_time: str):
+    """Writes the token store with an access token issued earlier, so that the SDK uses it until it expires."""
+    with open(file_store_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(TOKEN_STORE_HEADERS)
+        writer.writerow(["", user_email, client_id, client_secret, refresh_token, access_token, "", expiry_time, ""])
+
+
+def get_access_token() -> Tuple[Optional[str], Optional[str]]:
+    """Returns the current access token of the SDK and its expiry time (epoch milliseconds), if it has any."""
+    if _http_client is not None:
+        return _http_client.get_access_token()
+    if not _sdk_initialized:
+        return None, None
+    from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
+    initializer = Initializer.get_initializer()
+    if initializer is None or initializer.token is None:
+        return None, None
+    return initializer.token.get_access_token(), initializer.token.get_expires_in()
+
+
+def invalidate_access_token():
+    """Marks the SDK's access token as expired, the next request refreshes it."""
+    if _http_client is not None:
+        _http_client.invalidate_access_token()
+        return
+    from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
+    from zcrmsdk.src.com.zoho.api.authenticator.oauth_token import OAuthToken
+    with OAuthToken.lock:
+        Initializer.get_initializer().token.set_expires_in("0")
+    logging.info("Access token was rejected by Zoho API, it will be refreshed.")
+
+
+def retry_on_invalid_token(func):
+    """Retries the call once with a refreshed access token if it fails with `InvalidTokenError`."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except InvalidTokenError:
+            invalidate_access_token()
+            return func(*args, **kwargs)
+    return wrapper
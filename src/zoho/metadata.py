@@ -0,0 +1,96 @@
+import copy
+import logging
+import threading
+from dataclasses import dataclass, field
+from time import time
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_METADATA_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Cache entry keys
+KEY_MODULES = "modules"
+KEY_FIELDS = "fields"
+KEY_FETCHED_AT = "fetched_at"
+KEY_VALUE = "value"
+
+# Field metadata keys
+KEY_API_NAME = "api_name"
+KEY_DATA_TYPE = "data_type"
+
+
+def metadata_scope(datacenter: str, user_email: str) -> str:
+    """Metadata differ between Zoho CRM organizations, entries are kept per datacenter and user."""
+    return f"{datacenter}:{user_email}"
+
+
+@dataclass(slots=True)
+class MetadataCache:
+    """
+    Cache of the module list and of the fields (API names and data types) of each module, loaded lazily
+    and reused for `ttl_seconds`. Persisted in the state by runs, sync actions read it from there too.
+    """
+    scope: str
+    ttl_seconds: float = DEFAULT_METADATA_CACHE_TTL_SECONDS
+    entries: Dict[str, dict] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict], scope: str, ttl_seconds: float = DEFAULT_METADATA_CACHE_TTL_SECONDS
+                  ) -> "MetadataCache":
+        entries = {key: dict(entry) for key, entry in (data or {}).items()}
+        return cls(scope=scope, ttl_seconds=ttl_seconds, entries=entries)
+
+    def to_dict(self) -> dict:
+        """Serializes entries within the TTL, expired ones would be loaded again anyway."""
+        now = time()
+        with self.lock:
+            data = {}
+            for scope, scope_entry in self.entries.items():
+                kept = {}
+                for kind, entry in scope_entry.items():
+                    if kind == KEY_MODULES:
+                        if self._is_fresh(entry, now):
+                            kept[kind] = copy.deepcopy(entry)
+                    else:
+                        module_entries = {module_api_name: copy.deepcopy(module_entry)
+                                          for module_api_name, module_entry in entry.items()
+                                          if self._is_fresh(module_entry, now)}
+                        if module_entries:
+                            kept[kind] = module_entries
+                if kept:
+                    data[scope] = kept
+            return data
+
+    def invalidate(self):
+        """Drops all metadata of the scope, the next access loads them again."""
+        with self.lock:
+            self.entries.pop(self.scope, None)
+        logging.info(f"Metadata cache of {self.scope} invalidated.")
+
+    def get_modules(self, load: Callable[[], List[str]]) -> List[str]:
+        return self._get(KEY_MODULES, None, load)
+
+    def get_fields(self, module_api_name: str, load: Callable[[], List[dict]]) -> List[dict]:
+        return self._get(KEY_FIELDS, module_api_name, load)
+
+    def _get(self, kind: str, module_api_name: Optional[str], load: Callable[[], list]) -> list:
+        with self.lock:
+            scope_entry = self.entries.get(self.scope, {})
+            entry = scope_entry.get(kind, {})
+            if module_api_name is not None:
+                entry = entry.get(module_api_name, {})
+            if entry and self._is_fresh(entry, time()):
+                return entry[KEY_VALUE]
+
+        value = load()
+        with self.lock:
+            scope_entry = self.entries.setdefault(self.scope, {})
+            new_entry = {KEY_FETCHED_AT: time(), KEY_VALUE: value}
+            if module_api_name is None:
+                scope_entry[kind] = new_entry
+            else:
+                scope_entry.setdefault(kind, {})[module_api_name] = new_entry
+        return value
+
+    def _is_fresh(self, entry: dict, now: float) -> bool:
+        return now - entry.get(KEY_FETCHED_AT, 0) <= self.ttl_seconds
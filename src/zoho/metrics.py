@@ -0,0 +1,167 @@
+import contextlib
+import contextvars
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+from zoho.api_credits import ApiCreditScheduler
+from zoho.http_session import ConnectionStats
+
+# Durations are reported in seconds rounded to milliseconds
+SECONDS_DIGITS = 3
+
+# Metrics of the module whose extraction runs in the current context, see `recorded_in`
+current_module_metrics: contextvars.ContextVar[Optional["ModuleMetrics"]] = contextvars.ContextVar(
+    "current_module_metrics", default=None)
+
+
+@dataclass(slots=True)
+class PageMetrics:
+    """
+    Timing and volume of a single bulk read job (page). The queue wait runs from the job's creation
+    (or resumption) until it is completed, the download includes all its attempts, of which extracting
+    the zipped result into the slice (unzip and CSV rewrite) is a part. If the result's columns differed
+    from the columns of the table's other slices, the difference is kept in `column_drift`.
+    """
+    page: int
+    job_id: Optional[int] = None
+    job_created: bool = False
+    create_seconds: float = 0.0
+    queue_wait_seconds: float = 0.0
+    status_calls: int = 0
+    download_attempts: int = 0
+    download_seconds: float = 0.0
+    extract_seconds: float = 0.0
+    bytes_downloaded: int = 0
+    rows_written: int = 0
+    column_drift: Optional[dict] = None
+
+    @property
+    def api_calls(self) -> int:
+        return int(self.job_created) + self.status_calls + self.download_attempts
+
+    def as_dict(self) -> dict:
+        values = {key: round(value, SECONDS_DIGITS) if isinstance(value, float) else value
+                  for key, value in asdict(self).items()}
+        return {**values, "transfer_seconds": round(max(self.download_seconds - self.extract_seconds, 0.0),
+                                                    SECONDS_DIGITS),
+                "api_calls": self.api_calls}
+
+
+@dataclass(slots=True)
+class ModuleMetrics:
+    """Metrics of the extraction of a module into an output table: its pages and the durations of its phases."""
+    module_api_name: str
+    output_table_name: str
+    pages: List[PageMetrics] = field(default_factory=list)
+    phase_seconds: Dict[str, float] = field(default_factory=dict)
+    # Rows not read by bulk read jobs (e.g. through COQL)
+    other_rows_written: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def page(self, page: int) -> PageMetrics:
+        page_metrics = PageMetrics(page=page)
+        with self._lock:
+            self.pages.append(page_metrics)
+        return page_metrics
+
+    def add_rows(self, rows: int):
+        with self._lock:
+            self.other_rows_written += rows
+
+    def add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + seconds
+
+    def as_dict(self, api_calls: int = 0, api_credits: int = 0) -> dict:
+        with self._lock:
+            pages = [page.as_dict() for page in self.pages]
+            phase_seconds = dict(self.phase_seconds)
+            other_rows_written = self.other_rows_written
+        return {
+            "module": self.module_api_name,
+            "output_table": self.output_table_name,
+            "pages": len(pages),
+            "rows_written": sum(page["rows_written"] for page in pages) + other_rows_written,
+            "bytes_downloaded": sum(page["bytes_downloaded"] for page in pages),
+            "status_calls": sum(page["status_calls"] for page in pages),
+            "api_calls": api_calls,
+            "api_credits": api_credits,
+            "queue_wait_seconds": round(sum(page["queue_wait_seconds"] for page in pages), SECONDS_DIGITS),
+            "transfer_seconds": round(sum(page["transfer_seconds"] for page in pages), SECONDS_DIGITS),
+            "extract_seconds": round(sum(page["extract_seconds"] for page in pages), SECONDS_DIGITS),
+            "pages_with_column_drift": sum(page["column_drift"] is not None for page in pages),
+            "phase_seconds": {name: round(seconds, SECONDS_DIGITS) for name, seconds in phase_seconds.items()},
+            "page_metrics": pages,
+        }
+
+
+@dataclass(slots=True)
+class RunMetrics:
+    """Collects metrics of all modules extracted by a run, reported at its end (see `report`)."""
+    modules: List[ModuleMetrics] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def module(self, module_api_name: str, output_table_name: str) -> ModuleMetrics:
+        module_metrics = ModuleMetrics(module_api_name=module_api_name, output_table_name=output_table_name)
+        with self._lock:
+            self.modules.append(module_metrics)
+        return module_metrics
+
+    def report(self, api_credits: ApiCreditScheduler, connection_stats: ConnectionStats) -> dict:
+        """
+        Returns the machine-readable report of the run: totals and metrics of each module and its pages.
+        API calls and credits of each module are taken from the `api_credits` scheduler, which counts all calls
+        attributed to its output table (incl. metadata requests), but not requests for OAuth tokens.
+        """
+        calls_by_table, credits_by_table = api_credits.usage_by_table()
+        with self._lock:
+            modules = list(self.modules)
+        with connection_stats.lock:
+            requests_sent, connections_opened = connection_stats.requests_sent, connection_stats.connections_opened
+        return {
+            "wall_seconds": round(time.monotonic() - self.started_at, SECONDS_DIGITS),
+            "api_calls": sum(calls_by_table.values()),
+            "api_credits": sum(credits_by_table.values()),
+            "http_requests": requests_sent,
+            "connections_opened": connections_opened,
+            "modules": [module.as_dict(calls_by_table.get(module.output_table_name, 0),
+                                       credits_by_table.get(module.output_table_name, 0)) for module in modules],
+        }
+
+
+def summary(report: dict) -> dict:
+    """The report without metrics of individual pages, short enough for a single log line."""
+    return {**report, "modules": [{key: value for key, value in module.items() if key != "page_metrics"}
+                                  for module in report["modules"]]}
+
+
+def current() -> Optional[ModuleMetrics]:
+    return current_module_metrics.get()
+
+
+@contextlib.contextmanager
+def recorded_in(module_metrics: ModuleMetrics) -> Iterator[ModuleMetrics]:
+    """
+    Records metrics of the extraction within the context into `module_metrics`. Like `api_credits.attributed_to`,
+    threads do not inherit the context, tasks submitted to executors have to run in a copy of it.
+    """
+    token = current_module_metrics.set(module_metrics)
+    try:
+        yield module_metrics
+    finally:
+        current_module_metrics.reset(token)
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Adds the duration of the block to the phase of the current module, if metrics are recorded."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        module_metrics = current()
+        if module_metrics is not None:
+            module_metrics.add_phase(name, time.monotonic() - start)
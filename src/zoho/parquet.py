@@ -0,0 +1,66 @@
+import importlib.util
+from typing import TYPE_CHECKING, Dict
+
+from zoho.slicing import open_slice
+
+if TYPE_CHECKING:
+    import pyarrow
+
+# Bytes of CSV parsed into one record batch (and Parquet row group), bounds the memory used per slice
+PARQUET_BATCH_BYTES = 16 * 1024 * 1024
+PARQUET_COMPRESSION = "snappy"
+PARQUET_SUFFIX = ".parquet"
+
+
+def is_available() -> bool:
+    """Tells whether pyarrow, an optional dependency needed for Parquet output, is installed."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def arrow_type(data_type: str) -> "pyarrow.DataType":
+    import pyarrow
+
+    return {
+        "integer": pyarrow.int64(),
+        "bigint": pyarrow.int64(),
+        "double": pyarrow.float64(),
+        "decimal": pyarrow.float64(),
+        "currency": pyarrow.float64(),
+        "percent": pyarrow.float64(),
+        "boolean": pyarrow.bool_(),
+        "date": pyarrow.date32(),
+        "datetime": pyarrow.timestamp("ms", tz="UTC"),
+    }.get(data_type, pyarrow.string())
+
+
+def write_parquet(slice_path: str, data_types: Dict[str, str], destination_path: str) -> int:
+    """
+    Converts a headerless CSV slice (gzip compressed or not) with the columns of `data_types` into a Parquet file
+    with typed columns (see `arrow_type`) and returns the number of rows. The slice is parsed and written
+    in record batches of `PARQUET_BATCH_BYTES`, multiline quoted values are supported. Empty values of typed
+    columns become nulls, empty strings stay empty.
+    """
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    columns = list(data_types)
+    schema = pyarrow.schema([(column, arrow_type(data_type)) for column, data_type in data_types.items()])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(destination_path, schema, compression=PARQUET_COMPRESSION) as writer:
+        with open_slice(slice_path, "rb") as source:
+            if not source.peek(1):
+                # Empty slice, there is nothing to parse
+                return rows
+            reader = pyarrow.csv.open_csv(
+                source,
+                read_options=pyarrow.csv.ReadOptions(column_names=columns, block_size=PARQUET_BATCH_BYTES),
+                parse_options=pyarrow.csv.ParseOptions(newlines_in_values=True),
+                convert_options=pyarrow.csv.ConvertOptions(
+                    column_types=schema, strings_can_be_null=False, timestamp_parsers=[pyarrow.csv.ISO8601],
+                    true_values=["true"], false_values=["false"]),
+            )
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return rows
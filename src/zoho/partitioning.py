@@ -0,0 +1,177 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple, Union
+
+from zoho.bulk_read import (
+    DEFAULT_MAX_CONCURRENT_JOBS,
+    BulkReadJobBatch,
+    BulkReadJobFilteringCriteriaGroup,
+    BulkReadJobFilteringCriterion,
+)
+from zoho.checkpoint import CheckpointStore
+from zoho.column_layout import ColumnLayout
+from zoho.client import ZohoClient
+from zoho.polling import PollingScheduler
+from zoho.result_cache import BulkReadResultCache
+from zoho.watermark import WatermarkTracker
+
+DEFAULT_INITIAL_PARTITIONS = 4
+DEFAULT_MIN_PARTITION_SECONDS = 60 * 60
+# Criterion value matching records with an empty field
+EMPTY_VALUE = "${EMPTY}"
+
+
+@dataclass(slots=True, frozen=True)
+class TimeRange:
+    """
+    Half-open range [start, end) of a datetime field. A missing start or end makes the range unbounded
+    on that side, so that records outside the configured boundaries are not lost.
+    An `empty` range matches the records whose field is empty instead, which no other range matches.
+    """
+    start: Optional[datetime]
+    end: Optional[datetime]
+    empty: bool = False
+
+    def __str__(self) -> str:
+        if self.empty:
+            return "(empty)"
+        start = self.start.isoformat(timespec="seconds") if self.start else "-inf"
+        end = self.end.isoformat(timespec="seconds") if self.end else "+inf"
+        return f"[{start}, {end})"
+
+    def criteria(self, field_name: str) -> List[BulkReadJobFilteringCriterion]:
+        if self.empty:
+            return [BulkReadJobFilteringCriterion(field_name=field_name, comparator="equal", value=EMPTY_VALUE)]
+        criteria = []
+        if self.start is not None:
+            criteria.append(BulkReadJobFilteringCriterion(
+                field_name=field_name, comparator="greater_equal", value=self.start.isoformat(timespec="seconds")))
+        if self.end is not None:
+            criteria.append(BulkReadJobFilteringCriterion(
+                field_name=field_name, comparator="less_than", value=self.end.isoformat(timespec="seconds")))
+        return criteria
+
+    def can_split(self, min_width: timedelta) -> bool:
+        return (not self.empty and self.start is not None and self.end is not None
+                and (self.end - self.start) >= 2 * min_width)
+
+    def split(self) -> Tuple["TimeRange", "TimeRange"]:
+        middle = (self.start + (self.end - self.start) / 2).replace(microsecond=0)
+        return TimeRange(self.start, middle), TimeRange(middle, self.end)
+
+
+def ranges_from_boundaries(boundaries: List[datetime]) -> List[TimeRange]:
+    """
+    Creates disjoint ranges covering the whole timeline from sorted boundaries:
+    (-inf, b0), [b0, b1), ..., [bn, +inf), and the range of records with an empty field.
+    """
+    edges: List[Optional[datetime]] = [None, *sorted(boundaries), None]
+    return [*(TimeRange(start, end) for start, end in zip(edges, edges[1:])), TimeRange(None, None, empty=True)]
+
+
+def even_boundaries(start: datetime, end: datetime, partitions: int) -> List[datetime]:
+    step = (end - start) / partitions
+    return [(start + step * i).replace(microsecond=0) for i in range(partitions)] + [end]
+
+
+@dataclass(slots=True)
+class PartitionedBulkRead:
+    """
+    Reads a module as independent bulk read job batches, each restricted to a disjoint range of a datetime field,
+    and writes all of them into the same destination folder (sliced table).
+
+    Partition boundaries adapt: if the first page of a range reports more records, the range is split in half
+    and both halves are read instead, until ranges fit a single page or reach `min_partition_width`.
+    Slices of all partitions share the columns (`field_names`) of the first one downloaded.
+    Partitions whose jobs would exceed the API credit budget are left unread and `budget_reached` is set.
+    """
+    module_api_name: str
+    destination_folder: str
+    file_name: str
+    partition_field: str
+    ranges: List[TimeRange]
+    field_names: Optional[List[str]] = None
+    filtering_criteria: Optional[
+        Union[BulkReadJobFilteringCriterion, BulkReadJobFilteringCriteriaGroup]
+    ] = None
+    min_partition_width: timedelta = timedelta(seconds=DEFAULT_MIN_PARTITION_SECONDS)
+    max_concurrent_jobs: int = DEFAULT_MAX_CONCURRENT_JOBS
+    job_slots: Optional[threading.BoundedSemaphore] = None
+    polling_scheduler: PollingScheduler = field(default_factory=PollingScheduler)
+    checkpoint_store: Optional[CheckpointStore] = None
+    result_cache: Optional[BulkReadResultCache] = None
+    watermark: Optional[WatermarkTracker] = None
+    client: Optional[ZohoClient] = None
+    compression_level: Optional[int] = None
+    budget_reached: bool = False
+    _query_field_names: Optional[List[str]] = None
+    # Columns of slices of all partitions, fixed by the first one downloaded
+    _column_layout: ColumnLayout = field(default_factory=ColumnLayout)
+
+    def download_all_partitions(self):
+        # Field names of the output are only known after the first download, all partitions query the configured ones
+        self._query_field_names = self.field_names
+        job_slots = self.job_slots or threading.BoundedSemaphore(self.max_concurrent_jobs)
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_jobs,
+                                thread_name_prefix=f"{self.module_api_name}-partition") as executor:
+            pending: Set[Future] = {self._submit_partition(executor, time_range, job_slots)
+                                    for time_range in self.ranges}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for time_range in future.result():
+                            pending.add(self._submit_partition(executor, time_range, job_slots))
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def _submit_partition(self, executor: ThreadPoolExecutor, time_range: TimeRange,
+                          job_slots: threading.BoundedSemaphore) -> Future:
+        """Runs the partition in a copy of the context, so that its API calls are attributed to the output table."""
+        return executor.submit(contextvars.copy_context().run, self._download_partition, time_range, job_slots)
+
+    def _download_partition(self, time_range: TimeRange, job_slots: threading.BoundedSemaphore) -> List[TimeRange]:
+        """Downloads the range and returns an empty list, or returns its halves if it needs to be split."""
+        batch = BulkReadJobBatch(
+            module_api_name=self.module_api_name,
+            destination_folder=self.destination_folder,
+            file_name=self.file_name,
+            field_names=self._query_field_names,
+            filtering_criteria=self._partition_criteria(time_range),
+            max_concurrent_jobs=self.max_concurrent_jobs,
+            job_slots=job_slots,
+            polling_scheduler=self.polling_scheduler,
+            checkpoint_store=self.checkpoint_store,
+            result_cache=self.result_cache,
+            watermark=self.watermark,
+            client=self.client,
+            compression_level=self.compression_level,
+            column_layout=self._column_layout,
+        )
+        splittable = time_range.can_split(self.min_partition_width)
+        logging.info(f"Reading partition {time_range} of module {self.module_api_name}.")
+        if not batch.download_all_pages(stop_if_more_pages=splittable):
+            logging.info(f"Partition {time_range} of module {self.module_api_name} has more than one page "
+                         f"of records, splitting it.")
+            return list(time_range.split())
+
+        if batch.budget_reached:
+            self.budget_reached = True
+        if self._column_layout.columns is not None:
+            self.field_names = self._column_layout.columns
+        return []
+
+    def _partition_criteria(self, time_range: TimeRange) -> Optional[
+            Union[BulkReadJobFilteringCriterion, BulkReadJobFilteringCriteriaGroup]]:
+        group = time_range.criteria(self.partition_field)
+        if self.filtering_criteria is not None:
+            group.append(self.filtering_criteria)
+        if len(group) <= 1:
+            return group[0] if group else None
+        return BulkReadJobFilteringCriteriaGroup(group=group, group_operator="and")
@@ -0,0 +1,127 @@
+import logging
+import random
+import statistics
+import threading
+from dataclasses import dataclass, field
+from time import monotonic, time
+from typing import List, Optional
+
+from zoho.api_credits import ApiCreditScheduler
+
+# Polling intervals
+INITIAL_POLLING_INTERVAL_SECONDS = 2.0
+MAX_POLLING_INTERVAL_SECONDS = 60.0
+POLLING_JITTER_RATIO = 0.2
+DEFAULT_JOB_TIMEOUT_SECONDS = 2 * 60 * 60
+
+# How fast the polling interval grows in each job state. Jobs that are only ADDED are usually picked up
+# within seconds, queued and running jobs are checked less and less often.
+BACKOFF_FACTORS = {
+    "ADDED": 1.25,
+    "QUEUED": 1.5,
+    "IN PROGRESS": 1.5,
+}
+DEFAULT_BACKOFF_FACTOR = 1.5
+
+
+@dataclass(slots=True)
+class JobPoll:
+    """
+    Polling of a single bulk read job. Created by `PollingScheduler.start_job` right after the job is created
+    (or resumed), tells how long to wait before the next status call and enforces the job's deadline.
+    """
+    scheduler: "PollingScheduler"
+    page: int
+    module_api_name: str = ""
+    created_at: float = field(default_factory=monotonic)
+    status_calls: int = 0
+    _state: Optional[str] = None
+    _interval: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return monotonic() - self.created_at
+
+    def next_delay(self, state: str) -> float:
+        """
+        Registers one status call that returned `state` and returns the number of seconds to wait before
+        the next one. Raises `TimeoutError` once the job's deadline is reached.
+        """
+        self.status_calls += 1
+        elapsed = self.elapsed
+        remaining_until_deadline = self.scheduler.job_timeout - elapsed
+        if remaining_until_deadline <= 0:
+            raise TimeoutError(
+                f"Bulk read job for {self.describe()} did not complete within {self.scheduler.job_timeout:.0f} seconds "
+                f"(last state: {state}, {self.status_calls} status calls)."
+            )
+
+        if state != self._state or not self._interval:
+            self._interval = self.scheduler.initial_interval
+        else:
+            self._interval = min(self._interval * BACKOFF_FACTORS.get(state, DEFAULT_BACKOFF_FACTOR),
+                                 self.scheduler.max_interval)
+        self._state = state
+
+        delay = self._interval
+        predicted_remaining = self.scheduler.predict_completion() - elapsed
+        if predicted_remaining > delay:
+            # Earlier pages tell us the job will not be ready sooner, skip the status calls in between
+            delay = min(predicted_remaining, self.scheduler.max_interval)
+
+        if self.scheduler.api_credits is not None:
+            delay *= self.scheduler.api_credits.polling_factor()
+
+        delay *= random.uniform(1 - self.scheduler.jitter, 1 + self.scheduler.jitter)
+        return max(min(delay, remaining_until_deadline), 0.0)
+
+    def describe(self) -> str:
+        return f"page {self.page} of module {self.module_api_name}" if self.module_api_name else f"page {self.page}"
+
+    def complete(self, observed: bool = True):
+        """
+        Logs the job's completion. Its duration is used to predict completion of later jobs only if it was
+        `observed`, unlike a resumed job found completed already, which completed some unknown time ago.
+        """
+        duration = self.elapsed
+        if observed:
+            self.scheduler.record_completion(duration)
+        logging.info(f"Bulk read job for {self.describe()} ready after {duration:.1f} seconds "
+                     f"and {self.status_calls + 1} status calls.")
+
+
+@dataclass(slots=True)
+class PollingScheduler:
+    """
+    Adaptive scheduler of bulk read job status calls. Starts with short intervals, backs off with jitter
+    while the job moves through its states and uses the time earlier jobs took to complete to predict
+    when the next one will be ready. Polls less often when the run nears its API credit budget.
+    """
+    initial_interval: float = INITIAL_POLLING_INTERVAL_SECONDS
+    max_interval: float = MAX_POLLING_INTERVAL_SECONDS
+    job_timeout: float = DEFAULT_JOB_TIMEOUT_SECONDS
+    jitter: float = POLLING_JITTER_RATIO
+    api_credits: Optional[ApiCreditScheduler] = None
+    _completion_times: List[float] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def start_job(self, page: int, module_api_name: str = "", created_at: Optional[float] = None) -> JobPoll:
+        """
+        Starts polling of a job created just now, or at `created_at` (seconds since the epoch) if it was created
+        earlier, e.g. by an interrupted run, so that its deadline and duration are measured from its creation.
+        """
+        job_poll = JobPoll(scheduler=self, page=page, module_api_name=module_api_name)
+        if created_at is not None:
+            job_poll.created_at -= max(time() - created_at, 0.0)
+        return job_poll
+
+    def record_completion(self, duration: float):
+        with self._lock:
+            self._completion_times.append(duration)
+
+    def predict_completion(self) -> float:
+        """Returns the expected number of seconds between job creation and completion, 0 if unknown."""
+        with self._lock:
+            if not self._completion_times:
+                return 0.0
+            return statistics.median(self._completion_times)
@@ -0,0 +1,140 @@
+import collections
+import contextlib
+import logging
+import os
+import re
+import sys
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Counter, Iterator, Optional
+
+# Environment variable enabling profiling regardless of the configuration, e.g. ZOHO_PROFILING=1
+PROFILING_ENV_VAR = "ZOHO_PROFILING"
+DEFAULT_SAMPLING_INTERVAL_SECONDS = 0.01
+# Frames kept per traced allocation, more frames tell more about the callers but slow allocations down
+TRACEMALLOC_FRAMES = 5
+TOP_ALLOCATIONS = 20
+TOP_FUNCTIONS = 10
+SAMPLES_FILE_NAME = "stack_samples.folded"
+MEMORY_FILE_NAME = "memory.txt"
+SNAPSHOT_FILE_NAME = "{index:04d}_{label}.snapshot"
+
+# Profiler of the running process, if profiling is enabled, see `profiled`
+_active: Optional["Profiler"] = None
+
+
+def enabled_by_environment() -> bool:
+    return os.environ.get(PROFILING_ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+class StackSampler:
+    """
+    Samples stacks of all threads but its own every `interval` seconds in a background thread and counts them
+    as folded stacks (`thread;outer function;...;inner function`), the input of flame graph tools.
+    Stacks of waiting threads are sampled too, so the samples show where wall time goes, not just CPU time.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLING_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples: Counter[str] = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._thread.ident:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join([thread_names.get(thread_id, str(thread_id)), *reversed(stack)])] += 1
+
+    def top_functions(self, count: int = TOP_FUNCTIONS) -> list:
+        """Returns the functions most often on top of the sampled stacks, with their number of samples."""
+        functions: Counter[str] = collections.Counter()
+        for stack, samples in self.samples.items():
+            functions[stack.rsplit(";", 1)[-1]] += samples
+        return functions.most_common(count)
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, samples in self.samples.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+class Profiler:
+    """
+    Profiles a run: samples stacks of all threads (see `StackSampler`) and takes `tracemalloc` snapshots
+    at phase boundaries (see `checkpoint`). Snapshots are dumped into `output_dir` (loadable by
+    `tracemalloc.Snapshot.load`) and their traced memory and top allocations are summarized in `memory.txt`.
+    """
+
+    def __init__(self, output_dir: Path, interval: float = DEFAULT_SAMPLING_INTERVAL_SECONDS):
+        self.output_dir = output_dir
+        self.sampler = StackSampler(interval)
+        self._snapshots = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.sampler.start()
+        self.checkpoint("start")
+
+    def stop(self):
+        self.checkpoint("end")
+        self.sampler.stop()
+        tracemalloc.stop()
+        self.sampler.write(self.output_dir / SAMPLES_FILE_NAME)
+        top_functions = ", ".join(f"{function}: {samples}" for function, samples in self.sampler.top_functions())
+        logging.info(f"Profiling data written into {self.output_dir}. Functions sampled most often: {top_functions}.")
+
+    def checkpoint(self, label: str):
+        """Takes a memory snapshot labelled by the phase that just ended, snapshots may be taken from any thread."""
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        top_stats = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        with self._lock:
+            self._snapshots += 1
+            file_name = SNAPSHOT_FILE_NAME.format(index=self._snapshots, label=re.sub(r"[^\w.-]+", "_", label))
+            snapshot.dump(str(self.output_dir / file_name))
+            with open(self.output_dir / MEMORY_FILE_NAME, "a", encoding="utf-8") as f:
+                f.write(f"{file_name}: {label}, traced memory {current / 1024 / 1024:.1f} MB "
+                        f"(peak {peak / 1024 / 1024:.1f} MB)\n")
+                for stat in top_stats:
+                    f.write(f"    {stat}\n")
+
+
+def checkpoint(label: str):
+    """Marks the end of a phase for the active profiler, does nothing unless profiling is enabled."""
+    if _active is not None:
+        _active.checkpoint(label)
+
+
+@contextlib.contextmanager
+def profiled(output_dir: Path, interval: float = DEFAULT_SAMPLING_INTERVAL_SECONDS) -> Iterator[Profiler]:
+    """Profiles the code within the context, the profiling data is written into `output_dir` even if it fails."""
+    global _active
+    profiler = Profiler(output_dir, interval)
+    profiler.start()
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = None
+        profiler.stop()
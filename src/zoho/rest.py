@@ -0,0 +1,34 @@
+from typing import Optional
+
+import requests
+
+import zoho.initialization
+from zoho.client import REQUEST_TIMEOUT_SECONDS
+
+
+def api_request(session: requests.Session, method: str, path: str, description: str,
+                headers: Optional[dict] = None, **kwargs) -> Optional[dict]:
+    """
+    Calls a Zoho CRM REST API endpoint outside the SDK, authorized by the SDK's token (or the HTTP client's).
+    Returns the JSON body, None if the response has no content (nothing matched).
+    A request rejected as unauthorized is retried once with a refreshed access token.
+    """
+    response = _send(session, method, path, headers, **kwargs)
+    if response.status_code == 401:
+        zoho.initialization.invalidate_access_token()
+        response = _send(session, method, path, headers, **kwargs)
+    if response.status_code in (204, 304):
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to {description}, status code {response.status_code}: {response.text}")
+    return response.json()
+
+
+def _send(session: requests.Session, method: str, path: str, headers: Optional[dict], **kwargs) -> requests.Response:
+    return session.request(
+        method,
+        zoho.initialization.get_api_domain() + path,
+        headers={**(headers or {}), **zoho.initialization.get_authorization_headers()},
+        timeout=REQUEST_TIMEOUT_SECONDS,
+        **kwargs,
+    )
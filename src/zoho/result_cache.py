@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import time
+from typing import Dict, List, Optional
+
+# Zoho keeps results of bulk read jobs downloadable for one day
+RESULT_RETENTION_SECONDS = 24 * 60 * 60
+MAX_RESULT_CACHE_TTL_SECONDS = RESULT_RETENTION_SECONDS
+CHECKSUM_BUFFER_SIZE = 1024 * 1024
+
+# Cache entry keys
+KEY_JOB_ID = "job_id"
+KEY_COMPLETED_AT = "completed_at"
+KEY_MORE_RECORDS = "more_records"
+KEY_CHECKSUM = "checksum"
+KEY_FIELD_NAMES = "field_names"
+KEY_SLICE = "slice"
+
+
+def page_fingerprint(query_fingerprint: str, page: int) -> str:
+    return hashlib.sha256(f"{query_fingerprint}:{page}".encode("utf-8")).hexdigest()
+
+
+def file_checksum(path: str) -> str:
+    checksum = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_BUFFER_SIZE), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def link_or_copy(source: str, destination: str):
+    """Hard links the file if possible (no extra disk space), copies it otherwise."""
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+@dataclass(slots=True)
+class BulkReadResultCache:
+    """
+    Cache of bulk read job results keyed by the fingerprint of the job's query (module, fields, criteria and page).
+    Stores the job id, its completion time and the checksum of the downloaded slice, so that the same query
+    repeated within `ttl_seconds` downloads the existing job's result instead of queueing a new job,
+    or reuses the slice kept in `slice_dir` if it is still there and intact.
+    """
+    ttl_seconds: float
+    slice_dir: Optional[Path] = None
+    entries: Dict[str, dict] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict], ttl_seconds: float, slice_dir: Optional[Path] = None
+                  ) -> "BulkReadResultCache":
+        cache = cls(ttl_seconds=min(ttl_seconds, MAX_RESULT_CACHE_TTL_SECONDS), slice_dir=slice_dir)
+        cache.entries = {key: dict(entry) for key, entry in (data or {}).items() if not cache._expired(entry)}
+        return cache
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {key: dict(entry) for key, entry in self.entries.items() if not self._expired(entry)}
+
+    def peek(self, key: str) -> Optional[dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self.entries[key]
+                entry = None
+            return dict(entry) if entry is not None else None
+
+    def get(self, key: str) -> Optional[dict]:
+        """Like `peek`, but logs the cache hit or miss."""
+        entry = self.peek(key)
+        if entry is None:
+            logging.info(f"Bulk read result cache miss for query {key[:12]}.")
+            return None
+        logging.info(f"Bulk read result cache hit for query {key[:12]}: job {entry[KEY_JOB_ID]}.")
+        return entry
+
+    def job_completed(self, key: str, job_id: int, more_records: bool):
+        with self.lock:
+            self.entries[key] = {KEY_JOB_ID: job_id, KEY_COMPLETED_AT: time(), KEY_MORE_RECORDS: more_records}
+
+    def page_downloaded(self, key: str, slice_path: str, checksum: str, field_names: List[str]):
+        with self.lock:
+            if key not in self.entries:
+                return
+            self.entries[key].update({KEY_CHECKSUM: checksum, KEY_FIELD_NAMES: field_names,
+                                      KEY_SLICE: os.path.basename(slice_path)})
+        if self.slice_dir is not None:
+            self.slice_dir.mkdir(parents=True, exist_ok=True)
+            link_or_copy(slice_path, str(self.slice_dir / key))
+
+    def discard(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def restore_slice(self, key: str, entry: dict, destination_folder: str) -> bool:
+        """Puts the locally cached slice of the entry to `destination_folder` if it exists and matches its checksum."""
+        if self.slice_dir is None or not entry.get(KEY_CHECKSUM) or not entry.get(KEY_SLICE):
+            return False
+        cached_slice_path = str(self.slice_dir / key)
+        if not os.path.exists(cached_slice_path) or file_checksum(cached_slice_path) != entry[KEY_CHECKSUM]:
+            return False
+        link_or_copy(cached_slice_path, os.path.join(destination_folder, entry[KEY_SLICE]))
+        logging.info(f"Reused locally cached slice of query {key[:12]}.")
+        return True
+
+    def _expired(self, entry: dict) -> bool:
+        return time() - entry.get(KEY_COMPLETED_AT, 0) > self.ttl_seconds
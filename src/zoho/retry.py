@@ -0,0 +1,94 @@
+import logging
+import random
+import zipfile
+from dataclasses import dataclass
+from time import sleep
+from typing import Callable, Optional, TypeVar
+
+import requests
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+# HTTP status codes of responses the API may answer successfully when the request is repeated. Rate limited
+# requests (429) are not among them, they are repeated once the limit resets by the API credit scheduler
+# (see `zoho.http_session.CountingHTTPAdapter`).
+RETRYABLE_STATUS_CODES = (408, 500, 502, 503, 504)
+
+DEFAULT_MAX_ATTEMPTS = 4
+INITIAL_BACKOFF_SECONDS = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+BACKOFF_JITTER_RATIO = 0.2
+
+T = TypeVar("T")
+
+
+class TransientApiError(RuntimeError):
+    """The API failed to answer a request for a reason that may pass, e.g. with a 5xx status code."""
+
+
+class TruncatedResultError(TransientApiError):
+    """A downloaded bulk read job result is not a complete zip archive."""
+
+
+# Errors of a single request that do not say anything about the request itself: the connection failed,
+# timed out or was closed before the whole response was received
+RETRYABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+    Urllib3HTTPError,
+    zipfile.BadZipFile,
+    TransientApiError,
+)
+
+
+def raise_for_transient_status(status_code: Optional[int], description: str):
+    """Raises `TransientApiError` if the status code of the response to the request is worth retrying."""
+    if status_code in RETRYABLE_STATUS_CODES:
+        raise TransientApiError(f"Failed to {description}, API answered with status code {status_code}.")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Tells whether the failed request may succeed when repeated. The Zoho SDK wraps errors of the underlying
+    requests into `SDKException`, so explicit causes of the error are inspected as well. Errors merely raised
+    while handling another one (`__context__`) are not, a fatal error does not become retryable by that.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, RETRYABLE_ERRORS):
+            return True
+        seen.add(id(error))
+        error = getattr(error, "cause", None) or error.__cause__
+    return False
+
+
+@dataclass(slots=True)
+class RetryPolicy:
+    """
+    Repeats calls failing with retryable errors (see `is_retryable`) with exponential backoff and jitter,
+    other errors are fatal and raised right away, as is the last error once `max_attempts` are used up.
+    """
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    initial_backoff: float = INITIAL_BACKOFF_SECONDS
+    max_backoff: float = MAX_BACKOFF_SECONDS
+    jitter: float = BACKOFF_JITTER_RATIO
+
+    def backoff(self, attempt: int) -> float:
+        """Returns the number of seconds to wait after the failed `attempt` (counted from 1)."""
+        delay = min(self.initial_backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def call(self, func: Callable[..., T], description: str, *args, **kwargs) -> T:
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt)
+                logging.warning(f"Failed to {description} (attempt {attempt} of {self.max_attempts}), "
+                                f"retrying in {delay:.1f} seconds. Reason: {e}")
+                sleep(delay)
+                attempt += 1
@@ -0,0 +1,99 @@
+import csv
+import hashlib
+import logging
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from zoho.slicing import is_compressed, open_slice
+
+ROW_HASH_INDEX_TAG = "zoho-row-hash-index"
+ROW_HASH_INDEX_FILE_SUFFIX = ".row_hash_index.sqlite"
+# Zoho updates Modified_Time on system updates that change nothing else in the record
+DEFAULT_IGNORED_FIELDS = ["Modified_Time"]
+# Ids looked up in one query, below the SQLite limit of bound parameters
+LOOKUP_BATCH_SIZE = 500
+FILTERED_SLICE_SUFFIX = ".filtered"
+
+
+def row_hash(field_names: List[str], row: List[str], ignored_indexes: Iterable[int]) -> bytes:
+    ignored = set(ignored_indexes)
+    row_digest = hashlib.blake2b(digest_size=16)
+    for index, (field_name, value) in enumerate(zip(field_names, row)):
+        if index not in ignored:
+            row_digest.update(field_name.encode("utf-8") + b"\x1f" + value.encode("utf-8") + b"\x1e")
+    return row_digest.digest()
+
+
+@dataclass(slots=True)
+class RowHashIndex:
+    """
+    Persistent SQLite index of the hash of each record's row by its Id. Slices of an incrementally loaded table
+    are filtered through it, so that records returned by the API again without any change in their fields
+    (other than `ignored_fields`) are not loaded into Storage again.
+    """
+    path: str
+    ignored_fields: List[str]
+    _connection: Optional[sqlite3.Connection] = None
+
+    def __post_init__(self):
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS row_hashes (id TEXT PRIMARY KEY, hash BLOB NOT NULL) WITHOUT ROWID")
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def filter_slice(self, slice_path: str, field_names: List[str], id_column_name: str,
+                     compression_level: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Rewrites the headerless slice without rows whose hash did not change since they were indexed,
+        indexes the changed ones and returns the numbers of kept and dropped rows.
+        The slice is replaced by a new file, never modified in place, as it may be hard linked elsewhere.
+        Gzip compressed slices are rewritten compressed with `compression_level`.
+        """
+        id_index = field_names.index(id_column_name)
+        ignored_indexes = [index for index, name in enumerate(field_names) if name in self.ignored_fields]
+        filtered_path = slice_path + FILTERED_SLICE_SUFFIX
+        kept = dropped = 0
+        with open_slice(slice_path, "r", encoding="utf-8", newline="") as source, \
+                open_slice(filtered_path, "w", compressed=is_compressed(slice_path),
+                           compression_level=compression_level, encoding="utf-8", newline="") as destination:
+            writer = csv.writer(destination, lineterminator="\n")
+            batch = []
+            for row in csv.reader(source):
+                batch.append(row)
+                if len(batch) == LOOKUP_BATCH_SIZE:
+                    batch_kept = self._filter_batch(batch, field_names, id_index, ignored_indexes, writer)
+                    kept, dropped = kept + batch_kept, dropped + len(batch) - batch_kept
+                    batch = []
+            batch_kept = self._filter_batch(batch, field_names, id_index, ignored_indexes, writer)
+            kept, dropped = kept + batch_kept, dropped + len(batch) - batch_kept
+        os.replace(filtered_path, slice_path)
+        self._connection.commit()
+        logging.info(f"Skipped {dropped} unchanged rows of {os.path.basename(slice_path)}, kept {kept} rows.")
+        return kept, dropped
+
+    def _filter_batch(self, batch: List[List[str]], field_names: List[str], id_index: int,
+                      ignored_indexes: List[int], writer) -> int:
+        """Writes the changed rows of the batch, indexes them and returns their number."""
+        if not batch:
+            return 0
+        hashed_rows = [(row, row[id_index], row_hash(field_names, row, ignored_indexes)) for row in batch]
+        ids = list({record_id for _, record_id, _ in hashed_rows})
+        indexed = dict(self._connection.execute(
+            f"SELECT id, hash FROM row_hashes WHERE id IN ({', '.join('?' * len(ids))})", ids))
+
+        changed = {}
+        kept = 0
+        for row, record_id, hash_value in hashed_rows:
+            if indexed.get(record_id) == hash_value:
+                continue
+            writer.writerow(row)
+            kept += 1
+            # A repeated occurrence of the record is written again only if it differs
+            indexed[record_id] = changed[record_id] = hash_value
+        self._connection.executemany("INSERT OR REPLACE INTO row_hashes (id, hash) VALUES (?, ?)", changed.items())
+        return kept
@@ -0,0 +1,232 @@
+import contextlib
+import gzip
+import logging
+import os
+from typing import IO, BinaryIO, ContextManager, List, Optional
+
+READ_BUFFER_SIZE = 1024 * 1024
+# Slices whose size is within this ratio of the target size are kept as they are
+KEPT_SLICE_SIZE_TOLERANCE = 0.5
+# Compressed slices are closed once they reach this share of the target size, as their size is only estimated
+COMPRESSED_SLICE_FILL_RATIO = 0.95
+REBALANCED_SLICE_NAME = "slice_{index:05d}.csv"
+PARTIAL_SLICE_SUFFIX = ".part"
+GZIP_SUFFIX = ".gz"
+DEFAULT_COMPRESSION_LEVEL = 6
+
+QUOTE = ord('"')
+QUOTE_BYTE = b'"'
+NEWLINE = b"\n"
+
+
+def is_compressed(path: str) -> bool:
+    return path.endswith(GZIP_SUFFIX)
+
+
+def slice_file_name(name: str, compression_level: Optional[int]) -> str:
+    """Name of a slice, gzip compressed slices (with a `compression_level`) are named `*.gz`."""
+    return name + GZIP_SUFFIX if compression_level is not None else name
+
+
+def open_slice(path: str, mode: str = "rb", compressed: Optional[bool] = None,
+               compression_level: Optional[int] = None, **kwargs) -> IO:
+    """
+    Opens a slice like `open`, gzip compressed slices are compressed or decompressed on the fly.
+    Whether the slice is compressed is told by its name, unless `compressed` is given (e.g. for partial files).
+    """
+    if compressed is None:
+        compressed = is_compressed(path)
+    if not compressed:
+        return open(path, mode, **kwargs)
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+    if compression_level is None:
+        compression_level = DEFAULT_COMPRESSION_LEVEL
+    return gzip.open(path, mode, compresslevel=compression_level, **kwargs)
+
+
+def compressing_writer(destination: BinaryIO, compression_level: Optional[int]) -> ContextManager[BinaryIO]:
+    """
+    Returns a writer compressing data written through it into `destination` if a `compression_level` is given,
+    the destination itself otherwise.
+    """
+    if compression_level is None:
+        return contextlib.nullcontext(destination)
+    # Fixed modification time, so that the same data always gives the same file (and checksum)
+    return gzip.GzipFile(fileobj=destination, mode="wb", compresslevel=compression_level, mtime=0)
+
+
+class RecordBoundaryScanner:
+    """
+    Finds ends of CSV records in a stream of chunks. A line break ends a record only if it is not inside
+    a quoted field, i.e. if the number of quotes since the start of the stream is even (quotes inside
+    quoted fields are doubled, so they do not change the parity).
+    """
+
+    def __init__(self):
+        self._quoted = False
+
+    def record_end(self, chunk: bytes, start: int) -> Optional[int]:
+        """
+        Returns the position right after the first record end at or after `start` in the chunk, None if there
+        is none. Must be called for each chunk of the stream in turn, quotes before `start` are accounted for.
+        """
+        quoted = self._quoted ^ (chunk.count(QUOTE, 0, start) % 2 == 1)
+        position = start
+        while True:
+            newline = chunk.find(NEWLINE, position)
+            if newline < 0:
+                return None
+            quoted ^= chunk.count(QUOTE, position, newline) % 2 == 1
+            if not quoted:
+                return newline + 1
+            position = newline + 1
+
+    def consumed(self, chunk: bytes):
+        """Registers the whole chunk as read."""
+        self._quoted ^= chunk.count(QUOTE) % 2 == 1
+
+
+class RecordCounter:
+    """
+    Binary file wrapper counting CSV records written through it, i.e. line breaks outside quoted fields,
+    plus the last record if it has no line break.
+    """
+
+    def __init__(self, destination: BinaryIO):
+        self.destination = destination
+        self._line_breaks = 0
+        self._quoted = False
+        self._last_byte = NEWLINE
+
+    @property
+    def records(self) -> int:
+        return self._line_breaks + (self._last_byte != NEWLINE)
+
+    def write(self, data: bytes) -> int:
+        # Parts between quotes alternate between outside and inside of quoted fields
+        parts = data.split(QUOTE_BYTE)
+        self._line_breaks += sum(part.count(NEWLINE) for part in parts[1 if self._quoted else 0::2])
+        self._quoted ^= len(parts) % 2 == 0
+        if data:
+            self._last_byte = data[-1:]
+        return self.destination.write(data)
+
+
+class SliceWriter:
+    """
+    Writes records into slices of about `target_size` bytes (on disk), each closed on a record boundary.
+    With a `compression_level`, the slices are gzip compressed.
+    """
+
+    def __init__(self, folder: str, target_size: int, reserved_names: List[str],
+                 compression_level: Optional[int] = None):
+        self.folder = folder
+        self.target_size = target_size
+        self.reserved_names = set(reserved_names)
+        self.compression_level = compression_level
+        self.slice_names: List[str] = []
+        self._index = 0
+        self._stack: Optional[contextlib.ExitStack] = None
+        self._file: Optional[BinaryIO] = None
+        self._raw_file: Optional[BinaryIO] = None
+        self._written = 0
+        # Compressed size per byte of records in the last closed slice, no compression is assumed until one is closed
+        self._compression_ratio = 1.0
+
+    def copy_records(self, source: BinaryIO):
+        """Appends the records of a slice, starting a new slice whenever the current one reaches the target size."""
+        scanner = RecordBoundaryScanner()
+        last_byte = NEWLINE
+        while chunk := source.read(READ_BUFFER_SIZE):
+            position = 0
+            while position < len(chunk):
+                if self._file is None:
+                    self._open()
+                start = position + max(self._bytes_to_target() - 1, 0)
+                end = scanner.record_end(chunk, start) if start < len(chunk) else None
+                if end is None:
+                    self._write(chunk[position:])
+                    break
+                self._write(chunk[position:end])
+                if self._is_full():
+                    self.close_slice()
+                position = end
+            scanner.consumed(chunk)
+            last_byte = chunk[-1:]
+        if last_byte != NEWLINE:
+            # The last record of the slice has no line break, the next slice's records must not continue it
+            self._write(NEWLINE)
+
+    def _size(self) -> int:
+        if self.compression_level is None:
+            return self._raw_file.tell()
+        # Compressed data is buffered, the size of the slice is only known once it is closed. Flushing the compressor
+        # to learn it would cost compression, the size is estimated by the compression ratio of the last slice instead.
+        return max(self._raw_file.tell(), int(self._written * self._compression_ratio))
+
+    def _is_full(self) -> bool:
+        fill_ratio = COMPRESSED_SLICE_FILL_RATIO if self.compression_level is not None else 1.0
+        return self._size() >= self.target_size * fill_ratio
+
+    def _bytes_to_target(self) -> int:
+        """Estimates how many more bytes of records fit into the current slice, by its compression ratio so far."""
+        size = self._size()
+        ratio = size / self._written if size and self._written else 1.0
+        return int((self.target_size - size) / ratio)
+
+    def _open(self):
+        while True:
+            self._index += 1
+            name = slice_file_name(REBALANCED_SLICE_NAME.format(index=self._index), self.compression_level)
+            if name not in self.reserved_names:
+                break
+        self.slice_names.append(name)
+        self._stack = contextlib.ExitStack()
+        self._raw_file = self._stack.enter_context(
+            open(os.path.join(self.folder, name + PARTIAL_SLICE_SUFFIX), "wb"))
+        self._file = self._stack.enter_context(compressing_writer(self._raw_file, self.compression_level))
+        self._written = 0
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._written += len(data)
+
+    def close_slice(self):
+        if self._file is None:
+            return
+        self._stack.close()
+        self._stack = self._file = self._raw_file = None
+        name = self.slice_names[-1]
+        partial_path = os.path.join(self.folder, name + PARTIAL_SLICE_SUFFIX)
+        if self.compression_level is not None and self._written:
+            self._compression_ratio = os.path.getsize(partial_path) / self._written
+        os.replace(partial_path, os.path.join(self.folder, name))
+
+
+def rebalance_slices(folder: str, target_size: int, compression_level: Optional[int] = None) -> List[str]:
+    """
+    Rewrites the slices (CSV files without header) of a sliced table into slices of about `target_size` bytes,
+    so that Storage imports them in parallel. Records are never split, multiline quoted values stay whole.
+    Slices already about the target size are kept, larger ones are split and smaller ones merged.
+    Slices are replaced by new files, never modified in place, as they may be hard linked elsewhere.
+    Gzip compressed slices are decompressed on the fly, new slices are compressed with `compression_level`, if given.
+    Returns names of all slices of the table.
+    """
+    slice_names = sorted(name for name in os.listdir(folder) if os.path.isfile(os.path.join(folder, name)))
+    lower, upper = target_size * (1 - KEPT_SLICE_SIZE_TOLERANCE), target_size * (1 + KEPT_SLICE_SIZE_TOLERANCE)
+    kept = [name for name in slice_names if lower <= os.path.getsize(os.path.join(folder, name)) <= upper]
+    rewritten = [name for name in slice_names if name not in kept]
+    if len(rewritten) < 2 and not any(os.path.getsize(os.path.join(folder, name)) > upper for name in rewritten):
+        return slice_names
+
+    writer = SliceWriter(folder, target_size, slice_names, compression_level)
+    for name in rewritten:
+        path = os.path.join(folder, name)
+        with open_slice(path, "rb") as source:
+            writer.copy_records(source)
+        os.remove(path)
+    writer.close_slice()
+    logging.info(f"Rebalanced {len(rewritten)} slices of {folder} into {len(writer.slice_names)} slices "
+                 f"of about {target_size} bytes, kept {len(kept)} slices.")
+    return sorted(kept + writer.slice_names)
@@ -0,0 +1,113 @@
+import csv
+import io
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, List, Optional
+
+from zoho.slicing import open_slice
+
+WATERMARK_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+SCAN_BUFFER_SIZE = 1024 * 1024
+
+
+def parse_datetime(value: str) -> Optional[datetime]:
+    """Parses an ISO 8601 datetime of Zoho API, naive values are taken as UTC. Returns None for anything else."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def format_datetime(value: datetime) -> str:
+    return value.strftime(WATERMARK_FORMAT)
+
+
+class RecordTap:
+    """
+    Binary file wrapper passing everything written through it to `destination` (if any) while splitting it into
+    CSV records and calling `on_value` with the value of the column at `column_index` of each of them.
+
+    Data is only parsed up to the last line break outside of quoted values, the rest waits for the next write,
+    so records with line breaks in values or split between writes are parsed whole.
+    """
+
+    def __init__(self, destination: Optional[BinaryIO], column_index: int, on_value: Callable[[str], None]):
+        self.destination = destination
+        self.column_index = column_index
+        self.on_value = on_value
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        written = self.destination.write(data) if self.destination is not None else len(data)
+        self._buffer += data
+        end = self._buffer.rfind(b"\n") + 1
+        # An odd number of quotes before the line break means it is inside a quoted value
+        while end and self._buffer.count(b'"', 0, end) % 2:
+            end = self._buffer.rfind(b"\n", 0, end - 1) + 1
+        if end:
+            self._parse(bytes(self._buffer[:end]))
+            del self._buffer[:end]
+        return written
+
+    def close(self):
+        """Parses the last record if the data does not end with a line break."""
+        if self._buffer:
+            self._parse(bytes(self._buffer))
+            self._buffer.clear()
+
+    def _parse(self, data: bytes):
+        for row in csv.reader(io.StringIO(data.decode("utf-8"), newline="")):
+            if len(row) > self.column_index:
+                self.on_value(row[self.column_index])
+
+
+@dataclass(slots=True)
+class WatermarkTracker:
+    """
+    Tracks the maximum value of a datetime field among all records extracted in a run (the watermark),
+    so that the next incremental run can continue from what the API actually returned
+    instead of from the local start time of the run. Shared by all threads reading one module.
+    """
+    field_name: str
+    _value: Optional[datetime] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def value(self) -> Optional[str]:
+        with self._lock:
+            return format_datetime(self._value) if self._value is not None else None
+
+    def observe(self, value: str):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            return
+        with self._lock:
+            if self._value is None or parsed > self._value:
+                self._value = parsed
+
+    def tap(self, field_names: List[str], destination: Optional[BinaryIO] = None) -> Optional[RecordTap]:
+        """Returns a writer observing the watermark field of CSV records written through it, None if it is missing."""
+        if self.field_name not in field_names:
+            return None
+        return RecordTap(destination, field_names.index(self.field_name), self.observe)
+
+    def observe_slice(self, path: str, field_names: Optional[List[str]]):
+        """Observes the watermark field of a headerless slice written earlier (e.g. by an interrupted run)."""
+        if not field_names:
+            return
+        tap = self.tap(field_names)
+        if tap is None:
+            return
+        with open_slice(path, "rb") as f:
+            for chunk in iter(lambda: f.read(SCAN_BUFFER_SIZE), b""):
+                tap.write(chunk)
+        tap.close()
+
+
+def lower_bound(watermark: str, overlap: timedelta) -> str:
+    """Returns the lower bound of the next incremental run: the watermark moved back by the overlap window."""
+    return format_datetime(datetime.strptime(watermark, WATERMARK_FORMAT) - overlap)
@@ -0,0 +1,108 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mock
+
+from zoho.api_credits import (
+    SLOW_POLLING_FACTOR,
+    ApiCreditScheduler,
+    attributed_to,
+    rate_limit_wait,
+    request_credits,
+)
+from zoho.http_session import ConnectionStats, create_session
+from zoho.polling import PollingScheduler
+
+API = "https://www.zohoapis.eu"
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    """Rejects the first request as rate limited, answers the following ones."""
+    protocol_version = "HTTP/1.1"
+    requests_received = 0
+
+    def do_GET(self):
+        type(self).requests_received += 1
+        status = 429 if self.requests_received == 1 else 200
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestApiCreditScheduler(unittest.TestCase):
+
+    def test_credits_of_requests(self):
+        self.assertEqual(50, request_credits("POST", f"{API}/crm/bulk/v2/read"))
+        self.assertEqual(1, request_credits("GET", f"{API}/crm/bulk/v2/read/111"))
+        self.assertEqual(1, request_credits("GET", f"{API}/crm/bulk/v2/read/111/result"))
+        self.assertEqual(0, request_credits("POST", "https://accounts.zoho.eu/oauth/v2/token"))
+
+    def test_budget_stops_new_jobs_but_not_calls_of_created_ones(self):
+        scheduler = ApiCreditScheduler(budget=100)
+
+        with attributed_to("leads"), scheduler.job_reserved() as reserved:
+            self.assertTrue(reserved)
+            scheduler.charge("POST", f"{API}/crm/bulk/v2/read")
+        with attributed_to("leads"):
+            for _ in range(10):
+                scheduler.charge("GET", f"{API}/crm/bulk/v2/read/111")
+        with attributed_to("deals"), scheduler.job_reserved() as reserved:
+            self.assertFalse(reserved)
+        with attributed_to("leads"):
+            for _ in range(50):
+                scheduler.charge("GET", f"{API}/crm/bulk/v2/read/111")
+
+        self.assertEqual({"leads": 110}, scheduler.credits_by_table)
+        self.assertEqual("API credits used: 110 of the budget of 100 (leads: 110)", scheduler.report())
+
+    def test_reservations_of_concurrent_jobs_count_against_budget(self):
+        scheduler = ApiCreditScheduler(budget=100)
+
+        with scheduler.job_reserved() as first, scheduler.job_reserved() as second:
+            with scheduler.job_reserved() as third:
+                self.assertEqual([True, True, False], [first, second, third])
+            scheduler.charge("POST", f"{API}/crm/bulk/v2/read")
+        # The unused reservation is released, the spent one is charged
+        with scheduler.job_reserved() as reserved:
+            self.assertTrue(reserved)
+
+    def test_polling_slows_down_near_budget(self):
+        scheduler = ApiCreditScheduler(budget=100)
+        polling = PollingScheduler(jitter=0, api_credits=scheduler)
+
+        self.assertEqual(polling.initial_interval, polling.start_job(1).next_delay("QUEUED"))
+        scheduler.credits_by_table["leads"] = 80
+        self.assertEqual(polling.initial_interval * SLOW_POLLING_FACTOR, polling.start_job(2).next_delay("QUEUED"))
+
+    def test_rate_limit_headers(self):
+        exhausted = mock.Mock(status_code=200, headers={"X-RATELIMIT-REMAINING": "0", "X-RATELIMIT-RESET": "30"})
+        remaining = mock.Mock(status_code=200, headers={"X-RATELIMIT-REMAINING": "10"})
+
+        self.assertEqual(30, rate_limit_wait(exhausted))
+        self.assertIsNone(rate_limit_wait(remaining))
+
+    def test_rate_limited_request_is_repeated(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        stats = ConnectionStats()
+        scheduler = ApiCreditScheduler()
+        session = create_session(4, stats, scheduler=scheduler)
+
+        with attributed_to("leads"):
+            response = session.get(f"http://127.0.0.1:{server.server_port}/crm/bulk/v2/read/111")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, stats.requests_sent)
+        self.assertEqual({"leads": 1}, scheduler.credits_by_table)
+
+
+if __name__ == "__main__":
+    unittest.main()
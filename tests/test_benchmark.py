@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/..")
+
+from benchmarks.fake_zoho import FakeZohoConfig, page_csv  # noqa: E402
+from benchmarks.run_benchmark import PHASES, run_benchmark  # noqa: E402
+
+
+class TestFakeZoho(unittest.TestCase):
+
+    def test_page_csv_is_deterministic_with_multiline_values(self):
+        config = FakeZohoConfig(rows_per_page=50, multiline_ratio=1.0)
+        content = page_csv(config, 2)
+
+        self.assertEqual(content, page_csv(config, 2))
+        self.assertTrue(content.startswith(b"Id,Last_Name,Description,"))
+        self.assertGreater(content.count(b"\n"), 51)
+
+
+class TestRunBenchmark(unittest.TestCase):
+
+    def test_all_phases_extract_all_rows(self):
+        config = FakeZohoConfig(pages=2, rows_per_page=200, extra_fields=2)
+
+        results = run_benchmark(config)
+
+        self.assertEqual([result.phase for result in results], PHASES)
+        for result in results:
+            self.assertEqual(400, result.rows, result.phase)
+            self.assertGreater(result.wall_seconds, 0)
+            self.assertGreater(result.peak_rss_bytes, 0)
+            self.assertGreaterEqual(result.peak_disk_bytes, result.data_bytes)
@@ -0,0 +1,422 @@
+import contextlib
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from pathlib import Path
+
+import mock
+import requests
+from zcrmsdk.src.com.zoho.crm.api.bulk_read import FileBodyWrapper, JobDetail, ResponseWrapper, Result
+from zcrmsdk.src.com.zoho.crm.api.util import APIResponse, Choice, StreamWrapper
+
+from zoho.api_credits import ApiCreditScheduler
+from zoho.bulk_read import BulkReadJobBatch, DownloadedSlice, JobStatus, copy_csv_body
+from zoho.checkpoint import CheckpointStore
+from zoho.column_layout import ColumnLayout
+from zoho.polling import PollingScheduler
+from zoho.result_cache import BulkReadResultCache, file_checksum
+from zoho.retry import RetryPolicy, TruncatedResultError
+
+
+class FakeBulkReadApi:
+    """Stands in for the SDK calls of `BulkReadJobBatch`, completing each job immediately
+    and recording the order in which jobs are created and downloaded."""
+
+    def __init__(self, pages: int, download_gate: threading.Event = None):
+        self.pages = pages
+        self.download_gate = download_gate
+        self.events = []
+        self.lock = threading.Lock()
+        self.downloading = 0
+        self.max_in_flight = 0
+
+    def create(self, batch: BulkReadJobBatch):
+        with self.lock:
+            self.events.append(("create", batch._current_page))
+            self.max_in_flight = max(self.max_in_flight, self.downloading + 1)
+        batch._current_job_id = batch._current_page
+
+    def get_details(self, batch: BulkReadJobBatch) -> JobStatus:
+        return JobStatus(state="COMPLETED", more_records=batch._current_page < self.pages)
+
+    def download_result(self, batch: BulkReadJobBatch, job_id=None) -> DownloadedSlice:
+        with self.lock:
+            self.downloading += 1
+        if self.download_gate is not None:
+            self.download_gate.wait(timeout=5)
+        with self.lock:
+            self.downloading -= 1
+            self.events.append(("download", job_id))
+        return DownloadedSlice(file_name=f"{job_id}.csv", checksum="")
+
+    def patch(self) -> contextlib.ExitStack:
+        stack = contextlib.ExitStack()
+        stack.enter_context(mock.patch.object(BulkReadJobBatch, "create", lambda batch: self.create(batch)))
+        stack.enter_context(mock.patch.object(BulkReadJobBatch, "get_details", lambda batch: self.get_details(batch)))
+        stack.enter_context(mock.patch.object(BulkReadJobBatch, "download_result",
+                                              lambda batch, job_id=None: self.download_result(batch, job_id)))
+        return stack
+
+
+class TestDownloadAllPages(unittest.TestCase):
+
+    @staticmethod
+    def _batch(max_concurrent_jobs: int) -> BulkReadJobBatch:
+        return BulkReadJobBatch(module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv",
+                                max_concurrent_jobs=max_concurrent_jobs)
+
+    def test_serial_by_default(self):
+        api = FakeBulkReadApi(pages=3)
+        with api.patch():
+            self._batch(max_concurrent_jobs=1).download_all_pages()
+
+        self.assertEqual([("create", 1), ("download", 1), ("create", 2), ("download", 2),
+                          ("create", 3), ("download", 3)], api.events)
+
+    def test_next_page_created_while_previous_downloads(self):
+        gate = threading.Event()
+        api = FakeBulkReadApi(pages=2, download_gate=gate)
+
+        def create(batch):
+            api.create(batch)
+            if batch._current_page == 2:
+                gate.set()
+
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "create", create):
+            self._batch(max_concurrent_jobs=2).download_all_pages()
+
+        self.assertEqual(("create", 2), api.events[1])
+        self.assertCountEqual([("download", 1), ("download", 2)], api.events[2:])
+
+    def test_in_flight_jobs_are_capped(self):
+        api = FakeBulkReadApi(pages=6)
+        with api.patch():
+            self._batch(max_concurrent_jobs=2).download_all_pages()
+
+        self.assertLessEqual(api.max_in_flight, 2)
+        self.assertEqual(6, len([event for event in api.events if event[0] == "download"]))
+
+    def test_failed_download_is_raised(self):
+        api = FakeBulkReadApi(pages=2)
+
+        def download_result(batch, job_id=None):
+            raise RuntimeError("download failed")
+
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "download_result", download_result):
+            with self.assertRaises(RuntimeError):
+                self._batch(max_concurrent_jobs=2).download_all_pages()
+
+    def test_no_jobs_are_created_beyond_budget(self):
+        api = FakeBulkReadApi(pages=3)
+        api_credits = ApiCreditScheduler(budget=100)
+
+        def create(batch):
+            api_credits.charge("POST", "https://www.zohoapis.eu/crm/bulk/v2/read")
+            api.create(batch)
+
+        batch = self._batch(max_concurrent_jobs=2)
+        batch.polling_scheduler = PollingScheduler(api_credits=api_credits)
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "create", create), self.assertLogs(level="WARNING"):
+            self.assertTrue(batch.download_all_pages())
+
+        self.assertTrue(batch.budget_reached)
+        self.assertEqual([("create", 1), ("create", 2)], [event for event in api.events if event[0] == "create"])
+        self.assertCountEqual([("download", 1), ("download", 2)],
+                              [event for event in api.events if event[0] == "download"])
+
+    def test_transient_failures_are_retried_with_the_same_job(self):
+        api = FakeBulkReadApi(pages=2)
+        failures = {"details": 1, "download": 2}
+
+        def get_details(batch):
+            if failures["details"]:
+                failures["details"] -= 1
+                raise requests.ConnectionError("connection reset")
+            return api.get_details(batch)
+
+        def download_result(batch, job_id=None):
+            if failures["download"]:
+                failures["download"] -= 1
+                raise TruncatedResultError("incomplete zip")
+            return api.download_result(batch, job_id)
+
+        batch = self._batch(max_concurrent_jobs=1)
+        batch.retry_policy = RetryPolicy(initial_backoff=0)
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "get_details", get_details), \
+                mock.patch.object(BulkReadJobBatch, "download_result", download_result):
+            batch.download_all_pages()
+
+        self.assertEqual([("create", 1), ("download", 1), ("create", 2), ("download", 2)], api.events)
+
+
+class TestCopyCsvBody(unittest.TestCase):
+
+    def test_header_is_stripped_and_body_copied_verbatim(self):
+        body = b'1,"multi\nline ""quoted"" note",x\r\n2,,y\r\n'
+        source = io.BytesIO(b'\xef\xbb\xbfId,Description,"Last_Name"\r\n' + body)
+        destination = io.BytesIO()
+
+        field_names = copy_csv_body(source, destination)
+
+        self.assertEqual(["Id", "Description", "Last_Name"], field_names)
+        self.assertEqual(body, destination.getvalue())
+
+    def test_body_with_other_header_is_remapped_onto_layout(self):
+        layout = ColumnLayout(columns=["Id", "Description", "Last_Name"])
+        source = io.BytesIO(b'Last_Name,Email,Id\r\n"Doe","a@b.c",1\r\n"multi\nline",,2\r\n')
+        destination = io.BytesIO()
+
+        field_names = copy_csv_body(source, destination, column_layout=layout)
+
+        self.assertEqual(["Last_Name", "Email", "Id"], field_names)
+        self.assertEqual(b'1,,Doe\n2,,"multi\nline"\n', destination.getvalue())
+        self.assertEqual(["Id", "Description", "Last_Name"], layout.columns)
+
+
+class TestCheckpointResume(unittest.TestCase):
+
+    def test_rerun_skips_downloaded_pages_and_reuses_jobs(self):
+        destination = tempfile.mkdtemp()
+        api = FakeBulkReadApi(pages=3)
+
+        def download_result(batch, job_id=None):
+            if job_id == 2:
+                raise RuntimeError("connection reset")
+            api.download_result(batch, job_id)
+            batch.column_layout.fix(["Id"])
+            open(os.path.join(destination, f"{job_id}.csv"), "w").close()
+            return DownloadedSlice(file_name=f"{job_id}.csv", checksum="")
+
+        def batch(store: CheckpointStore) -> BulkReadJobBatch:
+            return BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv",
+                                    checkpoint_store=store)
+
+        saved_states = []
+        store = CheckpointStore(on_change=lambda: saved_states.append(store.to_dict()))
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "download_result", download_result):
+            with self.assertRaises(RuntimeError):
+                batch(store).download_all_pages()
+
+            api.events.clear()
+            resumed = batch(CheckpointStore.from_dict(saved_states[-1]))
+            with mock.patch.object(BulkReadJobBatch, "download_result", lambda batch, job_id=None: api.download_result(
+                    batch, job_id)):
+                resumed.download_all_pages()
+
+        self.assertEqual([("download", 2), ("create", 3), ("download", 3)], api.events)
+        self.assertEqual(["Id"], resumed.field_names)
+
+    @staticmethod
+    def _batch(store: CheckpointStore) -> BulkReadJobBatch:
+        return BulkReadJobBatch(module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv",
+                                checkpoint_store=store)
+
+    def test_jobs_older_than_result_retention_are_not_reused(self):
+        api = FakeBulkReadApi(pages=1)
+        batch = self._batch(CheckpointStore())
+        with mock.patch("zoho.checkpoint.time", return_value=time.time() - 25 * 60 * 60):
+            batch.checkpoint_store.for_query(batch.fingerprint()).job_created(1, 111)
+
+        with api.patch():
+            batch.download_all_pages()
+
+        self.assertEqual([("create", 1), ("download", 1)], api.events)
+
+    def test_reused_job_is_polled_from_its_creation(self):
+        api = FakeBulkReadApi(pages=1)
+        batch = self._batch(CheckpointStore())
+        created_at = time.time() - 30 * 60
+        with mock.patch("zoho.checkpoint.time", return_value=created_at):
+            batch.checkpoint_store.for_query(batch.fingerprint()).job_created(1, 111)
+
+        with api.patch(), mock.patch.object(PollingScheduler, "start_job", autospec=True,
+                                            side_effect=PollingScheduler.start_job) as start_job:
+            batch.download_all_pages()
+
+        start_job.assert_called_once_with(batch.polling_scheduler, 1, "Leads", created_at)
+        self.assertEqual([("download", 111)], api.events)
+        self.assertEqual(0, batch.polling_scheduler.predict_completion())
+
+    def test_reused_job_whose_result_is_unavailable_is_recreated(self):
+        api = FakeBulkReadApi(pages=2)
+        batch = self._batch(CheckpointStore())
+        checkpoint = batch.checkpoint_store.for_query(batch.fingerprint())
+        checkpoint.job_created(1, 111)
+
+        def download_result(batch, job_id=None):
+            if job_id == 111:
+                raise RuntimeError("bulk read job result expired")
+            return api.download_result(batch, job_id)
+
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "download_result", download_result), \
+                self.assertLogs(level="WARNING"):
+            batch.download_all_pages()
+
+        self.assertEqual([("create", 1), ("download", 1), ("create", 2), ("download", 2)], api.events)
+        self.assertEqual(1, checkpoint.job_id(1))
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_repeated_query_reuses_cached_slices_or_jobs(self):
+        cache_dir = tempfile.mkdtemp()
+        api = FakeBulkReadApi(pages=2)
+
+        def download_result(batch, job_id=None):
+            api.download_result(batch, job_id)
+            content = f"{job_id},Doe\n".encode()
+            with open(os.path.join(batch.destination_folder, f"{job_id}.csv"), "wb") as f:
+                f.write(content)
+            batch.column_layout.fix(["Id", "Last_Name"])
+            return DownloadedSlice(file_name=f"{job_id}.csv", checksum=hashlib.sha256(content).hexdigest())
+
+        def run(cache: BulkReadResultCache) -> str:
+            destination = tempfile.mkdtemp()
+            api.events.clear()
+            BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv",
+                             result_cache=cache).download_all_pages()
+            return destination
+
+        cache = BulkReadResultCache(ttl_seconds=3600, slice_dir=Path(cache_dir))
+        with api.patch(), mock.patch.object(BulkReadJobBatch, "download_result", download_result):
+            run(cache)
+            self.assertEqual(4, len(api.events))
+
+            destination = run(BulkReadResultCache.from_dict(cache.to_dict(), 3600, Path(cache_dir)))
+            self.assertEqual([], api.events)
+            self.assertEqual(["1.csv", "2.csv"], sorted(os.listdir(destination)))
+
+            shutil.rmtree(cache_dir)
+            run(BulkReadResultCache.from_dict(cache.to_dict(), 3600, Path(cache_dir)))
+            self.assertEqual([("download", 1), ("download", 2)], api.events)
+
+            run(BulkReadResultCache.from_dict(cache.to_dict(), 0))
+            self.assertEqual(4, len(api.events))
+
+
+def zipped_result_response(csv_name: str, csv_content: bytes, truncate_at: int = None) -> APIResponse:
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(csv_name, csv_content)
+    file_body = FileBodyWrapper()
+    file_body.set_file(StreamWrapper(name=csv_name.replace(".csv", ".zip"), stream=[zip_buffer.getvalue()[:truncate_at]]))
+    return APIResponse({}, 200, file_body)
+
+
+class TestDownloadResult(unittest.TestCase):
+
+    def test_result_is_unzipped_into_slice_without_header(self):
+        destination = tempfile.mkdtemp()
+        response = zipped_result_response("111.csv", b'Id,Last_Name\n1,"Doe"\n2,Roe\n')
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv")
+
+        with mock.patch("zcrmsdk.src.com.zoho.crm.api.bulk_read.BulkReadOperations") as operations:
+            operations.return_value.download_result.return_value = response
+            downloaded = batch.download_result(111)
+
+        self.assertEqual(["111.csv"], os.listdir(destination))
+        with open(os.path.join(destination, "111.csv"), "rb") as slice_file:
+            self.assertEqual(b'1,"Doe"\n2,Roe\n', slice_file.read())
+        self.assertEqual(["Id", "Last_Name"], batch.column_layout.columns)
+        self.assertEqual(2, downloaded.rows)
+        self.assertGreater(downloaded.bytes_downloaded, 0)
+
+    def test_result_is_compressed_into_slice(self):
+        destination = tempfile.mkdtemp()
+        response = zipped_result_response("111.csv", b'Id,Last_Name\n1,"Doe"\n2,Roe\n')
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv",
+                                 compression_level=1)
+
+        with mock.patch("zcrmsdk.src.com.zoho.crm.api.bulk_read.BulkReadOperations") as operations:
+            operations.return_value.download_result.return_value = response
+            downloaded = batch.download_result(111)
+
+        slice_path = os.path.join(destination, "111.csv.gz")
+        self.assertEqual(["111.csv.gz"], os.listdir(destination))
+        with gzip.open(slice_path, "rb") as slice_file:
+            self.assertEqual(b'1,"Doe"\n2,Roe\n', slice_file.read())
+        self.assertEqual(file_checksum(slice_path), downloaded.checksum)
+
+    def test_later_result_with_other_columns_is_remapped(self):
+        destination = tempfile.mkdtemp()
+        first = zipped_result_response("111.csv", b'Id,Last_Name\n1,"Doe"\n')
+        second = zipped_result_response("112.csv", b'Last_Name,Id,Email\nRoe,2,r@o.e\n')
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv")
+
+        with mock.patch("zcrmsdk.src.com.zoho.crm.api.bulk_read.BulkReadOperations") as operations:
+            operations.return_value.download_result.side_effect = [first, second]
+            self.assertIsNone(batch.download_result(111).column_drift)
+            downloaded = batch.download_result(112)
+
+        with open(os.path.join(destination, "112.csv"), "rb") as slice_file:
+            self.assertEqual(b'2,Roe\n', slice_file.read())
+        self.assertEqual(["Id", "Last_Name"], batch.column_layout.columns)
+        self.assertEqual([], downloaded.column_drift.missing_columns)
+        self.assertEqual(["Email"], downloaded.column_drift.extra_columns)
+
+    def test_truncated_result_is_detected(self):
+        destination = tempfile.mkdtemp()
+        response = zipped_result_response("111.csv", b'Id,Last_Name\n1,"Doe"\n2,Roe\n', truncate_at=-10)
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv")
+
+        with mock.patch("zcrmsdk.src.com.zoho.crm.api.bulk_read.BulkReadOperations") as operations:
+            operations.return_value.download_result.return_value = response
+            with self.assertRaises(TruncatedResultError):
+                batch.download_result(111)
+
+        self.assertEqual([], os.listdir(destination))
+
+    def test_unexpected_response_is_an_error(self):
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder=tempfile.mkdtemp(), file_name="Leads.csv")
+
+        with mock.patch("zcrmsdk.src.com.zoho.crm.api.bulk_read.BulkReadOperations") as operations:
+            operations.return_value.download_result.return_value = APIResponse({}, 200, object())
+            with self.assertRaises(RuntimeError):
+                batch.download_result(111)
+
+
+class TestJobStatus(unittest.TestCase):
+
+    def test_status_is_parsed_from_api_layout(self):
+        self.assertEqual(JobStatus(state="QUEUED"), JobStatus.from_dict({"id": "111", "state": "QUEUED"}))
+        self.assertEqual(JobStatus(state="COMPLETED", page=2, count=10, per_page=200000, more_records=False,
+                                   download_url="/crm/bulk/v2/read/111/result"),
+                         JobStatus.from_dict({"id": "111", "state": "COMPLETED", "result": {
+                             "page": 2, "count": 10, "per_page": 200000, "more_records": False,
+                             "download_url": "/crm/bulk/v2/read/111/result"}}))
+
+    def test_sdk_job_details_are_only_logged_with_debug_logging(self):
+        result = Result()
+        result.set_page(1)
+        result.set_count(200000)
+        result.set_per_page(200000)
+        result.set_more_records(True)
+        result.set_download_url("/crm/bulk/v2/read/111/result")
+        job_detail = JobDetail()
+        job_detail.set_id(111)
+        job_detail.set_state(Choice("COMPLETED"))
+        job_detail.set_result(result)
+        response_wrapper = ResponseWrapper()
+        response_wrapper.set_data([job_detail])
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv",
+                                 _current_job_id=111)
+
+        with mock.patch("zcrmsdk.src.com.zoho.crm.api.bulk_read.BulkReadOperations") as operations, \
+                mock.patch("zoho.bulk_read.log_job_detail") as log_job_detail:
+            operations.return_value.get_bulk_read_job_details.return_value = APIResponse({}, 200, response_wrapper)
+            status = batch.get_details()
+
+        log_job_detail.assert_not_called()
+        self.assertEqual(JobStatus(state="COMPLETED", page=1, count=200000, per_page=200000, more_records=True,
+                                   download_url="/crm/bulk/v2/read/111/result"), status)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+
+import mock
+
+from zoho.bulk_read import BulkReadJobBatch, BulkReadJobFilteringCriterion, bulk_read_query
+from zoho.client import ZohoClient
+from zoho.retry import TransientApiError
+
+
+def json_response(status_code: int, body: dict = None) -> mock.Mock:
+    response = mock.Mock(status_code=status_code, text=str(body))
+    response.json.return_value = body
+    return response
+
+
+def zip_response(csv_name: str, csv_content: bytes) -> mock.MagicMock:
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
+        zip_file.writestr(csv_name, csv_content)
+    response = mock.MagicMock(status_code=200)
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [zip_buffer.getvalue()]
+    return response
+
+
+class TestZohoClient(unittest.TestCase):
+
+    def _client(self, **token) -> ZohoClient:
+        client = ZohoClient(region_code="EU", client_id="client-id", client_secret="client-secret",
+                            refresh_token="refresh-token", **token)
+        client.session = mock.Mock()
+        client.session.post.return_value = json_response(200, {"access_token": "new-token", "expires_in": 3600})
+        return client
+
+    def test_access_token_is_refreshed_only_when_expiring(self):
+        valid = self._client(access_token="old-token", expiry_time=str(int((time.time() + 600) * 1000)))
+        self.assertEqual({"Authorization": "Zoho-oauthtoken old-token"}, valid.authorization_headers())
+        valid.session.post.assert_not_called()
+
+        expired = self._client(access_token="old-token", expiry_time=str(int(time.time() * 1000)))
+        self.assertEqual({"Authorization": "Zoho-oauthtoken new-token"}, expired.authorization_headers())
+        self.assertEqual("https://accounts.zoho.eu/oauth/v2/token", expired.session.post.call_args[0][0])
+
+    def test_rejected_refresh_token_fails(self):
+        client = self._client()
+        client.session.post.return_value = json_response(200, {"error": "invalid_code"})
+
+        with self.assertRaisesRegex(RuntimeError, "invalid_code"):
+            client.authorization_headers()
+
+    def test_unauthorized_request_is_retried_with_refreshed_token(self):
+        client = self._client(access_token="revoked-token", expiry_time=str(int((time.time() + 600) * 1000)))
+        client.session.request.side_effect = [json_response(401), json_response(200, {"modules": [
+            {"api_name": "Leads"}, {"api_name": "Deals"}]})]
+
+        self.assertEqual(["Leads", "Deals"], client.get_modules())
+
+        self.assertEqual("https://www.zohoapis.eu/crm/v2/settings/modules", client.session.request.call_args[0][1])
+        self.assertEqual("Zoho-oauthtoken new-token",
+                         client.session.request.call_args[1]["headers"]["Authorization"])
+
+    def test_server_errors_are_transient(self):
+        client = self._client(access_token="token", expiry_time=str(int((time.time() + 600) * 1000)))
+        client.session.request.side_effect = [json_response(503), json_response(400, {"code": "INVALID_DATA"})]
+
+        with self.assertRaises(TransientApiError):
+            client.get_bulk_read_job(111)
+        with self.assertRaisesRegex(RuntimeError, "INVALID_DATA") as raised:
+            client.get_bulk_read_job(111)
+        self.assertNotIsInstance(raised.exception, TransientApiError)
+
+
+class TestBulkReadWithClient(unittest.TestCase):
+
+    def test_query_in_api_layout(self):
+        criterion = BulkReadJobFilteringCriterion(field_name="Modified_Time", comparator="greater_equal",
+                                                  value="2023-01-01T00:00:00+01:00")
+
+        self.assertEqual({"module": "Leads", "page": 2, "fields": ["Last_Name"],
+                          "criteria": {"api_name": "Modified_Time", "comparator": "greater_equal",
+                                       "value": "2023-01-01T00:00:00+01:00"}},
+                         bulk_read_query("Leads", ["Last_Name"], 2, criterion))
+
+    def test_pages_are_read_through_client(self):
+        destination = tempfile.mkdtemp()
+        client = mock.Mock()
+        client.create_bulk_read_job.side_effect = ["111", "222"]
+        client.get_bulk_read_job.side_effect = lambda job_id: {
+            "state": "COMPLETED", "result": {"more_records": job_id == "111"}}
+        client.download_bulk_read_result.side_effect = lambda job_id: zip_response(
+            f"{job_id}.csv", f"Id,Last_Name\n{job_id},Doe\n".encode())
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder=destination, file_name="Leads.csv",
+                                 field_names=["Last_Name"], client=client)
+
+        self.assertTrue(batch.download_all_pages())
+
+        self.assertEqual(["111.csv", "222.csv"], sorted(os.listdir(destination)))
+        self.assertEqual(["Id", "Last_Name"], batch.field_names)
+        self.assertEqual(2, client.create_bulk_read_job.call_args[0][0]["page"])
+        # The next page queries the configured fields, not the columns of the downloaded one
+        self.assertEqual(["Last_Name"], client.create_bulk_read_job.call_args[0][0]["fields"])
+
+
+if __name__ == "__main__":
+    unittest.main()
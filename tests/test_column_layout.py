@@ -0,0 +1,35 @@
+import threading
+import unittest
+
+from zoho.column_layout import ColumnLayout
+
+
+class TestColumnLayout(unittest.TestCase):
+
+    def test_first_header_fixes_columns(self):
+        layout = ColumnLayout()
+
+        self.assertIsNone(layout.mapping(["Id", "Last_Name"]))
+        self.assertIsNone(layout.mapping(["Id", "Last_Name"]))
+        self.assertEqual(["Id", "Last_Name"], layout.columns)
+
+    def test_other_header_is_mapped_onto_columns(self):
+        layout = ColumnLayout(columns=["Id", "Last_Name", "Email"])
+
+        self.assertEqual([1, 0, None], layout.mapping(["Last_Name", "Id", "Phone"]))
+        drift = layout.drift(["Last_Name", "Id", "Phone"])
+        self.assertEqual(["Email"], drift.missing_columns)
+        self.assertEqual(["Phone"], drift.extra_columns)
+        self.assertEqual("columns are in a different order", str(layout.drift(["Last_Name", "Id", "Email"])))
+
+    def test_columns_are_fixed_once_by_concurrent_headers(self):
+        layout = ColumnLayout()
+        headers = [["Id", f"Field_{index}"] for index in range(8)]
+        threads = [threading.Thread(target=layout.mapping, args=(header,)) for header in headers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn(layout.columns, headers)
+        self.assertEqual(1, sum(layout.drift(header) is None for header in headers))
@@ -0,0 +1,31 @@
+import unittest
+
+from keboola.component.dao import TableMetadata
+
+from zoho.column_types import add_column_data_types, column_data_types
+
+
+class TestColumnTypes(unittest.TestCase):
+
+    def test_manifest_metadata_of_field_data_types(self):
+        data_types = column_data_types(
+            ["Id", "Amount", "Closing_Date", "Modified_Time", "Account_Name", "Custom"],
+            {"Amount": "currency", "Closing_Date": "date", "Modified_Time": "datetime", "Account_Name": "lookup"},
+            "Id")
+        table_metadata = TableMetadata()
+        add_column_data_types(table_metadata, data_types)
+
+        self.assertEqual({"Id": "id", "Amount": "currency", "Closing_Date": "date", "Modified_Time": "datetime",
+                          "Account_Name": "lookup", "Custom": "text"}, data_types)
+        column_metadata = table_metadata.get_column_metadata_for_manifest()
+        self.assertEqual({"Id": "STRING", "Amount": "NUMERIC", "Closing_Date": "DATE", "Modified_Time": "TIMESTAMP",
+                          "Account_Name": "STRING", "Custom": "STRING"},
+                         {column: {item["key"]: item["value"] for item in metadata}["KBC.datatype.basetype"]
+                          for column, metadata in column_metadata.items()})
+        self.assertEqual([{"key": "KBC.datatype.basetype", "value": "NUMERIC"},
+                          {"key": "KBC.datatype.nullable", "value": True},
+                          {"key": "KBC.datatype.type", "value": "currency"}], column_metadata["Amount"])
+
+
+if __name__ == "__main__":
+    unittest.main()
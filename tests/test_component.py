@@ -3,14 +3,23 @@ Created on 12. 11. 2018
 
 @author: esner
 """
+import csv
 import json
 import os
 import tempfile
+import threading
+import time
 import unittest
 
 import mock
 from freezegun import freeze_time
 
+from keboola.component.exceptions import UserException
+
+import zoho.bulk_read
+import zoho.checkpoint
+import zoho.initialization
+import zoho.parquet
 from component import ZohoCRMExtractor
 
 
@@ -26,13 +35,8 @@ class TestComponent(unittest.TestCase):
             comp.run()
 
 
-class TestOutputTableName(unittest.TestCase):
-    """Regression tests for output table name resolution in `_init_params`.
-
-    Guards against the bug where a user-supplied `destination.output_table_name`
-    was parsed but never assigned, so the extractor wrote everything to a table
-    literally named `None`.
-    """
+class ComponentFixtures:
+    """Helpers building the extractor from configuration parameters, mixed into test cases of the component."""
 
     def _build_component(self, parameters: dict) -> ZohoCRMExtractor:
         """Instantiate the extractor against a throwaway datadir whose config.json
@@ -66,6 +70,15 @@ class TestOutputTableName(unittest.TestCase):
             "account": {"user_email": "user@example.com", "zoho_datacenter": "com"},
         }
 
+
+class TestOutputTableName(ComponentFixtures, unittest.TestCase):
+    """Regression tests for output table name resolution in `_init_params`.
+
+    Guards against the bug where a user-supplied `destination.output_table_name`
+    was parsed but never assigned, so the extractor wrote everything to a table
+    literally named `None`.
+    """
+
     def test_custom_output_table_name_is_used(self):
         params = self._base_parameters()
         params["destination"] = {"output_table_name": "custom_leads", "load_mode": "full"}
@@ -85,6 +98,318 @@ class TestOutputTableName(unittest.TestCase):
         self.assertEqual("Leads", comp.output_table_name)
 
 
+class TestModuleConfigs(ComponentFixtures, unittest.TestCase):
+    """Tests resolution of module records download configs of multi-module runs."""
+
+    def test_multiple_modules_with_own_tables_and_filters(self):
+        params = self._base_parameters()
+        del params["module_records_download_config"]
+        params["module_records_download_configs"] = [
+            {"module_name": "Leads", "field_names": ["Id", "Last_Name"]},
+            {"module_name": "Deals", "output_table_name": "deals_2023",
+             "sync_options": {"sync_mode": "advanced",
+                              "filtering_criteria": {"field_name": "Stage", "comparator": "equal", "value": "Won"}}},
+        ]
+
+        comp = self._build_component(params)
+        comp._init_params()
+
+        self.assertEqual(["Leads", "deals_2023"], [config["output_table_name"] for config in comp.module_configs])
+        self.assertEqual(["Id", "Last_Name"], comp.module_configs[0]["field_names"])
+        self.assertIsNone(comp.module_configs[0]["filtering_criteria"])
+        self.assertEqual("Stage", comp.module_configs[1]["filtering_criteria"]["field_name"])
+
+    def test_duplicate_output_tables_fail(self):
+        params = self._base_parameters()
+        params["module_records_download_configs"] = [{"module_name": "Leads"}]
+
+        comp = self._build_component(params)
+        with self.assertRaises(UserException):
+            comp._init_params()
+
+    def test_run_needs_a_module_but_sync_actions_do_not(self):
+        params = self._base_parameters()
+        params["module_records_download_config"] = {}
+        comp = self._build_component(params)
+        comp.statefile = {"metadata_cache": {"com:user@example.com": {"modules": {
+            "fetched_at": time.time(), "value": ["Leads"]}}}}
+
+        comp._init_params()
+        self.assertEqual(["Leads"], comp.get_modules())
+
+        with self.assertRaisesRegex(UserException, "module_records_download_configs"):
+            comp.run()
+
+    def test_incremental_sync_uses_module_state(self):
+        params = self._base_parameters()
+        del params["module_records_download_config"]
+        params["sync_options"] = {"sync_mode": "incremental_sync", "incremental_field": "Modified_Time",
+                                  "operator": "greater_equal", "value": "last_run"}
+        params["module_records_download_configs"] = [{"module_name": "Leads"}, {"module_name": "Deals"}]
+
+        comp = self._build_component(params)
+        comp.statefile = {"last_run": "2023-01-02T00:00:00+0000",
+                          "modules": {"Leads": {"last_run": "2023-01-01T00:00:00+0000"}}}
+        comp._init_params()
+
+        self.assertEqual("2023-01-01T00:00:00+0000", comp.module_configs[0]["filtering_criteria"]["value"])
+        # Deals were not extracted yet, they are downloaded in full
+        self.assertEqual({}, comp.module_configs[1]["filtering_criteria"])
+
+        state = comp._build_state()
+        self.assertEqual({"Leads", "Deals"}, set(state["modules"]))
+        self.assertEqual(comp.ts_start, state["modules"]["Deals"]["last_run"])
+
+    def test_incremental_sync_continues_from_watermark(self):
+        params = self._base_parameters()
+        params["sync_options"] = {"sync_mode": "incremental_sync", "incremental_field": "Modified_Time",
+                                  "operator": "greater_equal", "value": "last_run", "watermark_overlap_minutes": 10}
+
+        comp = self._build_component(params)
+        table = "Leads"
+        comp.statefile = {"modules": {table: {
+            "last_run": "2023-01-02T00:00:00+0000",
+            "watermark": {"field_name": "Modified_Time", "value": "2023-01-01T12:00:00+0100"}}}}
+        comp._init_params()
+
+        self.assertEqual("2023-01-01T11:50:00+0100", comp.module_configs[0]["filtering_criteria"]["value"])
+        self.assertEqual("Modified_Time", comp.module_configs[0]["watermark_field"])
+
+        # No records extracted, the previous watermark is kept
+        state = comp._build_state()
+        self.assertEqual("2023-01-01T12:00:00+0100", state["modules"][table]["watermark"]["value"])
+
+    def test_watermark_is_not_tracked_without_selected_incremental_field(self):
+        params = self._base_parameters()
+        params["module_records_download_config"]["field_names"] = ["Last_Name"]
+        params["sync_options"] = {"sync_mode": "incremental_sync", "incremental_field": "Modified_Time",
+                                  "operator": "greater_equal", "value": "last_run"}
+
+        comp = self._build_component(params)
+        comp.statefile = {"modules": {"Leads": {
+            "last_run": "2023-01-02T00:00:00+0000",
+            "watermark": {"field_name": "Modified_Time", "value": "2023-01-01T12:00:00+0100"}}}}
+        with self.assertLogs(level="WARNING"):
+            comp._init_params()
+
+        self.assertIsNone(comp.module_configs[0]["watermark_field"])
+        self.assertEqual(["Last_Name"], comp.module_configs[0]["field_names"])
+        self.assertNotIn("watermark", comp._build_state()["modules"]["Leads"])
+
+
+class TestAccessTokenReuse(ComponentFixtures, unittest.TestCase):
+    """Tests persisting the access token in the state and reusing it by the next run."""
+
+    def _component_with_token(self, expiry_time: str, refresh_token: str = "refresh-token") -> ZohoCRMExtractor:
+        comp = self._build_component(self._base_parameters())
+        comp._init_params()
+        comp.token_store_path = comp.tmp_dir_path / "token_store.csv"
+        comp.statefile = {"#access_token": json.dumps({
+            "access_token": "access-token", "expiry_time": expiry_time,
+            "fingerprint": zoho.initialization.token_fingerprint("app-key", refresh_token)})}
+        return comp
+
+    def test_valid_token_is_put_into_token_store(self):
+        comp = self._component_with_token(str(int((time.time() + 3600) * 1000)))
+
+        self.assertTrue(comp._restore_access_token())
+
+        with open(comp.token_store_path, newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual("access-token", rows[1][5])
+        self.assertEqual("user@example.com", rows[1][1])
+
+    def test_expiring_or_foreign_token_is_not_reused(self):
+        self.assertFalse(self._component_with_token(str(int((time.time() + 60) * 1000)))._restore_access_token())
+        self.assertFalse(self._component_with_token(str(int((time.time() + 3600) * 1000)),
+                                                    refresh_token="other")._restore_access_token())
+
+    def test_current_token_is_persisted(self):
+        comp = self._build_component(self._base_parameters())
+        comp._init_params()
+
+        with mock.patch("zoho.initialization.get_access_token", return_value=("new-token", "1700000000000")):
+            state = comp._build_state()
+
+        token = json.loads(state["#access_token"])
+        self.assertEqual("new-token", token["access_token"])
+        self.assertEqual("1700000000000", token["expiry_time"])
+
+
+class TestMetadataCache(ComponentFixtures, unittest.TestCase):
+    """Tests serving sync actions from the metadata cache in the state."""
+
+    def test_datetime_fields_are_listed_from_cache_without_client(self):
+        comp = self._build_component(self._base_parameters())
+        comp.statefile = {"metadata_cache": {"com:user@example.com": {"fields": {"Leads": {
+            "fetched_at": time.time(),
+            "value": [{"api_name": "Last_Name", "data_type": "text"},
+                      {"api_name": "Modified_Time", "data_type": "datetime"}]}}}}}
+
+        with mock.patch.object(ZohoCRMExtractor, "_init_client") as init_client:
+            fields = comp._list_fields("datetime")
+
+        init_client.assert_not_called()
+        self.assertEqual(["Modified_Time"], [field.value for field in fields])
+
+    def test_invalidated_cache_is_loaded_again(self):
+        params = self._base_parameters()
+        params["advanced_options"] = {"invalidate_metadata_cache": True}
+        comp = self._build_component(params)
+        comp.statefile = {"metadata_cache": {"com:user@example.com": {"modules": {
+            "fetched_at": time.time(), "value": ["Leads"]}}}}
+        comp._init_params()
+
+        with mock.patch.object(ZohoCRMExtractor, "_load_modules", return_value=["Leads", "Deals"]) as load_modules:
+            self.assertEqual(["Leads", "Deals"], comp.get_modules())
+
+        load_modules.assert_called_once()
+
+
+class TestClientBackend(ComponentFixtures, unittest.TestCase):
+    """Tests initializing the thin HTTP client instead of the SDK."""
+
+    def test_http_backend_reuses_token_without_sdk(self):
+        params = self._base_parameters()
+        params["advanced_options"] = {"client_backend": "http"}
+        params["account"]["zoho_datacenter"] = "EU"
+        comp = self._build_component(params)
+        comp._init_params()
+        comp.statefile = {"#access_token": json.dumps({
+            "access_token": "access-token", "expiry_time": str(int((time.time() + 3600) * 1000)),
+            "fingerprint": zoho.initialization.token_fingerprint("app-key", "refresh-token")})}
+
+        with mock.patch("zoho.initialization.initialize") as initialize:
+            comp._init_client()
+        self.addCleanup(zoho.initialization.use_http_client, None)
+
+        initialize.assert_not_called()
+        self.assertEqual({"Authorization": "Zoho-oauthtoken access-token"},
+                         zoho.initialization.get_authorization_headers())
+        self.assertEqual("https://www.zohoapis.eu", zoho.initialization.get_api_domain())
+
+
+class TestOutputFormat(ComponentFixtures, unittest.TestCase):
+    """Tests typed output of the downloaded slices."""
+
+    def _process(self, advanced_options: dict) -> str:
+        params = self._base_parameters()
+        params["advanced_options"] = advanced_options
+        comp = self._build_component(params)
+        comp.statefile = {"metadata_cache": {"com:user@example.com": {"fields": {"Leads": {
+            "fetched_at": time.time(),
+            "value": [{"api_name": "Last_Name", "data_type": "text"},
+                      {"api_name": "Annual_Revenue", "data_type": "currency"}]}}}}}
+        comp._init_params()
+
+        def download_all_pages(batch):
+            with open(os.path.join(batch.destination_folder, "111.csv"), "w", encoding="utf-8") as slice_file:
+                slice_file.write('1,"Doe",1000.5\n')
+            batch.field_names = ["Id", "Last_Name", "Annual_Revenue"]
+            return True
+
+        with mock.patch.object(zoho.bulk_read.BulkReadJobBatch, "download_all_pages", download_all_pages):
+            comp.process_module_records_download_config(comp.module_configs[0])
+        return os.path.join(comp.configuration.data_dir, "out")
+
+    def test_manifest_has_column_data_types(self):
+        out_dir = self._process({"column_data_types": True})
+
+        with open(os.path.join(out_dir, "tables", "Leads.csv.manifest"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(["Id", "Last_Name", "Annual_Revenue"], manifest["columns"])
+        self.assertIn({"key": "KBC.datatype.basetype", "value": "NUMERIC"},
+                      manifest["column_metadata"]["Annual_Revenue"])
+
+    @unittest.skipUnless(zoho.parquet.is_available(), "pyarrow is not installed")
+    def test_parquet_files_replace_table(self):
+        import pyarrow.parquet
+
+        out_dir = self._process({"output_format": "parquet"})
+
+        self.assertEqual([], os.listdir(os.path.join(out_dir, "tables")))
+        self.assertEqual(["Leads_111.parquet", "Leads_111.parquet.manifest"],
+                         sorted(os.listdir(os.path.join(out_dir, "files"))))
+        table = pyarrow.parquet.read_table(os.path.join(out_dir, "files", "Leads_111.parquet"))
+        self.assertEqual([{"Id": "1", "Last_Name": "Doe", "Annual_Revenue": 1000.5}], table.to_pylist())
+        with open(os.path.join(out_dir, "files", "Leads_111.parquet.manifest"), encoding="utf-8") as f:
+            self.assertEqual(["zoho-parquet", "Leads"], json.load(f)["tags"])
+
+
+class TestMetricsReport(ComponentFixtures, unittest.TestCase):
+    """Tests the metrics report written at the end of a run."""
+
+    def test_report_has_phases_of_processed_module(self):
+        comp = self._build_component(self._base_parameters())
+        comp._init_params()
+
+        def download_all_pages(batch):
+            open(os.path.join(batch.destination_folder, "111.csv"), "w").close()
+            batch.field_names = ["Id"]
+            return True
+
+        with mock.patch.object(zoho.bulk_read.BulkReadJobBatch, "download_all_pages", download_all_pages):
+            comp._process_module(comp.module_configs[0], threading.BoundedSemaphore(1))
+        comp._write_metrics_report()
+
+        with open(os.path.join(comp.configuration.data_dir, "metrics.json"), encoding="utf-8") as f:
+            report = json.load(f)
+        [module] = report["modules"]
+        self.assertEqual(("Leads", "Leads"), (module["module"], module["output_table"]))
+        self.assertEqual(["download", "write_output"], sorted(module["phase_seconds"]))
+
+
+class TestApiCreditBudget(ComponentFixtures, unittest.TestCase):
+    """Tests deferring modules whose pages cannot all be read within the API credit budget."""
+
+    def test_module_over_budget_is_deferred_with_its_checkpoints(self):
+        comp = self._build_component(self._base_parameters())
+        comp.statefile = {"modules": {"Leads": {"last_run": "2023-01-01T00:00:00+0000"}}}
+        comp._init_params()
+
+        def download_all_pages(batch):
+            batch._checkpoint = batch.checkpoint_store.for_query("query")
+            batch._checkpoint.job_created(1, 111)
+            with open(os.path.join(batch.destination_folder, "111.csv"), "w", encoding="utf-8") as slice_file:
+                slice_file.write('1,"Doe"\n')
+            batch.budget_reached = True
+            return True
+
+        with mock.patch.object(zoho.bulk_read.BulkReadJobBatch, "download_all_pages", download_all_pages), \
+                mock.patch.object(ZohoCRMExtractor, "_checkpoint_changed"), self.assertLogs(level="WARNING"):
+            comp.process_module_records_download_config(comp.module_configs[0])
+
+        self.assertEqual([], os.listdir(os.path.join(comp.configuration.data_dir, "out", "tables")))
+        module_state = comp._build_state()["modules"]["Leads"]
+        self.assertEqual("2023-01-01T00:00:00+0000", module_state["last_run"])
+        self.assertEqual(111, module_state["checkpoint"]["query"]["pages"]["1"]["job_id"])
+
+
+class TestCheckpointState(ComponentFixtures, unittest.TestCase):
+    """Tests writing checkpoints of a run in progress into the state."""
+
+    def test_checkpoint_writes_are_throttled(self):
+        comp = self._build_component(self._base_parameters())
+        comp._init_params()
+        store = zoho.checkpoint.CheckpointStore(on_change=comp._checkpoint_changed)
+        comp._checkpoint_stores["Leads"] = store
+        checkpoint = store.for_query("query")
+
+        with mock.patch.object(ZohoCRMExtractor, "write_state_file") as write_state_file:
+            checkpoint.job_created(1, 111)
+            comp._checkpoint_state_timer.join()
+            checkpoint.job_completed(1, True)
+            checkpoint.job_created(2, 112)
+            self.assertEqual(1, write_state_file.call_count)
+
+            comp._cancel_checkpoint_state_write()
+            comp._write_checkpoint_state()
+
+        self.assertEqual(2, write_state_file.call_count)
+        state = write_state_file.call_args.args[0]
+        self.assertEqual(112, state["modules"]["Leads"]["checkpoint"]["query"]["pages"]["2"]["job_id"])
+
+
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -0,0 +1,92 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import mock
+
+from zoho.bulk_read import BulkReadJobFilteringCriteriaGroup, BulkReadJobFilteringCriterion
+from zoho.coql import COQL_PAGE_SIZE, COQL_SLICE_FILE_NAME, CoqlRecordsReader, coql_condition, csv_value
+
+MODIFIED_SINCE = BulkReadJobFilteringCriterion(
+    field_name="Modified_Time", comparator="greater_equal", value="2023-01-01T00:00:00+0100")
+
+
+class FakeCoqlSession:
+    """Answers COQL queries from a list of records, honouring the `limit offset, count` clause."""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def request(self, method, url, json, headers, timeout):
+        query = json["select_query"]
+        self.queries.append(query)
+        offset, limit = (int(part) for part in query.rsplit("limit ", 1)[1].split(","))
+        page = self.records[offset:offset + limit]
+        response = mock.Mock(status_code=200 if page else 204)
+        response.json.return_value = {"data": page, "info": {"more_records": offset + limit < len(self.records)}}
+        return response
+
+
+class TestCoqlCondition(unittest.TestCase):
+
+    def test_criterion_with_datetime_value(self):
+        self.assertEqual("Modified_Time >= '2023-01-01T00:00:00+01:00'", coql_condition(MODIFIED_SINCE))
+
+    def test_group_with_list_values(self):
+        criteria = BulkReadJobFilteringCriteriaGroup(group_operator="and", group=[
+            MODIFIED_SINCE,
+            BulkReadJobFilteringCriterion(field_name="Lead_Source", comparator="in", value=["Web", "O'Neil"]),
+        ])
+
+        self.assertEqual("(Modified_Time >= '2023-01-01T00:00:00+01:00' and Lead_Source in ('Web', 'O\\'Neil'))",
+                         coql_condition(criteria))
+
+    def test_values_formatted_like_bulk_read_results(self):
+        self.assertEqual("", csv_value(None))
+        self.assertEqual("true", csv_value(True))
+        self.assertEqual("42", csv_value({"id": "42", "name": "Owner"}))
+        self.assertEqual("a;b", csv_value(["a", "b"]))
+
+
+class TestCoqlRecordsReader(unittest.TestCase):
+
+    def setUp(self):
+        self.destination_folder = tempfile.mkdtemp()
+
+    def _reader(self, records, max_records=1000) -> CoqlRecordsReader:
+        return CoqlRecordsReader(
+            module_api_name="Leads", destination_folder=self.destination_folder, field_names=["Last_Name", "Owner"],
+            filtering_criteria=MODIFIED_SINCE, max_records=max_records, session=FakeCoqlSession(records),
+        )
+
+    @mock.patch("zoho.initialization.get_authorization_headers", return_value={})
+    @mock.patch("zoho.initialization.get_api_domain", return_value="https://www.zohoapis.eu")
+    def test_small_delta_is_written_in_bulk_read_layout(self, *_):
+        records = [{"id": str(i), "Last_Name": f"Name {i}", "Owner": {"id": "7"}} for i in range(COQL_PAGE_SIZE + 1)]
+        reader = self._reader(records)
+
+        self.assertTrue(reader.download_all_records())
+
+        self.assertEqual(["Id", "Last_Name", "Owner"], reader.field_names)
+        with open(os.path.join(self.destination_folder, COQL_SLICE_FILE_NAME), encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(len(records), len(rows))
+        self.assertEqual(["0", "Name 0", "7"], rows[0])
+        # The probe query and two pages
+        self.assertEqual(3, len(reader.session.queries))
+
+    @mock.patch("zoho.initialization.get_authorization_headers", return_value={})
+    @mock.patch("zoho.initialization.get_api_domain", return_value="https://www.zohoapis.eu")
+    def test_large_delta_is_left_to_bulk_read(self, *_):
+        reader = self._reader([{"id": str(i)} for i in range(11)], max_records=10)
+
+        self.assertFalse(reader.download_all_records())
+
+        self.assertEqual(1, len(reader.session.queries))
+        self.assertEqual([], os.listdir(self.destination_folder))
+
+
+if __name__ == "__main__":
+    unittest.main()
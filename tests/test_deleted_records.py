@@ -0,0 +1,52 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import mock
+
+from zoho.deleted_records import DELETED_RECORDS_SLICE_FILE_NAME, DeletedRecordsReader
+
+
+class FakeDeletedRecordsSession:
+    """Serves deleted records in pages of two."""
+
+    def __init__(self, records):
+        self.records = records
+        self.requests = []
+
+    def request(self, method, url, headers, timeout, params):
+        self.requests.append((url, headers, params))
+        start = (params["page"] - 1) * 2
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"data": self.records[start:start + 2],
+                                      "info": {"more_records": start + 2 < len(self.records)}}
+        return response
+
+
+@mock.patch("zoho.initialization.get_authorization_headers", return_value={})
+@mock.patch("zoho.initialization.get_api_domain", return_value="https://www.zohoapis.eu")
+class TestDeletedRecordsReader(unittest.TestCase):
+
+    def test_deleted_records_since_watermark(self, *_):
+        records = [{"id": str(i), "deleted_time": f"2023-01-0{i}T10:00:00+01:00", "type": "recycle",
+                    "display_name": f"Lead {i}", "deleted_by": {"id": "7", "name": "Admin"}} for i in range(1, 4)]
+        destination_folder = tempfile.mkdtemp()
+        reader = DeletedRecordsReader(module_api_name="Leads", destination_folder=destination_folder,
+                                      deleted_since="2023-01-01T00:00:00+0000",
+                                      session=FakeDeletedRecordsSession(records))
+
+        self.assertEqual(3, reader.download_all_records())
+
+        url, headers, params = reader.session.requests[0]
+        self.assertEqual("https://www.zohoapis.eu/crm/v2/Leads/deleted", url)
+        self.assertEqual("2023-01-01T00:00:00+00:00", headers["If-Modified-Since"])
+        self.assertEqual(2, len(reader.session.requests))
+        with open(os.path.join(destination_folder, DELETED_RECORDS_SLICE_FILE_NAME), encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(["1", "2023-01-01T10:00:00+01:00", "recycle", "Lead 1", "7"], rows[0])
+        self.assertEqual("2023-01-03T10:00:00+0100", reader.watermark.value)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mock
+from zcrmsdk.src.com.zoho.crm.api.util import api_http_connector
+
+import zoho.initialization
+from zoho.http_session import ConnectionStats, create_session, pool_size
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"status": "COMPLETED"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSharedSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/crm/bulk/v2/read/111"
+
+    def test_connection_is_reused_across_requests(self):
+        stats = ConnectionStats()
+        session = create_session(pool_size(1, 1), stats)
+
+        for _ in range(5):
+            self.assertEqual(200, session.get(self.url).status_code)
+
+        self.assertEqual(5, stats.requests_sent)
+        self.assertEqual(1, stats.connections_opened)
+        self.assertIn("5.0 requests per connection", str(stats))
+
+    def test_concurrent_requests_open_connections_up_to_pool_size(self):
+        stats = ConnectionStats()
+        session = create_session(pool_size(2, 1), stats)
+        barrier = threading.Barrier(3)
+
+        def poll():
+            barrier.wait()
+            for _ in range(4):
+                session.get(self.url)
+
+        threads = [threading.Thread(target=poll) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(12, stats.requests_sent)
+        self.assertLessEqual(stats.connections_opened, 3)
+    def test_sdk_requests_go_through_session(self):
+        stats = ConnectionStats()
+        session = create_session(pool_size(1, 1), stats)
+        self.addCleanup(setattr, api_http_connector, "requests", api_http_connector.requests)
+        zoho.initialization.share_session_with_sdk(session)
+        initializer = mock.Mock(request_proxy=None)
+        initializer.sdk_config.get_read_timeout.return_value = 5
+        initializer.sdk_config.get_connect_timeout.return_value = 5
+
+        with mock.patch.object(api_http_connector.Initializer, "get_initializer", return_value=initializer):
+            for _ in range(3):
+                connector = api_http_connector.APIHTTPConnector()
+                connector.url = self.url
+                connector.request_method = "GET"
+                self.assertEqual(200, connector.fire_request(None).status_code)
+
+        self.assertEqual(3, stats.requests_sent)
+        self.assertEqual(1, stats.connections_opened)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+import mock
+
+from zoho.metadata import MetadataCache
+
+LEADS_FIELDS = [{"api_name": "Last_Name", "data_type": "text"},
+                {"api_name": "Modified_Time", "data_type": "datetime"}]
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def test_fields_are_loaded_once_within_ttl(self):
+        cache = MetadataCache(scope="EU:user@example.com")
+        load = mock.Mock(return_value=LEADS_FIELDS)
+
+        self.assertEqual(LEADS_FIELDS, cache.get_fields("Leads", load))
+        self.assertEqual(LEADS_FIELDS, cache.get_fields("Leads", load))
+
+        load.assert_called_once()
+
+    def test_expired_entries_are_reloaded(self):
+        cache = MetadataCache(scope="EU:user@example.com", ttl_seconds=60)
+        load = mock.Mock(return_value=["Leads"])
+
+        with mock.patch("zoho.metadata.time", return_value=1000):
+            cache.get_modules(load)
+        with mock.patch("zoho.metadata.time", return_value=1100):
+            cache.get_modules(load)
+
+        self.assertEqual(2, load.call_count)
+
+    def test_entries_are_kept_per_scope(self):
+        cache = MetadataCache(scope="EU:user@example.com")
+        cache.get_modules(lambda: ["Leads"])
+
+        other_scope = MetadataCache.from_dict(cache.to_dict(), scope="US:user@example.com")
+
+        self.assertEqual(["Deals"], other_scope.get_modules(lambda: ["Deals"]))
+        self.assertEqual({"EU:user@example.com", "US:user@example.com"}, set(other_scope.to_dict()))
+
+    def test_expired_entries_are_not_serialized(self):
+        cache = MetadataCache(scope="EU:user@example.com", ttl_seconds=60)
+        with mock.patch("zoho.metadata.time", return_value=1000):
+            cache.get_modules(lambda: ["Leads"])
+        with mock.patch("zoho.metadata.time", return_value=1050):
+            cache.get_fields("Leads", lambda: LEADS_FIELDS)
+
+        with mock.patch("zoho.metadata.time", return_value=1100):
+            data = cache.to_dict()
+
+        self.assertEqual({"EU:user@example.com": {"fields": {"Leads": {"fetched_at": 1050, "value": LEADS_FIELDS}}}},
+                         data)
+
+    def test_invalidated_entries_are_reloaded(self):
+        cache = MetadataCache(scope="EU:user@example.com")
+        cache.get_fields("Leads", lambda: LEADS_FIELDS)
+        other_scope = MetadataCache.from_dict(cache.to_dict(), scope="US:user@example.com")
+        other_scope.get_modules(lambda: ["Deals"])
+
+        other_scope.invalidate()
+
+        self.assertEqual({"EU:user@example.com"}, set(other_scope.to_dict()))
+        self.assertEqual(["Leads"], other_scope.get_modules(lambda: ["Leads"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import contextlib
+import unittest
+
+import mock
+
+from zoho import metrics
+from zoho.api_credits import ApiCreditScheduler, attributed_to
+from zoho.bulk_read import BulkReadJobBatch, DownloadedSlice, JobStatus
+from zoho.column_layout import ColumnDrift
+from zoho.http_session import ConnectionStats
+
+API = "https://www.zohoapis.eu"
+
+
+def completed_jobs(pages: int, drifted_page: int = None) -> contextlib.ExitStack:
+    """
+    Patches the API calls of `BulkReadJobBatch`, each job completes immediately and its result has two rows.
+    The result of `drifted_page` has an extra column.
+    """
+
+    def create(batch: BulkReadJobBatch):
+        batch._current_job_id = batch._current_page
+
+    def get_details(batch: BulkReadJobBatch) -> JobStatus:
+        return JobStatus(state="COMPLETED", more_records=batch._current_page < pages)
+
+    def download_result(batch: BulkReadJobBatch, job_id=None):
+        drift = ColumnDrift(header=["Id", "Email"], missing_columns=[], extra_columns=["Email"]) \
+            if job_id == drifted_page else None
+        return DownloadedSlice(file_name=f"{job_id}.csv", checksum="", bytes_downloaded=100, rows=2,
+                               extract_seconds=0.001, column_drift=drift)
+
+    stack = contextlib.ExitStack()
+    stack.enter_context(mock.patch.object(BulkReadJobBatch, "create", create))
+    stack.enter_context(mock.patch.object(BulkReadJobBatch, "get_details", get_details))
+    stack.enter_context(mock.patch.object(BulkReadJobBatch, "download_result", download_result))
+    return stack
+
+
+class TestModuleMetrics(unittest.TestCase):
+
+    def test_pages_are_recorded_in_current_module(self):
+        module_metrics = metrics.ModuleMetrics(module_api_name="Leads", output_table_name="leads")
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv")
+
+        with completed_jobs(pages=2), metrics.recorded_in(module_metrics):
+            batch.download_all_pages()
+
+        report = module_metrics.as_dict()
+        self.assertEqual(2, report["pages"])
+        self.assertEqual(4, report["rows_written"])
+        self.assertEqual(200, report["bytes_downloaded"])
+        self.assertEqual([1, 2], [page["job_id"] for page in report["page_metrics"]])
+        for page in report["page_metrics"]:
+            self.assertTrue(page["job_created"])
+            self.assertEqual(1, page["status_calls"])
+            self.assertEqual(1, page["download_attempts"])
+            self.assertEqual(3, page["api_calls"])
+
+    def test_column_drift_is_recorded(self):
+        module_metrics = metrics.ModuleMetrics(module_api_name="Leads", output_table_name="leads")
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv")
+
+        with completed_jobs(pages=2, drifted_page=2), metrics.recorded_in(module_metrics):
+            with self.assertLogs(level="WARNING"):
+                batch.download_all_pages()
+
+        report = module_metrics.as_dict()
+        self.assertEqual(1, report["pages_with_column_drift"])
+        self.assertEqual([None, ["Email"]], [page["column_drift"] and page["column_drift"]["extra_columns"]
+                                             for page in report["page_metrics"]])
+
+    def test_nothing_is_recorded_outside_of_module(self):
+        batch = BulkReadJobBatch(module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv")
+
+        with completed_jobs(pages=1), metrics.phase("download"):
+            batch.download_all_pages()
+
+        self.assertIsNone(metrics.current())
+
+    def test_phase_durations_add_up(self):
+        module_metrics = metrics.ModuleMetrics(module_api_name="Leads", output_table_name="leads")
+
+        with metrics.recorded_in(module_metrics):
+            with mock.patch("time.monotonic", side_effect=[10.0, 12.5, 20.0, 21.0]):
+                with metrics.phase("rebalance_slices"):
+                    pass
+                with metrics.phase("rebalance_slices"):
+                    pass
+
+        self.assertEqual({"rebalance_slices": 3.5}, module_metrics.as_dict()["phase_seconds"])
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def test_report_adds_api_usage_of_modules(self):
+        run_metrics = metrics.RunMetrics()
+        run_metrics.module("Leads", "leads").page(1).rows_written = 5
+        run_metrics.module("Deals", "deals")
+        api_credits = ApiCreditScheduler()
+        with attributed_to("leads"):
+            api_credits.charge("POST", f"{API}/crm/bulk/v2/read")
+            api_credits.charge("GET", f"{API}/crm/bulk/v2/read/111")
+            api_credits.charge("POST", "https://accounts.zoho.eu/oauth/v2/token")
+
+        report = run_metrics.report(api_credits, ConnectionStats(connections_opened=1, requests_sent=3))
+
+        self.assertEqual((2, 51, 3, 1), (report["api_calls"], report["api_credits"], report["http_requests"],
+                                         report["connections_opened"]))
+        leads, deals = report["modules"]
+        self.assertEqual((5, 2, 51), (leads["rows_written"], leads["api_calls"], leads["api_credits"]))
+        self.assertEqual((0, 0, 0), (deals["rows_written"], deals["api_calls"], deals["api_credits"]))
+        self.assertEqual(1, len(leads["page_metrics"]))
+        self.assertNotIn("page_metrics", metrics.summary(report)["modules"][0])
+
+    def test_report_attributes_api_usage_to_output_tables(self):
+        run_metrics = metrics.RunMetrics()
+        run_metrics.module("Leads", "leads")
+        run_metrics.module("Leads", "converted_leads")
+        api_credits = ApiCreditScheduler()
+        with attributed_to("leads"):
+            api_credits.charge("POST", f"{API}/crm/bulk/v2/read")
+        with attributed_to("converted_leads"):
+            api_credits.charge("GET", f"{API}/crm/bulk/v2/read/111")
+
+        report = run_metrics.report(api_credits, ConnectionStats())
+
+        self.assertEqual((2, 51), (report["api_calls"], report["api_credits"]))
+        leads, converted_leads = report["modules"]
+        self.assertEqual((1, 50), (leads["api_calls"], leads["api_credits"]))
+        self.assertEqual((1, 1), (converted_leads["api_calls"], converted_leads["api_credits"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
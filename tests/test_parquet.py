@@ -0,0 +1,57 @@
+import datetime
+import gzip
+import os
+import tempfile
+import unittest
+
+import mock
+
+from zoho import parquet
+
+DATA_TYPES = {"Id": "id", "Description": "textarea", "Amount": "currency", "Quantity": "integer",
+              "Closed": "boolean", "Closing_Date": "date", "Modified_Time": "datetime"}
+
+
+@unittest.skipUnless(parquet.is_available(), "pyarrow is not installed")
+class TestWriteParquet(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.destination = os.path.join(self.folder, "Deals.parquet")
+
+    def _read(self):
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(self.destination)
+
+    def test_slice_is_converted_in_batches_with_typed_columns(self):
+        slice_path = os.path.join(self.folder, "111.csv.gz")
+        with gzip.open(slice_path, "wb") as slice_file:
+            for i in range(100):
+                slice_file.write(f'{i},"Line 1\nLine ""2""",12.5,{i},true,2023-03-01,2023-03-01T10:15:00+05:30\n'
+                                 .encode())
+            slice_file.write(b"100,,,,,,\n")
+
+        with mock.patch.object(parquet, "PARQUET_BATCH_BYTES", 1024):
+            self.assertEqual(101, parquet.write_parquet(slice_path, DATA_TYPES, self.destination))
+
+        table = self._read()
+        self.assertEqual(["string", "string", "double", "int64", "bool", "date32[day]", "timestamp[ms, tz=UTC]"],
+                         [str(column_type) for column_type in table.schema.types])
+        first, last = table.slice(0, 1).to_pylist()[0], table.slice(100, 1).to_pylist()[0]
+        self.assertEqual('Line 1\nLine "2"', first["Description"])
+        self.assertEqual(datetime.date(2023, 3, 1), first["Closing_Date"])
+        self.assertEqual(datetime.datetime(2023, 3, 1, 4, 45, tzinfo=datetime.timezone.utc),
+                         first["Modified_Time"].astimezone(datetime.timezone.utc))
+        self.assertEqual({"Id": "100", "Description": "", "Amount": None, "Quantity": None, "Closed": None,
+                          "Closing_Date": None, "Modified_Time": None}, last)
+
+    def test_empty_slice_gives_empty_file_with_schema(self):
+        slice_path = os.path.join(self.folder, "111.csv")
+        open(slice_path, "wb").close()
+
+        self.assertEqual(0, parquet.write_parquet(slice_path, DATA_TYPES, self.destination))
+        self.assertEqual(list(DATA_TYPES), self._read().column_names)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import mock
+
+from zoho.bulk_read import BulkReadJobBatch, BulkReadJobFilteringCriteriaGroup, BulkReadJobFilteringCriterion
+from zoho.partitioning import PartitionedBulkRead, TimeRange, ranges_from_boundaries
+
+JAN = datetime(2023, 1, 1, tzinfo=timezone.utc)
+FEB = datetime(2023, 2, 1, tzinfo=timezone.utc)
+MAR = datetime(2023, 3, 1, tzinfo=timezone.utc)
+
+
+class TestTimeRange(unittest.TestCase):
+
+    def test_boundaries_cover_whole_timeline(self):
+        ranges = ranges_from_boundaries([FEB, JAN])
+
+        self.assertEqual([TimeRange(None, JAN), TimeRange(JAN, FEB), TimeRange(FEB, None),
+                          TimeRange(None, None, empty=True)], ranges)
+
+    def test_empty_range_matches_empty_values(self):
+        empty = TimeRange(None, None, empty=True)
+
+        [criterion] = empty.criteria("Closing_Date")
+        self.assertEqual(("Closing_Date", "equal", "${EMPTY}"), (criterion.field_name, criterion.comparator,
+                                                                 criterion.value))
+        self.assertFalse(empty.can_split(timedelta(hours=1)))
+
+    def test_split_in_half(self):
+        first, second = TimeRange(JAN, MAR).split()
+
+        self.assertEqual(JAN, first.start)
+        self.assertEqual(first.end, second.start)
+        self.assertEqual(MAR, second.end)
+
+    def test_unbounded_ranges_cannot_be_split(self):
+        self.assertFalse(TimeRange(None, JAN).can_split(timedelta(hours=1)))
+        self.assertFalse(TimeRange(JAN, JAN + timedelta(hours=1)).can_split(timedelta(hours=1)))
+        self.assertTrue(TimeRange(JAN, FEB).can_split(timedelta(hours=1)))
+
+
+class TestPartitionedBulkRead(unittest.TestCase):
+
+    def test_ranges_with_more_pages_are_split_and_combined_with_filter(self):
+        criteria_seen = []
+        lock = threading.Lock()
+
+        def download_all_pages(batch: BulkReadJobBatch, stop_if_more_pages=False):
+            with lock:
+                criteria_seen.append(batch.filtering_criteria)
+            start = batch.filtering_criteria.group[0].value
+            # The whole January has more than one page of records, its halves do not
+            if stop_if_more_pages and start == JAN.isoformat(timespec="seconds") and \
+                    batch.filtering_criteria.group[1].value == FEB.isoformat(timespec="seconds"):
+                return False
+            batch.field_names = batch.column_layout.fix(["Id", "Created_Time"])
+            return True
+
+        base_filter = BulkReadJobFilteringCriterion(field_name="Lead_Source", comparator="equal", value="Web")
+        reader = PartitionedBulkRead(
+            module_api_name="Leads", destination_folder="/tmp", file_name="Leads.csv",
+            partition_field="Created_Time", ranges=[TimeRange(JAN, FEB)], filtering_criteria=base_filter,
+            max_concurrent_jobs=2,
+        )
+        with mock.patch.object(BulkReadJobBatch, "download_all_pages", download_all_pages):
+            reader.download_all_partitions()
+
+        self.assertEqual(3, len(criteria_seen))
+        for criteria in criteria_seen:
+            self.assertIsInstance(criteria, BulkReadJobFilteringCriteriaGroup)
+            self.assertEqual("and", criteria.group_operator)
+            self.assertEqual(base_filter, criteria.group[-1])
+        self.assertEqual(["Id", "Created_Time"], reader.field_names)
+
+
+if __name__ == "__main__":
+    unittest.main()
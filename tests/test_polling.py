@@ -0,0 +1,56 @@
+import time
+import unittest
+
+import mock
+
+from zoho.polling import PollingScheduler
+
+
+class TestPollingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollingScheduler(initial_interval=2, max_interval=30, job_timeout=100, jitter=0)
+
+    def test_backs_off_within_state_and_resets_on_state_change(self):
+        job_poll = self.scheduler.start_job(page=1)
+
+        delays = [job_poll.next_delay("QUEUED") for _ in range(3)]
+        self.assertEqual([2, 3, 4.5], delays)
+        self.assertEqual(2, job_poll.next_delay("IN PROGRESS"))
+
+    def test_interval_is_capped(self):
+        job_poll = self.scheduler.start_job(page=1)
+
+        for _ in range(20):
+            delay = job_poll.next_delay("IN PROGRESS")
+        self.assertEqual(30, delay)
+
+    def test_waits_for_predicted_completion(self):
+        self.scheduler.record_completion(20)
+        job_poll = self.scheduler.start_job(page=2)
+
+        with mock.patch("zoho.polling.monotonic", return_value=job_poll.created_at + 5):
+            self.assertAlmostEqual(15, job_poll.next_delay("QUEUED"))
+
+    def test_deadline_raises_timeout(self):
+        job_poll = self.scheduler.start_job(page=1)
+
+        with mock.patch("zoho.polling.monotonic", return_value=job_poll.created_at + 99):
+            self.assertAlmostEqual(1, job_poll.next_delay("IN PROGRESS"))
+        with mock.patch("zoho.polling.monotonic", return_value=job_poll.created_at + 101):
+            with self.assertRaises(TimeoutError):
+                job_poll.next_delay("IN PROGRESS")
+
+    def test_resumed_job_is_measured_from_its_creation(self):
+        job_poll = self.scheduler.start_job(page=1, created_at=time.time() - 99)
+
+        self.assertAlmostEqual(1, job_poll.next_delay("IN PROGRESS"), places=1)
+
+    def test_resumed_job_found_completed_is_not_used_for_prediction(self):
+        self.scheduler.start_job(page=1, created_at=time.time() - 3600).complete(observed=False)
+
+        self.assertEqual(0, self.scheduler.predict_completion())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from pathlib import Path
+
+import mock
+
+from zoho import profiling
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_samples_and_snapshots_are_written(self):
+        output_dir = Path(tempfile.mkdtemp()) / "profiling"
+
+        with profiling.profiled(output_dir, interval=0.001):
+            profiling.checkpoint("Leads page 1 downloaded")
+            time.sleep(0.05)
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(["0001_start.snapshot", "0002_Leads_page_1_downloaded.snapshot", "0003_end.snapshot",
+                          profiling.MEMORY_FILE_NAME, profiling.SAMPLES_FILE_NAME], sorted(os.listdir(output_dir)))
+        snapshot = tracemalloc.Snapshot.load(str(output_dir / "0002_Leads_page_1_downloaded.snapshot"))
+        self.assertIsInstance(snapshot, tracemalloc.Snapshot)
+        with open(output_dir / profiling.SAMPLES_FILE_NAME, encoding="utf-8") as f:
+            self.assertTrue(any(line.startswith("MainThread;") and "test_samples_and_snapshots_are_written" in line
+                                for line in f))
+
+    def test_checkpoint_does_nothing_unless_profiling(self):
+        with mock.patch("tracemalloc.take_snapshot") as take_snapshot:
+            profiling.checkpoint("init")
+
+        take_snapshot.assert_not_called()
+
+    def test_sampler_counts_stacks_of_other_threads(self):
+        sampler = profiling.StackSampler()
+        stopped = threading.Event()
+        worker = threading.Thread(target=stopped.wait, name="Leads-download_0")
+        worker.start()
+        try:
+            sampler._sample()
+        finally:
+            stopped.set()
+            worker.join()
+
+        self.assertTrue(any(stack.startswith("Leads-download_0;") for stack in sampler.samples))
+        self.assertTrue(sampler.top_functions())
+
+    def test_enabled_by_environment(self):
+        with mock.patch.dict(os.environ, {profiling.PROFILING_ENV_VAR: "1"}):
+            self.assertTrue(profiling.enabled_by_environment())
+        with mock.patch.dict(os.environ, {profiling.PROFILING_ENV_VAR: ""}):
+            self.assertFalse(profiling.enabled_by_environment())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import zipfile
+
+import mock
+import requests
+from zcrmsdk.src.com.zoho.crm.api.exception import SDKException
+
+from zoho.retry import RetryPolicy, TransientApiError, is_retryable, raise_for_transient_status
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_errors_are_classified(self):
+        self.assertTrue(is_retryable(requests.Timeout("read timed out")))
+        self.assertTrue(is_retryable(zipfile.BadZipFile("truncated")))
+        self.assertTrue(is_retryable(TransientApiError("status code 503")))
+        self.assertTrue(is_retryable(SDKException(cause=requests.ConnectionError("connection reset"))))
+        self.assertFalse(is_retryable(RuntimeError("INVALID_DATA")))
+        self.assertFalse(is_retryable(SDKException(code="INVALID_MODULE")))
+
+    def test_errors_raised_while_handling_retryable_ones_are_fatal(self):
+        try:
+            try:
+                raise requests.Timeout("read timed out")
+            except requests.Timeout:
+                raise RuntimeError("status code 400")
+        except RuntimeError as e:
+            error = e
+
+        self.assertFalse(is_retryable(error))
+
+    def test_retryable_errors_are_retried_until_attempts_run_out(self):
+        func = mock.Mock(side_effect=[TransientApiError("503"), TransientApiError("502"), "result"])
+        self.assertEqual("result", RetryPolicy(initial_backoff=0).call(func, "get details"))
+
+        func = mock.Mock(side_effect=TransientApiError("503"))
+        with self.assertRaises(TransientApiError):
+            RetryPolicy(max_attempts=3, initial_backoff=0).call(func, "get details")
+        self.assertEqual(3, func.call_count)
+
+    def test_fatal_errors_are_raised_right_away(self):
+        func = mock.Mock(side_effect=RuntimeError("INVALID_DATA"))
+        with self.assertRaises(RuntimeError):
+            RetryPolicy(initial_backoff=0).call(func, "get details")
+        self.assertEqual(1, func.call_count)
+
+    def test_rate_limited_requests_are_left_to_the_scheduler(self):
+        with self.assertRaises(TransientApiError):
+            raise_for_transient_status(503, "get details")
+        raise_for_transient_status(429, "get details")
+
+    def test_backoff_grows_exponentially_up_to_maximum(self):
+        policy = RetryPolicy(initial_backoff=2, max_backoff=10, jitter=0)
+        self.assertEqual([2, 4, 8, 10], [policy.backoff(attempt) for attempt in range(1, 5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from zoho.row_index import RowHashIndex
+
+FIELD_NAMES = ["Id", "Last_Name", "Modified_Time"]
+
+
+class TestRowHashIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.folder, "Leads.row_hash_index.sqlite")
+        self.slice_path = os.path.join(self.folder, "slice.csv")
+
+    def _filter(self, content: str):
+        with open(self.slice_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        index = RowHashIndex(self.index_path, ignored_fields=["Modified_Time"])
+        try:
+            counts = index.filter_slice(self.slice_path, FIELD_NAMES, "Id")
+        finally:
+            index.close()
+        with open(self.slice_path, encoding="utf-8") as f:
+            return counts, f.read()
+
+    def test_unchanged_rows_are_dropped(self):
+        counts, content = self._filter('1,Smith,2023-01-01T00:00:00+00:00\n2,"Doe, Jr.",2023-01-01T00:00:00+00:00\n')
+        self.assertEqual((2, 0), counts)
+        self.assertEqual('1,Smith,2023-01-01T00:00:00+00:00\n2,"Doe, Jr.",2023-01-01T00:00:00+00:00\n', content)
+
+        # Only Modified_Time of the first record changed, the second record was renamed
+        counts, content = self._filter('1,Smith,2023-02-01T00:00:00+00:00\n2,Doe,2023-02-01T00:00:00+00:00\n')
+        self.assertEqual((1, 1), counts)
+        self.assertEqual("2,Doe,2023-02-01T00:00:00+00:00\n", content)
+
+    def test_slice_is_replaced_not_modified_in_place(self):
+        self._filter("1,Smith,2023-01-01T00:00:00+00:00\n")
+        linked_path = os.path.join(self.folder, "cached.csv")
+        os.link(self.slice_path, linked_path)
+
+        index = RowHashIndex(self.index_path, ignored_fields=["Modified_Time"])
+        index.filter_slice(self.slice_path, FIELD_NAMES, "Id")
+        index.close()
+
+        self.assertEqual(0, os.path.getsize(self.slice_path))
+        with open(linked_path, encoding="utf-8") as f:
+            self.assertEqual("1,Smith,2023-01-01T00:00:00+00:00\n", f.read())
+
+    def test_compressed_slice_stays_compressed(self):
+        slice_path = os.path.join(self.folder, "slice.csv.gz")
+        with gzip.open(slice_path, "wt", encoding="utf-8") as f:
+            f.write("1,Smith,2023-01-01T00:00:00+00:00\n")
+
+        index = RowHashIndex(self.index_path, ignored_fields=["Modified_Time"])
+        counts = index.filter_slice(slice_path, FIELD_NAMES, "Id", compression_level=1)
+        index.close()
+
+        self.assertEqual((1, 0), counts)
+        with gzip.open(slice_path, "rt", encoding="utf-8") as f:
+            self.assertEqual("1,Smith,2023-01-01T00:00:00+00:00\n", f.read())
+
+
+
+if __name__ == "__main__":
+    unittest.main()
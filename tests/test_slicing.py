@@ -0,0 +1,121 @@
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+import mock
+
+from zoho import slicing
+from zoho.slicing import open_slice, rebalance_slices
+
+
+def write_slice(folder: str, name: str, rows: list):
+    with open(os.path.join(folder, name), "w", newline="") as slice_file:
+        csv.writer(slice_file, lineterminator="\n").writerows(rows)
+
+
+def read_rows(folder: str) -> list:
+    rows = []
+    for name in sorted(os.listdir(folder)):
+        with open_slice(os.path.join(folder, name), "r", newline="") as slice_file:
+            rows.extend(csv.reader(slice_file))
+    return rows
+
+
+class TestRebalanceSlices(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def test_large_slice_is_split_on_record_boundaries(self):
+        rows = [[str(i), f'Note {i}\nspanning "several"\nlines', "x" * (i % 7)] for i in range(200)]
+        write_slice(self.folder, "111.csv", rows)
+
+        # Read in small chunks, so that records and quotes cross chunk boundaries
+        with mock.patch.object(slicing, "READ_BUFFER_SIZE", 37):
+            slice_names = rebalance_slices(self.folder, 500)
+
+        self.assertGreater(len(slice_names), 10)
+        self.assertEqual(sorted(os.listdir(self.folder)), slice_names)
+        self.assertEqual(rows, read_rows(self.folder))
+        for name in slice_names:
+            with open(os.path.join(self.folder, name), newline="") as slice_file:
+                self.assertTrue(all(row[0].isdigit() for row in csv.reader(slice_file)))
+            self.assertLess(os.path.getsize(os.path.join(self.folder, name)), 500 + 100)
+
+    def test_small_slices_are_merged_and_slices_of_target_size_kept(self):
+        write_slice(self.folder, "1.csv", [["1", "a"]])
+        with open(os.path.join(self.folder, "2.csv"), "wb") as slice_file:
+            slice_file.write(b"2,b")
+        write_slice(self.folder, "3.csv", [["3", "c" * 96]])
+
+        slice_names = rebalance_slices(self.folder, 100)
+
+        self.assertEqual(["3.csv", "slice_00001.csv"], slice_names)
+        with open(os.path.join(self.folder, "slice_00001.csv"), "rb") as slice_file:
+            self.assertEqual(b"1,a\n2,b\n", slice_file.read())
+
+    def test_slices_of_target_size_are_left_alone(self):
+        write_slice(self.folder, "1.csv", [["1", "a" * 96]])
+        write_slice(self.folder, "2.csv", [["2", "b"]])
+
+        self.assertEqual(["1.csv", "2.csv"], rebalance_slices(self.folder, 100))
+
+    def test_hard_linked_slice_is_not_modified(self):
+        write_slice(self.folder, "1.csv", [[str(i), "x" * 50] for i in range(10)])
+        cached = os.path.join(tempfile.mkdtemp(), "cached.csv")
+        os.link(os.path.join(self.folder, "1.csv"), cached)
+        with open(cached, "rb") as cached_file:
+            content = cached_file.read()
+
+        rebalance_slices(self.folder, 100)
+
+        with open(cached, "rb") as cached_file:
+            self.assertEqual(content, cached_file.read())
+        self.assertNotIn("1.csv", os.listdir(self.folder))
+
+    def test_compressed_slices_are_rebalanced_compressed(self):
+        rows = [[str(i), f"Description {i}\nwith a line break " + "x" * (i * 37 % 100)] for i in range(3000)]
+        for index in range(3):
+            with gzip.open(os.path.join(self.folder, f"{index}.csv.gz"), "wt", newline="") as slice_file:
+                csv.writer(slice_file, lineterminator="\n").writerows(rows[index * 1000:(index + 1) * 1000])
+
+        slice_names = rebalance_slices(self.folder, 2000, compression_level=1)
+
+        self.assertGreater(len(slice_names), 3)
+        self.assertTrue(all(name.endswith(".csv.gz") for name in slice_names))
+        self.assertEqual(rows, read_rows(self.folder))
+
+    def test_compressed_slice_size_is_estimated_without_flushing(self):
+        rows = [[str(i), f"Description {i}\nwith a line break " + "x" * (i * 37 % 100)] for i in range(3000)]
+        write_slice(self.folder, "1.csv", rows)
+
+        with mock.patch.object(gzip.GzipFile, "flush", side_effect=AssertionError("compressor flushed")):
+            slice_names = rebalance_slices(self.folder, 2000, compression_level=1)
+
+        self.assertEqual(rows, read_rows(self.folder))
+        # The estimate settles once a few slices are closed, the last slice takes the remainder
+        self.assertGreater(len(slice_names), 10)
+        for name in slice_names[2:-1]:
+            self.assertLess(abs(os.path.getsize(os.path.join(self.folder, name)) - 2000), 300)
+
+
+class TestRecordCounter(unittest.TestCase):
+
+    def test_line_breaks_in_quoted_values_are_not_counted(self):
+        destination = io.BytesIO()
+        counter = slicing.RecordCounter(destination)
+        content = b'1,"multi\nline ""quoted"" value"\n2,plain\n3,"value ""split\nacross"" chunks"'
+
+        for start in range(0, len(content), 7):
+            counter.write(content[start:start + 7])
+
+        self.assertEqual(3, counter.records)
+        self.assertEqual(content, destination.getvalue())
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import io
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+
+from zoho.bulk_read import copy_csv_body
+from zoho.watermark import WatermarkTracker, lower_bound
+
+
+class TestWatermarkTracker(unittest.TestCase):
+
+    def test_maximum_is_tracked_across_offsets_while_copying(self):
+        csv_data = ('Id,Modified_Time,Description\n'
+                    '1,2023-01-01T10:00:00+01:00,"multi\nline, ""quoted"""\n'
+                    '2,2023-01-01T09:30:00+00:00,plain\n'
+                    '3,,no value\n').encode("utf-8")
+        watermark = WatermarkTracker("Modified_Time")
+        destination = io.BytesIO()
+
+        # Small chunks split records and quoted values between writes
+        stream = io.BufferedReader(io.BytesIO(csv_data), buffer_size=8)
+        copy_csv_body(stream, destination, watermark)
+
+        self.assertEqual(csv_data.split(b"\n", 1)[1], destination.getvalue())
+        self.assertEqual("2023-01-01T09:30:00+0000", watermark.value)
+
+    def test_restored_slice_is_observed(self):
+        slice_path = os.path.join(tempfile.mkdtemp(), "slice.csv")
+        with open(slice_path, "w") as f:
+            f.write("1,2023-02-01T00:00:00+00:00\n2,2023-03-01T00:00:00+00:00")
+        watermark = WatermarkTracker("Modified_Time")
+
+        watermark.observe_slice(slice_path, ["Id", "Modified_Time"])
+
+        self.assertEqual("2023-03-01T00:00:00+0000", watermark.value)
+
+    def test_missing_field_is_not_tracked(self):
+        watermark = WatermarkTracker("Modified_Time")
+
+        self.assertIsNone(watermark.tap(["Id"], io.BytesIO()))
+        self.assertIsNone(watermark.value)
+
+    def test_lower_bound_with_overlap(self):
+        self.assertEqual("2023-01-01T09:55:00+0100", lower_bound("2023-01-01T10:00:00+0100", timedelta(minutes=5)))
+
+
+if __name__ == "__main__":
+    unittest.main()